@@ -73,8 +73,16 @@ export class ClipService {
       id,
       select: {
         storage_path: miniClips.storage_path,
+        byte_offset: miniClips.byte_offset,
+        byte_length: miniClips.byte_length,
+        status: miniClips.status,
       },
-    })) as { storage_path: string }
+    })) as {
+      storage_path: string
+      byte_offset: number | null
+      byte_length: number | null
+      status: string
+    }
 
     if (!clip) {
       logging.error(`[Clip Service] Clip with id ${id} not found`)
@@ -84,8 +92,23 @@ export class ClipService {
       }
     }
 
+    // Packed clips stay PENDING until their pack object is uploaded
+    if (clip.status !== 'UPLOADED') {
+      logging.warn(`[Clip Service] Clip ${id} is not uploaded yet`)
+      return {
+        statusCode: 409,
+        message: CLIP_MESSAGES.NOT_UPLOADED,
+      }
+    }
+
     const expiresIn = 3600 // 1 hour
 
+    // Packed clips are a byte range of the pack object, sent as the Range header
+    const range =
+      clip.byte_offset !== null && clip.byte_length !== null
+        ? `bytes=${clip.byte_offset}-${clip.byte_offset + clip.byte_length - 1}`
+        : undefined
+
     try {
       const command = new GetObjectCommand({
         Bucket: config.gcs.bucket,
@@ -102,6 +125,7 @@ export class ClipService {
         data: {
           url,
           expires_in: expiresIn,
+          range,
         },
       }
     } catch (error) {
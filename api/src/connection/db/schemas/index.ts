@@ -7,3 +7,4 @@ export * from './packingItems'
 export * from './miniClips'
 export * from './batchJobs'
 export * from './batchJobItems'
+export * from './workerNodes'
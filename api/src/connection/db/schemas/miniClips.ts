@@ -27,6 +27,10 @@ export const miniClips = pgTable('mini_clips', {
     .notNull()
     .references(() => cameras.id),
   storage_path: varchar('storage_path', { length: 500 }).notNull(),
+  byte_offset: bigint('byte_offset', { mode: 'number' }),
+  byte_length: bigint('byte_length', { mode: 'number' }),
+  poster_path: varchar('poster_path', { length: 500 }),
+  preview_path: varchar('preview_path', { length: 500 }),
   duration_sec: integer('duration_sec'),
   filesize_bytes: bigint('filesize_bytes', { mode: 'number' }),
   generated_at: timestamp('generated_at', { withTimezone: true }).notNull(),
@@ -1,5 +1,14 @@
-import { pgTable, varchar, timestamp, pgEnum, uuid } from 'drizzle-orm/pg-core'
-import { relations } from 'drizzle-orm'
+import {
+  pgTable,
+  varchar,
+  timestamp,
+  integer,
+  text,
+  pgEnum,
+  uuid,
+  index,
+} from 'drizzle-orm/pg-core'
+import { relations, sql } from 'drizzle-orm'
 import { users } from './users'
 import { workstations } from './workstations'
 
@@ -22,13 +31,21 @@ export const packingItems = pgTable('packing_items', {
   start_time: timestamp('start_time', { withTimezone: true }),
   end_time: timestamp('end_time', { withTimezone: true }),
   status: packingStatusEnum('status').notNull().default('PENDING'),
+  retry_count: integer('retry_count').notNull().default(0),
+  next_attempt_at: timestamp('next_attempt_at', { withTimezone: true }),
+  last_error: text('last_error'),
   created_at: timestamp('created_at', { withTimezone: true })
     .defaultNow()
     .notNull(),
   updated_at: timestamp('updated_at', { withTimezone: true })
     .defaultNow()
     .notNull(),
-})
+}, (table) => [
+  // Worker batch selection: ready queue only, oldest end_time first
+  index('packing_items_ready_end_time_idx')
+    .on(table.end_time, table.id)
+    .where(sql`${table.status} = 'READY_FOR_BATCH'`),
+])
 
 export const packingItemsRelations = relations(packingItems, ({ one }) => ({
   operator: one(users, {
@@ -0,0 +1,9 @@
+import { pgTable, varchar, timestamp, integer } from 'drizzle-orm/pg-core'
+
+export const workerNodes = pgTable('worker_nodes', {
+  id: varchar('id', { length: 100 }).primaryKey(),
+  hostname: varchar('hostname', { length: 255 }).notNull(),
+  workers: integer('workers').notNull().default(1),
+  started_at: timestamp('started_at', { withTimezone: true }).notNull(),
+  heartbeat_at: timestamp('heartbeat_at', { withTimezone: true }).notNull(),
+})
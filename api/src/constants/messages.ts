@@ -86,6 +86,7 @@ export const PACKING_MESSAGES = {
 export const CLIP_MESSAGES = {
   GET_SUCCESS: 'Clips retrieved successfully',
   NOT_FOUND: 'Clip not found',
+  NOT_UPLOADED: 'Clip is not uploaded yet',
   URL_GENERATED: 'Signed URL generated successfully',
 } as const
 
@@ -1,13 +1,59 @@
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+import os
+import signal
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-from api.schemas import TriggerRequest, TriggerResponse, ErrorResponse, HealthResponse
+from typing import TYPE_CHECKING
+
+from fastapi import APIRouter, HTTPException, Response, status
+
+from api.schemas import (
+    TriggerRequest,
+    TriggerResponse,
+    ErrorResponse,
+    HealthResponse,
+    DiskResponse,
+    DiskTierResponse,
+    MetricsResponse,
+    ReadyResponse,
+    DrainResponse,
+    ProfileRequest,
+    ProfileRequestInfo,
+    ProfileResponse,
+)
 from config import settings
-from db.session import SessionLocal
-from db.models import PackingItem, PackingStatus
-from jobs.job_queue import job_queue, enqueue_job
+from jobs import drain
+from jobs.job_queue import enqueue_job, queue_size
+from jobs.profiler import load_profiles, request_profile
+from services.circuit_breaker import open_circuits
+from services.disk_budget import disk_budget, memory_budget
+from services.metrics import load_published, metrics
+from services.sharding import node_id
+from services.warmup import readiness
+
+if TYPE_CHECKING:
+    from db.models import PackingStatus
 
 router = APIRouter()
 
+# One thread per API pool connection, lookups never wait on the pool or on FastAPI's threadpool
+_db_executor = ThreadPoolExecutor(max_workers=settings.API_DB_POOL_SIZE, thread_name_prefix="api-db")
+
+
+def _lookup_packing_item(packing_item_id: str) -> tuple["PackingStatus", uuid.UUID] | None:
+    """Status and camera of the packing item from the read-only API pool."""
+    # SQLAlchemy models are loaded by the startup thread, not before the port is bound
+    from db.session import ApiSessionLocal
+    from repositories import packing_repository
+
+    db = ApiSessionLocal()
+    try:
+        row = packing_repository.get_status_and_camera(db, packing_item_id)
+        return (row.status, row.camera_id) if row is not None else None
+    finally:
+        db.close()
+
 
 @router.post(
     "/trigger",
@@ -18,44 +64,104 @@ router = APIRouter()
         404: {"model": ErrorResponse},
     },
 )
-def trigger_processing(request: TriggerRequest) -> TriggerResponse:
+async def trigger_processing(request: TriggerRequest) -> TriggerResponse:
     """Trigger processing for a specific packing item."""
-    db = SessionLocal()
-    try:
-        # Check if packing item exists and is ready
-        packing_item = db.query(PackingItem).filter(
-            PackingItem.id == request.packing_item_id
-        ).first()
-
-        if packing_item is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Packing item {request.packing_item_id} not found",
-            )
-
-        if packing_item.status != PackingStatus.READY_FOR_BATCH:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Packing item {request.packing_item_id} is not ready for processing (status: {packing_item.status.value})",
-            )
-
-        # Enqueue the job
-        enqueue_job(request.packing_item_id)
-
-        return TriggerResponse(
-            status="accepted",
-            packing_item_id=request.packing_item_id,
-            message="Job queued for processing",
+    from db.models import PackingStatus
+
+    # Check if packing item exists and is ready, off the event loop on the API's own pool
+    loop = asyncio.get_running_loop()
+    packing_item = await loop.run_in_executor(_db_executor, _lookup_packing_item, request.packing_item_id)
+
+    if packing_item is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Packing item {request.packing_item_id} not found",
+        )
+
+    packing_status, camera_id = packing_item
+    if packing_status != PackingStatus.READY_FOR_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Packing item {request.packing_item_id} is not ready for processing (status: {packing_status.value})",
         )
-    finally:
-        db.close()
+
+    # Enqueue the job
+    enqueue_job(request.packing_item_id, camera_id)
+
+    return TriggerResponse(
+        status="accepted",
+        packing_item_id=request.packing_item_id,
+        message="Job queued for processing",
+    )
 
 
 @router.get("/health", response_model=HealthResponse)
-def health_check() -> HealthResponse:
+async def health_check() -> HealthResponse:
     """Health check endpoint."""
     return HealthResponse(
         status="healthy",
         auto_batch=settings.AUTO_BATCH_ENABLED,
-        queue_size=job_queue.qsize(),
+        queue_size=queue_size(),
+        open_circuits=open_circuits(),
+        node_id=node_id(),
     )
+
+
+@router.get("/ready", response_model=ReadyResponse, responses={503: {"model": ReadyResponse}})
+def ready_check(response: Response) -> ReadyResponse:
+    """Readiness, 503 until warm-up has finished and processing is running."""
+    ready, checks = readiness()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadyResponse(ready=ready, checks=checks)
+
+
+@router.get("/disk", response_model=DiskResponse)
+def disk_status() -> DiskResponse:
+    """Free, used and reserved bytes of TEMP_VIDEO_DIR and the RAM staging tier."""
+    memory = None
+    if memory_budget is not None:
+        try:
+            memory = DiskTierResponse(**memory_budget.stats())
+        except OSError:
+            memory = None
+    return DiskResponse(**disk_budget.stats(), memory=memory)
+
+
+@router.get("/metrics", response_model=MetricsResponse)
+def metrics_snapshot() -> MetricsResponse:
+    """Counters, gauges and timings of this process and of each worker process."""
+    return MetricsResponse(process=metrics.snapshot(), workers=load_published())
+
+
+@router.post(
+    "/admin/profile",
+    response_model=ProfileRequestInfo,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={400: {"model": ErrorResponse}},
+)
+def start_profile(request: ProfileRequest) -> ProfileRequestInfo:
+    """Profile the next N items of every processing process with cProfile (and tracemalloc)."""
+    if request.items < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="items must be at least 1",
+        )
+    return ProfileRequestInfo(**request_profile(request.items, request.tracemalloc))
+
+
+@router.get("/admin/profile", response_model=ProfileResponse)
+def get_profile() -> ProfileResponse:
+    """Active profile request, its profile merged across processes, and each process's part."""
+    request, profile, processes = load_profiles()
+    return ProfileResponse(request=request, profile=profile, processes=processes)
+
+
+@router.post("/admin/drain", response_model=DrainResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_drain() -> DrainResponse:
+    """Drain and exit, same as SIGTERM: stop claiming items, let in-flight ones finish."""
+    remaining = drain.begin(settings.DRAIN_TIMEOUT_SECONDS)
+    in_flight = drain.in_flight()
+    # The HTTP server sends this response before stopping, then the signal handler drains and exits
+    os.kill(os.getpid(), signal.SIGTERM)
+    return DrainResponse(status="draining", deadline_seconds=remaining, in_flight=in_flight)
@@ -20,3 +20,88 @@ class HealthResponse(BaseModel):
     status: str
     auto_batch: bool
     queue_size: int
+    open_circuits: list[str]
+    node_id: str | None
+
+
+class ReadyResponse(BaseModel):
+    ready: bool
+    checks: dict[str, str]
+
+
+class DiskTierResponse(BaseModel):
+    path: str
+    total_bytes: int
+    used_bytes: int
+    free_bytes: int
+    reserved_bytes: int
+    available_bytes: int
+    reservations: int
+
+
+class DiskResponse(DiskTierResponse):
+    memory: DiskTierResponse | None = None
+
+
+class MetricsSnapshot(BaseModel):
+    counters: dict[str, float]
+    gauges: dict[str, float]
+    timings: dict[str, dict[str, float]]
+
+
+class PublishedMetricsSnapshot(MetricsSnapshot):
+    published_at: float
+
+
+class MetricsResponse(BaseModel):
+    process: MetricsSnapshot
+    workers: dict[str, PublishedMetricsSnapshot]
+
+
+class ProfileRequest(BaseModel):
+    items: int = 10
+    tracemalloc: bool = False
+
+
+class ProfileRequestInfo(BaseModel):
+    id: str
+    items: int
+    tracemalloc: bool
+    requested_at: float
+
+
+class MemoryProfile(BaseModel):
+    current_bytes: int
+    peak_bytes: int
+    top: list[str]
+
+
+class ProcessProfile(BaseModel):
+    id: str
+    items: int
+    started_at: float
+    finished_at: float
+    stage_seconds: dict[str, float]
+    tracemalloc: MemoryProfile | None = None
+
+
+class MergedProfile(BaseModel):
+    id: str
+    items: int
+    complete: bool
+    started_at: float
+    finished_at: float
+    stage_seconds: dict[str, float]
+    cprofile: str
+
+
+class ProfileResponse(BaseModel):
+    request: ProfileRequestInfo | None
+    profile: MergedProfile | None
+    processes: dict[str, ProcessProfile]
+
+
+class DrainResponse(BaseModel):
+    status: str
+    deadline_seconds: float
+    in_flight: int
@@ -0,0 +1,167 @@
+"""Benchmark fixed vs adaptive parallel segment downloads against a simulated NVR.
+
+A local HTTP server stands in for the NVR: every connection is capped at
+--conn-mbps and all of them share --total-mbps, and with --max-connections
+it answers 503 beyond that many parallel downloads, like a weak DVR. A
+sequence of items of --segments segments each is downloaded once with the
+previous fixed pool of 5 and once through the per-NVR adaptive limiter.
+Failed segments are retried after a second, as the retry scheduler would.
+Reports throughput, failed requests and the limit the controller settled on.
+
+    uv run python -m benchmarks.download_parallelism --items 20 --segments 3 --max-connections 2
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import settings
+from services.hikvision_client import HikvisionClient
+
+FIXED_PARALLEL = 5
+CHUNK = 256 * 1024
+
+
+class Link:
+    """Paces writes to a per-connection and a shared bandwidth cap."""
+
+    def __init__(self, total_bps: float, conn_bps: float):
+        self.total_bps = total_bps
+        self.conn_bps = conn_bps
+        self.next_free = 0.0
+        self.lock = threading.Lock()
+
+    def send_at(self, conn_next: float, nbytes: int) -> float:
+        with self.lock:
+            at = max(time.monotonic(), self.next_free, conn_next)
+            self.next_free = at + nbytes / self.total_bps
+        return at
+
+
+def serve(payload: bytes, link: Link, max_connections: int) -> tuple[ThreadingHTTPServer, dict[str, int]]:
+    stats = {"active": 0, "rejected": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            with lock:
+                if max_connections and stats["active"] >= max_connections:
+                    stats["rejected"] += 1
+                    rejected = True
+                else:
+                    stats["active"] += 1
+                    rejected = False
+            if rejected:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                view = memoryview(payload)
+                conn_next = 0.0
+                for offset in range(0, len(view), CHUNK):
+                    chunk = view[offset:offset + CHUNK]
+                    at = link.send_at(conn_next, len(chunk))
+                    time.sleep(max(0.0, at - time.monotonic()))
+                    self.wfile.write(chunk)
+                    conn_next = at + len(chunk) / link.conn_bps
+            finally:
+                with lock:
+                    stats["active"] -= 1
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def run(client: HikvisionClient, download, workers: int, items: int, segments: int, outdir: str) -> tuple[float, int]:
+    """Seconds for all items and number of failed downloads."""
+    failures = 0
+    failures_lock = threading.Lock()
+
+    def task(path: str) -> None:
+        nonlocal failures
+        while True:
+            try:
+                download(client, "/segment.mp4", path)
+                return
+            except Exception:
+                with failures_lock:
+                    failures += 1
+                time.sleep(1)
+
+    start = time.perf_counter()
+    for item in range(items):
+        paths = [os.path.join(outdir, f"item{item}_seg{i}.mp4") for i in range(segments)]
+        with ThreadPoolExecutor(max_workers=workers) as exe:
+            list(exe.map(task, paths))
+        for path in paths:
+            os.remove(path)
+    return time.perf_counter() - start, failures
+
+
+def download_fixed(client: HikvisionClient, uri: str, path: str) -> None:
+    """The downloader before the limiter, bounded only by its own pool."""
+    client._download_segment(uri, path)
+
+
+def download_adaptive(client: HikvisionClient, uri: str, path: str) -> None:
+    client.download_segment(uri, path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--segments", type=int, default=3, help="segments per item")
+    parser.add_argument("--size-mb", type=int, default=16, help="size of each segment")
+    parser.add_argument("--total-mbps", type=float, default=400, help="NVR uplink shared by all downloads")
+    parser.add_argument("--conn-mbps", type=float, default=100, help="cap per download")
+    parser.add_argument("--max-connections", type=int, default=0, help="503 beyond this many (0: no limit)")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    link = Link(args.total_mbps * 1e6 / 8, args.conn_mbps * 1e6 / 8)
+    server, stats = serve(payload, link, args.max_connections)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    outdir = tempfile.mkdtemp(prefix="bench_parallel_")
+
+    total_mb = args.items * args.segments * args.size_mb
+    print(
+        f"{args.items} items x {args.segments} segments of {args.size_mb} MB, "
+        f"NVR {args.total_mbps:.0f} Mbit/s total, {args.conn_mbps:.0f} Mbit/s per download, "
+        f"max connections {args.max_connections or 'unlimited'}"
+    )
+    print(f"{'mode':>10} {'seconds':>9} {'Mbit/s':>9} {'failed':>7} {'503s':>6} {'limit':>6}")
+    # The fixed mode bypasses the limiter, so the adaptive run starts from DOWNLOAD_PARALLEL_INITIAL
+    client = HikvisionClient(base_url, "bench", "bench")
+    try:
+        modes = (
+            ("fixed", download_fixed, FIXED_PARALLEL),
+            ("adaptive", download_adaptive, max(1, min(args.segments, settings.DOWNLOAD_PARALLEL_MAX))),
+        )
+        for name, download, workers in modes:
+            stats["rejected"] = 0
+            elapsed, failures = run(client, download, workers, args.items, args.segments, outdir)
+            limit = str(client.limiter.allowed) if download is download_adaptive else "-"
+            print(
+                f"{name:>10} {elapsed:>9.2f} {total_mb * 8 / elapsed:>9.1f} "
+                f"{failures:>7} {stats['rejected']:>6} {limit:>6}"
+            )
+    finally:
+        server.shutdown()
+        shutil.rmtree(outdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
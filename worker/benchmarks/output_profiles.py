@@ -0,0 +1,109 @@
+"""Benchmark output profiles: clip bytes against encode CPU and wall time.
+
+Cuts the same clip with every profile (built-in and OUTPUT_PROFILES) the
+way cut_exact does, and reports output size, share of the source size,
+CPU seconds of ffmpeg and speed relative to realtime. Use a real merged
+recording with --input; without it a synthetic 4K test pattern is
+generated, which compresses far better than camera footage. With
+--extras every cut also writes the poster and the preview rendition in
+the same ffmpeg run, to compare against the cut alone.
+
+    uv run python -m benchmarks.output_profiles --input /path/to/merged.mp4 --seconds 60
+    uv run python -m benchmarks.output_profiles --profiles native,review-720p --extras
+"""
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from services.ffmpeg_processor import cut_command
+from services.output_profiles import profiles
+
+
+def synthetic_source(path: str, seconds: float, size: str) -> None:
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=25",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=16000",
+            "-t", str(seconds),
+            "-c:v", "libx264", "-preset", "ultrafast", "-crf", "18", "-pix_fmt", "yuv420p",
+            "-c:a", "aac",
+            path,
+        ],
+        check=True,
+    )
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", default=None, help="source clip (default: synthetic 4K)")
+    parser.add_argument("--seconds", type=float, default=30, help="clip duration")
+    parser.add_argument("--size", default="3840x2160", help="synthetic source size")
+    parser.add_argument("--profiles", default=None, help="comma-separated names (default: all)")
+    parser.add_argument("--extras", action="store_true", help="also write the poster and preview")
+    parser.add_argument("--preview-profile", default="preview-240p")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_profiles_")
+    try:
+        source = args.input
+        if source is None:
+            source = os.path.join(workdir, "source.mp4")
+            synthetic_source(source, args.seconds, args.size)
+        source_bytes = os.path.getsize(source)
+
+        available = profiles()
+        names = args.profiles.split(",") if args.profiles else list(available)
+
+        print(f"source {source_bytes / 1e6:.1f} MB, {args.seconds:.0f}s clip")
+        print(f"{'profile':>22} {'MB':>9} {'% source':>9} {'cpu (s)':>9} {'wall (s)':>9} {'speed':>7}")
+        runs = [(name, False) for name in names]
+        if args.extras:
+            runs = [(name, extras) for name in names for extras in (False, True)]
+        for name, extras in runs:
+            profile = available[name]
+            outpath = os.path.join(workdir, f"{name}.mp4")
+            poster_path = os.path.join(workdir, "poster.jpg") if extras else None
+            preview_path = os.path.join(workdir, "preview.mp4") if extras else None
+            cmd, _ = cut_command(
+                source,
+                outpath,
+                0,
+                args.seconds,
+                profile,
+                poster_path=poster_path,
+                poster_offset=1.0,
+                preview_path=preview_path,
+                preview_profile=available[args.preview_profile] if extras else None,
+            )
+            cpu_before = cpu_seconds()
+            start = time.perf_counter()
+            subprocess.run([cmd[0], "-loglevel", "error", *cmd[1:]], check=True)
+            wall = time.perf_counter() - start
+            cpu = cpu_seconds() - cpu_before
+
+            # Everything uploaded for the clip
+            size = sum(os.path.getsize(p) for p in (outpath, poster_path, preview_path) if p)
+            label = f"{name}+extras" if extras else name
+            print(
+                f"{label:>22} {size / 1e6:>9.2f} {size / source_bytes * 100:>8.1f}% "
+                f"{cpu:>9.2f} {wall:>9.2f} {args.seconds / wall:>6.1f}x"
+            )
+            for path in (outpath, poster_path, preview_path):
+                if path:
+                    os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark the READY_FOR_BATCH poll as CLIP_GENERATED history grows.
+
+Builds a scratch copy of the packing_items columns the poll touches in a
+throwaway schema of DATABASE_URL, grows the history in steps and times the
+same query shape as packing_repository.get_ready_for_batch, with and without
+the partial index.
+
+    uv run python -m benchmarks.ready_poll --sizes 10000,100000,1000000
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from config import settings
+
+SCHEMA = "bench_ready_poll"
+
+POLL_SQL = f"""
+SELECT id FROM {SCHEMA}.packing_items
+WHERE status = 'READY_FOR_BATCH'
+  AND (next_attempt_at IS NULL OR next_attempt_at <= now())
+ORDER BY end_time, id
+LIMIT :limit
+"""
+
+
+def setup(conn, ready: int) -> None:
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.packing_items (
+            id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+            status text NOT NULL,
+            end_time timestamptz,
+            next_attempt_at timestamptz
+        )
+    """))
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.packing_items (status, end_time)
+        SELECT 'READY_FOR_BATCH', now() - (g || ' seconds')::interval
+        FROM generate_series(1, :ready) g
+    """), {"ready": ready})
+
+
+def grow_history(conn, rows: int) -> None:
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.packing_items (status, end_time)
+        SELECT 'CLIP_GENERATED', now() - (g || ' minutes')::interval
+        FROM generate_series(1, :rows) g
+    """), {"rows": rows})
+    conn.execute(text(f"ANALYZE {SCHEMA}.packing_items"))
+
+
+def time_poll(conn, runs: int, limit: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(text(POLL_SQL), {"limit": limit}).all()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def set_index(conn, enabled: bool) -> None:
+    conn.execute(text(f"DROP INDEX IF EXISTS {SCHEMA}.packing_items_ready_end_time_idx"))
+    if enabled:
+        conn.execute(text(f"""
+            CREATE INDEX packing_items_ready_end_time_idx
+            ON {SCHEMA}.packing_items (end_time, id)
+            WHERE status = 'READY_FOR_BATCH'
+        """))
+    conn.execute(text(f"ANALYZE {SCHEMA}.packing_items"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="cumulative history sizes")
+    parser.add_argument("--ready", type=int, default=200, help="READY_FOR_BATCH rows")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=settings.BATCH_SIZE)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        setup(conn, args.ready)
+
+        print(f"{'history rows':>14} {'no index (ms)':>15} {'partial index (ms)':>20}")
+        total = 0
+        for size in (int(s) for s in args.sizes.split(",")):
+            grow_history(conn, size - total)
+            total = size
+
+            set_index(conn, False)
+            without = time_poll(conn, args.runs, args.limit)
+            set_index(conn, True)
+            with_index = time_poll(conn, args.runs, args.limit)
+            print(f"{total:>14} {without:>15.3f} {with_index:>20.3f}")
+
+        plan = conn.execute(text("EXPLAIN " + POLL_SQL), {"limit": args.limit}).scalars().all()
+        print("\nPlan with partial index:")
+        print("\n".join(plan))
+
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
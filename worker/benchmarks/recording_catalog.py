@@ -0,0 +1,105 @@
+"""Benchmark segment searches with the recording catalog against a simulated NVR.
+
+Replays a day of short packing items on one camera: 10-minute recordings,
+items every --interval seconds lasting 5-20 seconds, each searched once
+NVR_FLUSH_SECONDS after it ended, like the batch loop does. The simulated
+NVR answers after --device-ms, a typical digest-authenticated ISAPI round
+trip. Reports device searches and total search time with and without the
+catalog, and the cost of a local lookup on the full day.
+
+    uv run python -m benchmarks.recording_catalog --items 2000 --device-ms 300
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from config import settings
+from services.recording_catalog import RecordingCatalog
+from services.utils import parse_time
+
+SEGMENT_MINUTES = 10
+DAY_START = datetime(2024, 1, 1)
+
+
+def isapi(t: datetime) -> str:
+    return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SimulatedNvr:
+    """10-minute recordings around the clock, recorded up to `now`."""
+
+    def __init__(self, device_seconds: float):
+        self.device_seconds = device_seconds
+        self.now = DAY_START
+        self.searches = 0
+
+    def search(self, start_time: str, end_time: str) -> list[dict[str, str | None]]:
+        self.searches += 1
+        time.sleep(self.device_seconds)
+        start, end = parse_time(start_time), parse_time(end_time)
+        first = DAY_START + timedelta(
+            minutes=SEGMENT_MINUTES * int((start - DAY_START).total_seconds() // (SEGMENT_MINUTES * 60))
+        )
+        segs = []
+        seg_start = first
+        while seg_start < min(end, self.now):
+            seg_end = min(seg_start + timedelta(minutes=SEGMENT_MINUTES), self.now)
+            segs.append({"playbackURI": f"rtsp://nvr/{isapi(seg_start)}", "start": isapi(seg_start), "end": isapi(seg_end)})
+            seg_start += timedelta(minutes=SEGMENT_MINUTES)
+        return segs
+
+
+def replay(items: list[tuple[datetime, datetime]], device_seconds: float, use_catalog: bool) -> tuple[int, float]:
+    """Device searches and total seconds spent searching."""
+    nvr = SimulatedNvr(device_seconds)
+    catalog = RecordingCatalog()
+    elapsed = 0.0
+    for item_start, item_end in items:
+        nvr.now = item_end + timedelta(seconds=settings.NVR_FLUSH_SECONDS)
+        start = time.perf_counter()
+        if use_catalog:
+            catalog.search(isapi(item_start), isapi(item_end), nvr.search)
+        else:
+            nvr.search(isapi(item_start), isapi(item_end))
+        elapsed += time.perf_counter() - start
+    return nvr.searches, elapsed
+
+
+def lookup_cost(items: list[tuple[datetime, datetime]], lookups: int) -> float:
+    """Microseconds per search answered from a catalog holding the whole day."""
+    nvr = SimulatedNvr(0)
+    nvr.now = DAY_START + timedelta(days=1)
+    catalog = RecordingCatalog()
+    catalog.search(isapi(DAY_START), isapi(nvr.now), nvr.search)
+
+    sample = random.choices(items, k=lookups)
+    start = time.perf_counter()
+    for item_start, item_end in sample:
+        catalog.search(isapi(item_start), isapi(item_end), nvr.search)
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--interval", type=float, default=40, help="seconds between item starts")
+    parser.add_argument("--device-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    random.seed(0)
+    items = []
+    for i in range(args.items):
+        item_start = DAY_START + timedelta(seconds=i * args.interval)
+        items.append((item_start, item_start + timedelta(seconds=random.uniform(5, 20))))
+
+    print(f"{args.items} items, simulated NVR search {args.device_ms:.0f} ms")
+    print(f"{'mode':>10} {'device searches':>16} {'search time (s)':>16}")
+    for name, use_catalog in (("device", False), ("catalog", True)):
+        searches, elapsed = replay(items, args.device_ms / 1000, use_catalog)
+        print(f"{name:>10} {searches:>16} {elapsed:>16.1f}")
+    print(f"local lookup on a full day: {lookup_cost(items, 10_000):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark segment download throughput: iter_content vs readinto + write-behind.
+
+Serves a random payload from a local HTTP server and downloads it with
+5 parallel downloads per run, like segment_downloader, once with the
+previous iter_content loop and once with HikvisionClient's write-behind download.
+Loopback takes the network out, so this measures the copy and write
+overhead per byte; point --dir at the disk TEMP_VIDEO_DIR lives on.
+
+    uv run python -m benchmarks.segment_download --size-mb 256 --runs 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.hikvision_client import HikvisionClient
+
+PARALLEL = 5
+
+
+def serve(payload: bytes) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            view = memoryview(payload)
+            for offset in range(0, len(view), 1024 * 1024):
+                self.wfile.write(view[offset:offset + 1024 * 1024])
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def download_iter_content(client: HikvisionClient, url: str, outpath: str) -> None:
+    """The download loop before the write-behind writer."""
+    with client.session.get(url, stream=True, timeout=(10, 300)) as r:
+        r.raise_for_status()
+        partpath = outpath + ".part"
+        with open(partpath, "wb") as f:
+            for chunk in r.iter_content(chunk_size=1024 * 1024):
+                if chunk:
+                    f.write(chunk)
+        os.replace(partpath, outpath)
+
+
+def download_write_behind(client: HikvisionClient, url: str, outpath: str) -> None:
+    # Past the per-NVR limiter, both writers run PARALLEL downloads
+    client._download_segment(url, outpath)
+
+
+def time_run(download, client: HikvisionClient, url: str, outdir: str) -> float:
+    paths = [os.path.join(outdir, f"seg_{i}.mp4") for i in range(PARALLEL)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=PARALLEL) as exe:
+        list(exe.map(lambda path: download(client, url, path), paths))
+    elapsed = time.perf_counter() - start
+    for path in paths:
+        os.remove(path)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256, help="size of each segment")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--dir", default=None, help="download directory (default: a temp dir)")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    server = serve(payload)
+    url = f"http://127.0.0.1:{server.server_port}/segment.mp4"
+    client = HikvisionClient(f"http://127.0.0.1:{server.server_port}", "bench", "bench")
+    outdir = tempfile.mkdtemp(prefix="bench_download_", dir=args.dir)
+
+    total_mb = args.size_mb * PARALLEL
+    print(f"{PARALLEL} parallel downloads of {args.size_mb} MB, median of {args.runs} runs")
+    print(f"{'writer':>14} {'seconds':>9} {'MB/s':>9}")
+    try:
+        for name, download in (("iter_content", download_iter_content), ("write-behind", download_write_behind)):
+            # One untimed run to warm the page cache and connection pool
+            time_run(download, client, url, outdir)
+            elapsed = statistics.median(time_run(download, client, url, outdir) for _ in range(args.runs))
+            print(f"{name:>14} {elapsed:>9.3f} {total_mb / elapsed:>9.1f}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(outdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark worker startup: imports, time to /health and time to /ready.
+
+Starts `python main.py` on a spare port with the current .env, polls the
+endpoints and stops it with SIGTERM, several times. Also times importing
+main (what runs before the port is bound) against importing the
+processing modules, which main used to import eagerly.
+
+    uv run python -m benchmarks.startup --runs 5 --port 18080
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+WORKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(module: str, runs: int) -> float:
+    """Median seconds for a fresh interpreter to import module."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=WORKER_DIR, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def status_of(url: str) -> int | None:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def time_startup(port: int, timeout: float) -> tuple[float | None, float | None]:
+    """Seconds from spawn until /health and /ready return 200."""
+    env = {**os.environ, "WORKER_HOST": "127.0.0.1", "WORKER_PORT": str(port)}
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=WORKER_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    health = ready = None
+    try:
+        while time.perf_counter() - start < timeout and process.poll() is None:
+            if health is None and status_of(f"http://127.0.0.1:{port}/health") == 200:
+                health = time.perf_counter() - start
+            if health is not None and status_of(f"http://127.0.0.1:{port}/ready") == 200:
+                ready = time.perf_counter() - start
+                break
+            time.sleep(0.02)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return health, ready
+
+
+def fmt(value: float | None) -> str:
+    return f"{value:.3f}" if value is not None else "timeout"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for /ready")
+    args = parser.parse_args()
+
+    print(f"{'import':>28} {'median (s)':>12}")
+    for module in ("main", "jobs.batch_processor"):
+        print(f"{module:>28} {time_import(module, args.runs):>12.3f}")
+
+    print(f"\n{'run':>4} {'/health (s)':>12} {'/ready (s)':>12}")
+    healths, readies = [], []
+    for run in range(1, args.runs + 1):
+        health, ready = time_startup(args.port, args.timeout)
+        print(f"{run:>4} {fmt(health):>12} {fmt(ready):>12}")
+        if health is not None:
+            healths.append(health)
+        if ready is not None:
+            readies.append(ready)
+
+    print(
+        f"{'med':>4} {fmt(statistics.median(healths) if healths else None):>12} "
+        f"{fmt(statistics.median(readies) if readies else None):>12}"
+    )
+
+
+if __name__ == "__main__":
+    main()
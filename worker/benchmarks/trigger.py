@@ -0,0 +1,81 @@
+"""Benchmark POST /trigger requests/sec and latency against a running worker.
+
+Each client thread keeps one HTTP connection open and posts triggers for
+the given packing item. Without --packing-item-id a random ID is used, so
+every request does the full lookup and returns 404 without queueing work.
+Run it once with the worker idle and once while a batch is processing to
+see how much processing load leaks into API latency.
+
+    uv run python -m benchmarks.trigger --url http://localhost:8001 --concurrency 1,8,32
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+
+def client(url: str, body: bytes, stop_at: float, latencies: list[float], statuses: dict[int, int]) -> None:
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    local: list[float] = []
+    local_statuses: dict[int, int] = {}
+    try:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            conn.request("POST", "/trigger", body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            local.append(time.perf_counter() - start)
+            local_statuses[response.status] = local_statuses.get(response.status, 0) + 1
+    finally:
+        conn.close()
+    latencies.extend(local)
+    for code, count in local_statuses.items():
+        statuses[code] = statuses.get(code, 0) + count
+
+
+def run(url: str, body: bytes, concurrency: int, seconds: float) -> tuple[float, float, float, dict[int, int]]:
+    """Requests/sec, p50 and p99 latency in ms, and response status counts."""
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    stop_at = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=client, args=(url, body, stop_at, latencies, statuses))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    return len(latencies) / elapsed, p50, p99, statuses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--packing-item-id", default=None, help="default: a random (missing) ID")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    body = json.dumps({"packing_item_id": args.packing_item_id or str(uuid.uuid4())}).encode()
+
+    print(f"{'clients':>8} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}  statuses")
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        rps, p50, p99, statuses = run(args.url, body, concurrency, args.seconds)
+        print(f"{concurrency:>8} {rps:>9.1f} {p50:>9.2f} {p99:>9.2f}  {statuses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,14 +25,118 @@ class Settings(BaseSettings):
     BATCH_SIZE: int = 10
     TEMP_VIDEO_DIR: str = "/tmp/cctv"
     EXACT_CUT: bool = False
+    # Processing processes, cameras are sharded across them (1 = single process)
+    WORKERS: int = 1
+
+    # Output profiles: default profile name (empty = "exact" if EXACT_CUT else
+    # "native"), "camera_or_workstation_id=profile,..." overrides and custom
+    # profiles as JSON {"name": {"height": 720, "max_bitrate": "1500k", ...}}
+    OUTPUT_PROFILE: str = ""
+    OUTPUT_PROFILE_MAP: str = ""
+    OUTPUT_PROFILES: dict[str, dict[str, str | int | bool]] = {}
+
+    # Dashboard artifacts written by the cut's ffmpeg pass: a poster JPEG
+    # POSTER_OFFSET_SECONDS into the clip, and a preview rendition encoded
+    # with PREVIEW_PROFILE (empty = no preview)
+    POSTER_ENABLED: bool = False
+    POSTER_OFFSET_SECONDS: float = 1.0
+    POSTER_WIDTH: int = 640
+    PREVIEW_PROFILE: str = ""
+
+    # Archive packing: clips up to ARCHIVE_PACK_MAX_CLIP_SECONDS are appended
+    # into one object per camera and hour, uploaded once it reaches
+    # ARCHIVE_PACK_MAX_BYTES or ARCHIVE_PACK_MAX_AGE_SECONDS
+    ARCHIVE_PACK_ENABLED: bool = False
+    ARCHIVE_PACK_MAX_CLIP_SECONDS: int = 20
+    ARCHIVE_PACK_MAX_BYTES: int = 268_435_456
+    ARCHIVE_PACK_MAX_AGE_SECONDS: int = 900
+    ARCHIVE_FLUSH_INTERVAL_SECONDS: int = 30
+
+    # ffmpeg scheduling (0 = encode slots from the cgroup CPU quota)
+    FFMPEG_MAX_ENCODES: int = 0
+    FFMPEG_ENCODE_NICE: int = 10
+    # ffmpeg jobs without progress for this long are killed
+    FFMPEG_STALL_SECONDS: int = 60
+    FFMPEG_STDERR_LINES: int = 20
+
+    # Scheduling: clip due end_time + SLA_SECONDS, candidates considered per batch
+    SLA_SECONDS: int = 900
+    SCHEDULER_CANDIDATES: int = 50
+
+    # Automatic retry for transient failures
+    RETRY_MAX_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY_SECONDS: int = 60
+    RETRY_MAX_DELAY_SECONDS: int = 3600
+    NVR_FLUSH_SECONDS: int = 120
+
+    # Disk budget for TEMP_VIDEO_DIR
+    ESTIMATED_BITRATE_BPS: int = 4_000_000
+    DISK_RESERVE_TIMEOUT_SECONDS: int = 300
+
+    # RAM-backed staging tier for small items (0 disables)
+    MEMORY_STAGING_DIR: str = "/dev/shm/cctv"
+    MEMORY_STAGING_BYTES: int = 268_435_456
+
+    # Prefetch of footage for packings still in progress
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_INTERVAL_SECONDS: int = 30
+    SEGMENT_CACHE_TTL_SECONDS: int = 3600
+
+    # Continuous ring buffer recording (comma-separated camera IDs, empty disables)
+    RING_BUFFER_CAMERAS: str = ""
+    RING_BUFFER_RETENTION_SECONDS: int = 1800
+    RING_BUFFER_SEGMENT_SECONDS: int = 10
+    # "rtsp" pulls the camera stream, "synthetic" records an ffmpeg test pattern
+    RING_BUFFER_SOURCE: str = "rtsp"
+    RING_BUFFER_RTSP_PORT: int = 554
+
+    # Graceful drain: seconds in-flight items get to finish on SIGTERM or POST /admin/drain
+    DRAIN_TIMEOUT_SECONDS: int = 120
+
+    # Write-behind status recorder
+    STATUS_FLUSH_INTERVAL_SECONDS: int = 2
+
+    # Work dir janitor
+    WORKDIR_TTL_SECONDS: int = 86400
+    JANITOR_INTERVAL_SECONDS: int = 60
+    JANITOR_MAX_DELETIONS: int = 20
+
+    # Cluster of worker nodes sharing the database
+    NODE_ID: str = ""
+    HEARTBEAT_INTERVAL_SECONDS: int = 5
+    NODE_TIMEOUT_SECONDS: int = 15
+
+    # Segment downloads: buffer size and buffers per download for the write-behind writer
+    DOWNLOAD_BUFFER_BYTES: int = 1_048_576
+    DOWNLOAD_WRITE_BUFFERS: int = 4
+    # Parallel downloads per NVR, adjusted between MIN and MAX from measured
+    # throughput and errors (AIMD), starting at INITIAL
+    DOWNLOAD_PARALLEL_INITIAL: int = 2
+    DOWNLOAD_PARALLEL_MIN: int = 1
+    DOWNLOAD_PARALLEL_MAX: int = 10
 
     # Hikvision
     TRACK_ID: str = "101"
+    CAMERA_CONNECT_RETRIES: int = 1
+
+    # Local catalog of searched recordings per camera, searches only ask the
+    # NVR for windows it doesn't cover; entries older than MAX_AGE before the
+    # newest recording are dropped
+    RECORDING_CATALOG_ENABLED: bool = True
+    RECORDING_CATALOG_MAX_AGE_SECONDS: int = 86400
+
+    # Camera circuit breaker
+    CIRCUIT_FAILURE_THRESHOLD: int = 3
+    CIRCUIT_OPEN_SECONDS: int = 30
+    CIRCUIT_PROBE_INTERVAL_SECONDS: int = 5
+    CIRCUIT_PROBE_TIMEOUT_SECONDS: float = 3.0
 
     # HTTP API
     WORKER_HOST: str = "0.0.0.0"
     WORKER_PORT: int = 8001
     AUTO_BATCH_ENABLED: bool = True
+    # Read-only connections (and threads) for API lookups, separate from processing
+    API_DB_POOL_SIZE: int = 4
 
 
 settings = Settings()
@@ -62,6 +166,9 @@ def validate_config() -> None:
     if not settings.DATABASE_URL:
         errors.append("DATABASE_URL is required")
 
+    from services.output_profiles import validate_profiles
+    errors.extend(validate_profiles())
+
     if errors:
         for error in errors:
             print(f"ERROR: {error}", file=sys.stderr)
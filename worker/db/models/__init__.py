@@ -10,6 +10,7 @@ from db.models.packing_item import PackingItem
 from db.models.mini_clip import MiniClip
 from db.models.batch_job import BatchJob
 from db.models.batch_job_item import BatchJobItem
+from db.models.worker_node import WorkerNode
 
 __all__ = [
     "PackingStatus",
@@ -22,4 +23,5 @@ __all__ = [
     "MiniClip",
     "BatchJob",
     "BatchJobItem",
+    "WorkerNode",
 ]
@@ -26,7 +26,9 @@ class BatchJob(Base):
     started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     status: Mapped[BatchJobStatus] = mapped_column(
-        Enum(BatchJobStatus), default=BatchJobStatus.RUNNING, nullable=False
+        Enum(BatchJobStatus, name="enum_batch_job_status"),
+        default=BatchJobStatus.RUNNING,
+        nullable=False,
     )
 
     total_items: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
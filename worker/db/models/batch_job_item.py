@@ -32,7 +32,9 @@ class BatchJobItem(Base):
     )
 
     status: Mapped[BatchItemStatus] = mapped_column(
-        Enum(BatchItemStatus), default=BatchItemStatus.PENDING, nullable=False
+        Enum(BatchItemStatus, name="enum_batch_item_status"),
+        default=BatchItemStatus.PENDING,
+        nullable=False,
     )
     error_message: Mapped[str | None] = mapped_column(Text)
     started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
@@ -31,12 +31,20 @@ class MiniClip(Base):
         UUID(as_uuid=True), ForeignKey("cameras.id"), nullable=False
     )
     storage_path: Mapped[str] = mapped_column(String(500), nullable=False)
+    # Range of the clip inside a pack object (ARCHIVE_PACK_ENABLED), None for a clip of its own
+    byte_offset: Mapped[int | None] = mapped_column(BigInteger)
+    byte_length: Mapped[int | None] = mapped_column(BigInteger)
+    # Dashboard artifacts cut in the same ffmpeg pass, None when disabled
+    poster_path: Mapped[str | None] = mapped_column(String(500))
+    preview_path: Mapped[str | None] = mapped_column(String(500))
     duration_sec: Mapped[int | None] = mapped_column(Integer)
     filesize_bytes: Mapped[int | None] = mapped_column(BigInteger)
 
     generated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     status: Mapped[MiniClipStatus] = mapped_column(
-        Enum(MiniClipStatus), default=MiniClipStatus.PENDING, nullable=False
+        Enum(MiniClipStatus, name="enum_mini_clip_status"),
+        default=MiniClipStatus.PENDING,
+        nullable=False,
     )
 
     packing_item: Mapped[PackingItem] = relationship("PackingItem", back_populates="mini_clip")
@@ -4,7 +4,7 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Enum, ForeignKey, String, func, text
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, String, Text, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -19,6 +19,15 @@ if TYPE_CHECKING:
 
 class PackingItem(Base):
     __tablename__ = "packing_items"
+    __table_args__ = (
+        # Batch selection scans only the ready queue, oldest first, however large the history grows
+        Index(
+            "packing_items_ready_end_time_idx",
+            "end_time",
+            "id",
+            postgresql_where=text("status = 'READY_FOR_BATCH'"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -37,9 +46,16 @@ class PackingItem(Base):
     end_time: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     status: Mapped[PackingStatus] = mapped_column(
-        Enum(PackingStatus), default=PackingStatus.PENDING, nullable=False
+        Enum(PackingStatus, name="enum_packing_status"),
+        default=PackingStatus.PENDING,
+        nullable=False,
     )
 
+    # Automatic retry tracking for transient failures
+    retry_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    last_error: Mapped[str | None] = mapped_column(Text)
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -6,9 +6,21 @@ from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from config import settings
 
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Loaded items stay usable across the per-stage commits without being re-selected
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
+# Small read-only pool for the HTTP API, so trigger lookups never wait behind
+# connections held by long processing transactions
+api_engine = create_engine(
+    settings.DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=settings.API_DB_POOL_SIZE,
+    max_overflow=0,
+    execution_options={"postgresql_readonly": True},
+)
+ApiSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=api_engine)
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -1,14 +1,15 @@
+import functools
 import hashlib
 
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-
 from config import settings
 
 
+@functools.lru_cache(maxsize=1)
 def get_key() -> bytes:
     """Derive 32-byte key using scrypt (same as API).
 
     Node.js scryptSync defaults: N=16384 (2^14), r=8, p=1
+    Derived once per process, scrypt is deliberately slow.
     """
     key = settings.CAMERA_ENCRYPTION_KEY
     if not key:
@@ -26,6 +27,8 @@ def get_key() -> bytes:
 
 def decrypt_password(encrypted_data: str) -> str:
     """Decrypt password using AES-256-GCM (format: iv:authTag:encrypted in hex)."""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
     key = get_key()
 
     parts = encrypted_data.split(":")
@@ -0,0 +1,85 @@
+import logging
+import time
+
+from config import settings
+from db.session import SessionLocal
+from repositories import mini_clip_repository
+from services import archive_pack
+from services.metrics import metrics
+from services.uploader import upload_to_gcs
+
+logger = logging.getLogger(__name__)
+
+# Flag to signal archive loop to stop
+archive_loop_shutdown = False
+
+
+def flush(max_age_seconds: float) -> int:
+    """Seal packs older than max_age_seconds and upload every sealed pack. Returns count uploaded."""
+    archive_pack.seal_due(max_age_seconds)
+
+    uploaded = 0
+    for pack_path in archive_pack.sealed_packs():
+        try:
+            with archive_pack.claim(pack_path) as index:
+                if index is None:
+                    continue
+                if index["entries"]:
+                    _upload_pack(pack_path, index)
+                    uploaded += 1
+                archive_pack.remove(pack_path)
+        except Exception as e:
+            # Stays sealed on disk, the next pass retries it
+            logger.error(f"Error uploading pack {pack_path}: {e}")
+
+    metrics.set_gauge("archive_pending_bytes", archive_pack.pending_bytes())
+    return uploaded
+
+
+def _upload_pack(pack_path: str, index: dict) -> None:
+    """One object for all the pack's clips, then their mini_clip rows go UPLOADED."""
+    storage_path = upload_to_gcs(pack_path, index["bucket"], index["object"])
+
+    db = SessionLocal()
+    try:
+        packing_item_ids = [entry["packing_item_id"] for entry in index["entries"]]
+        marked = mini_clip_repository.mark_uploaded(db, packing_item_ids, storage_path)
+    finally:
+        db.close()
+
+    metrics.incr("archive_packs_uploaded")
+    metrics.incr("archive_pack_bytes", index["bytes"])
+    logger.info(f"Uploaded pack {index['object']} with {len(index['entries'])} clips, {marked} marked uploaded")
+
+
+def run_archive_loop() -> None:
+    """Upload packs of small clips on a size or age threshold in a background thread."""
+    logger.info("Archive loop started")
+
+    while not archive_loop_shutdown:
+        try:
+            flush(settings.ARCHIVE_PACK_MAX_AGE_SECONDS)
+        except Exception as e:
+            logger.error(f"Error flushing archive packs: {e}")
+
+        for _ in range(settings.ARCHIVE_FLUSH_INTERVAL_SECONDS):
+            if archive_loop_shutdown:
+                break
+            time.sleep(1)
+
+    logger.info("Archive loop stopped")
+
+
+def flush_all() -> None:
+    """Seal and upload every pack once in-flight items drained, so no clip is left only on local disk."""
+    try:
+        uploaded = flush(0)
+        logger.info(f"Uploaded {uploaded} archive packs on shutdown")
+    except Exception as e:
+        logger.error(f"Error flushing archive packs on shutdown: {e}")
+
+
+def stop_archive_loop() -> None:
+    """Signal the archive loop to stop."""
+    global archive_loop_shutdown
+    archive_loop_shutdown = True
@@ -1,17 +1,30 @@
 import logging
 import os
 import time
+import uuid
+from datetime import datetime, timezone
 
 from sqlalchemy.orm import Session
 
 from config import settings
 from db.models import PackingItem, PackingStatus
-from repositories import camera_repository, packing_repository, batch_job_repository, mini_clip_repository
-from services.hikvision_client import HikvisionClient
+from jobs import drain, retry_scheduler, scheduler
+from jobs.pipeline import ItemContext, Pipeline, StageTimer
+from jobs.profiler import item_profiler
+from repositories import camera_repository, packing_repository, batch_job_repository, worker_node_repository
+from repositories.status_recorder import status_recorder
+from services.circuit_breaker import CameraUnavailableError, open_circuits
+from services.errors import PermanentError, TransientError
+from services.hikvision_client import get_client
+from services import archive_pack, output_profiles, ring_buffer
 from services.segment_downloader import download_segments
 from services.ffmpeg_processor import merge_segments, cut_exact
 from services.uploader import upload_to_gcs
-from services.utils import ensure_dirs, clean, validate_times, check_disk_space
+from services.metrics import metrics
+from services.sharding import owned_camera_ids
+from services.disk_budget import Reservation, budget_for, estimate_item_bytes, memory_budget
+from services.utils import clean, validate_times, check_disk_space
+from services.workdir import Stage, WorkDir, open_workdir
 
 logger = logging.getLogger(__name__)
 
@@ -19,116 +32,330 @@ logger = logging.getLogger(__name__)
 batch_loop_shutdown = False
 
 
-def process_single_item(
-    db: Session,
-    packing_item: PackingItem,
-    batch_item_id: int,
-) -> bool:
-    """Process a single packing item. Returns True if successful."""
-    # Track temp directories for cleanup
-    temp_dirs: list[str] = []
+def _reserve_scratch(workdir: WorkDir, needed: int) -> Reservation:
+    """Reserve scratch space, staging the item on the RAM tier when it fits."""
+    if (
+        memory_budget is not None
+        and workdir.root != memory_budget.path
+        and not workdir.reached(Stage.DOWNLOADED)
+    ):
+        reservation = memory_budget.try_reserve(workdir.tag, needed)
+        if reservation is not None:
+            workdir.relocate(memory_budget.path)
+            logger.debug(f"Staging {workdir.tag} in memory ({needed} bytes)")
+            return reservation
 
-    try:
-        batch_job_repository.mark_item_processing(db, batch_item_id)
+    return budget_for(workdir.root).reserve(workdir.tag, needed)
 
-        # Get camera config
-        workstation = packing_item.workstation
-        camera_id = workstation.camera_id
-        camcfg = camera_repository.get_camera_config(db, camera_id)
 
-        if camcfg is None:
-            raise Exception(f"Camera {camera_id} not found")
+def _observe_time_to_clip(packing_item: PackingItem) -> None:
+    """Seconds from the end of packing until the clip is recorded."""
+    time_to_clip = (datetime.now(timezone.utc) - packing_item.end_time).total_seconds()
+    metrics.observe("time_to_clip_seconds", time_to_clip)
 
-        if packing_item.start_time is None or packing_item.end_time is None:
-            raise Exception("Start time or end time is not set")
 
-        start_iso = packing_item.start_time.isoformat()
-        end_iso = packing_item.end_time.isoformat()
+def _prepare(ctx: ItemContext) -> None:
+    """Camera config, time range and disk checks, then open the item's work dir."""
+    packing_item = ctx.packing_item
 
-        validate_times(start_iso, end_iso)
+    # Get camera config, workstation and camera are loaded with the item
+    workstation = packing_item.workstation
+    ctx.camera_id = workstation.camera_id
+    if workstation.camera is None:
+        raise PermanentError(f"Camera {ctx.camera_id} not found")
+    ctx.camcfg = camera_repository.build_camera_config(workstation.camera)
 
-        # Check disk space before downloading
-        check_disk_space(settings.TEMP_VIDEO_DIR)
+    if packing_item.start_time is None or packing_item.end_time is None:
+        raise PermanentError("Start time or end time is not set")
 
-        # Setup directories
-        tag = f"{camera_id}_{packing_item.id}"
-        raw_dir = os.path.join(settings.TEMP_VIDEO_DIR, "raw", tag)
-        merged_dir = os.path.join(settings.TEMP_VIDEO_DIR, "merged", tag)
-        output_dir = os.path.join(settings.TEMP_VIDEO_DIR, "output", tag)
-        temp_dirs = [raw_dir, merged_dir, output_dir]
-        ensure_dirs(temp_dirs)
+    start_iso = packing_item.start_time.isoformat()
+    end_iso = packing_item.end_time.isoformat()
 
-        # Search and download segments from Hikvision
-        client = HikvisionClient(
-            camcfg["base_url"], camcfg["username"], camcfg["password"]
-        )
-        segs = client.search_segments(start_iso, end_iso)
+    validate_times(start_iso, end_iso)
+
+    # Check disk space before downloading
+    check_disk_space(settings.TEMP_VIDEO_DIR)
+
+    # Later stages resume from the last checkpoint of the work dir
+    tag = f"{ctx.camera_id}_{packing_item.id}"
+    ctx.workdir = open_workdir(tag, start_iso, end_iso)
+    ctx.duration = (packing_item.end_time - packing_item.start_time).total_seconds()
+
+
+def _search(ctx: ItemContext) -> None:
+    workdir = ctx.workdir
+    segs = workdir.manifest["segments"] if workdir.reached(Stage.SEARCHED) else None
+    if segs is not None and not workdir.reached(Stage.DOWNLOADED) and not ring_buffer.available(segs):
+        # Buffered segments were pruned before the download, search again
+        segs = None
+
+    if segs is None:
+        # Cut from the local ring buffer when it covers the window, else search Hikvision
+        segs = ring_buffer.lookup(ctx.camera_id, ctx.packing_item.start_time, ctx.packing_item.end_time)
+        if segs is None:
+            segs = get_client(ctx.camcfg).search_segments(workdir.manifest["start"], workdir.manifest["end"])
         if not segs:
-            raise Exception("No video segments found")
-
-        seg_files = download_segments(camcfg, segs, raw_dir)
-
-        # Merge segments
-        merged_path = os.path.join(merged_dir, "merged.mp4")
-        merge_segments([f[0] for f in seg_files], merged_path)
-
-        # Calculate offset and duration
-        file_start_time = seg_files[0][1]
-        req_start = packing_item.start_time.replace(tzinfo=None)
-        start_offset = (req_start - file_start_time).total_seconds()
-        if start_offset < 0:
-            start_offset = 0
-
-        duration = (packing_item.end_time - packing_item.start_time).total_seconds()
-
-        # Cut exact clip
-        final_path = os.path.join(output_dir, "final.mp4")
-        cut_exact(merged_path, final_path, start_offset, duration, settings.EXACT_CUT)
-
-        # Upload to GCS
-        blob_name = f"cctv/{camera_id}/{tag}.mp4"
-        gcs_url = upload_to_gcs(final_path, settings.GCS_BUCKET, blob_name)
-
-        # Get file size
-        filesize = os.path.getsize(final_path)
-
-        # Create mini_clip record
-        mini_clip_repository.create_mini_clip(
-            db=db,
-            packing_item_id=packing_item.id,
-            camera_id=camera_id,
-            storage_path=gcs_url,
-            duration_sec=int(duration),
-            filesize_bytes=filesize,
+            # Usually the NVR hasn't flushed the recording yet
+            raise TransientError("No video segments found")
+        workdir.checkpoint(Stage.SEARCHED, segments=segs)
+    ctx.segments = segs
+
+
+def _reserve(ctx: ItemContext) -> None:
+    """Reserve disk for what the remaining stages will write before downloading."""
+    workdir = ctx.workdir
+    estimate = ctx.estimate = estimate_item_bytes(ctx.segments, ctx.duration)
+    if workdir.reached(Stage.CUT):
+        needed = 0
+    elif workdir.reached(Stage.MERGED):
+        needed = estimate.output
+    elif workdir.reached(Stage.DOWNLOADED):
+        needed = estimate.merged + estimate.output
+    else:
+        needed = estimate.total
+    ctx.reservation = _reserve_scratch(workdir, needed)
+
+
+def _download(ctx: ItemContext) -> None:
+    workdir = ctx.workdir
+    if workdir.reached(Stage.DOWNLOADED):
+        ctx.seg_files = [
+            (path, datetime.fromisoformat(seg_start))
+            for path, seg_start in workdir.manifest["seg_files"]
+        ]
+    else:
+        ctx.seg_files = download_segments(ctx.camcfg, ctx.segments, workdir.raw_dir, ctx.camera_id)
+        workdir.checkpoint(
+            Stage.DOWNLOADED,
+            seg_files=[(path, seg_start.isoformat()) for path, seg_start in ctx.seg_files],
+        )
+    ctx.reservation.shrink(ctx.estimate.merged + ctx.estimate.output)
+
+
+def _merge(ctx: ItemContext) -> None:
+    """Merge segments, the raw files are not needed afterwards."""
+    workdir = ctx.workdir
+    if not workdir.reached(Stage.MERGED):
+        merge_segments([f[0] for f in ctx.seg_files], workdir.merged_path)
+        workdir.checkpoint(Stage.MERGED)
+    clean(workdir.raw_dir)
+    ctx.reservation.shrink(ctx.estimate.output)
+
+
+def _cut(ctx: ItemContext) -> None:
+    workdir = ctx.workdir
+
+    # Calculate offset
+    file_start_time = ctx.seg_files[0][1]
+    req_start = ctx.packing_item.start_time.replace(tzinfo=None)
+    start_offset = (req_start - file_start_time).total_seconds()
+    if start_offset < 0:
+        start_offset = 0
+
+    # Cut exact clip
+    if not workdir.reached(Stage.CUT):
+        profile = output_profiles.profile_for(ctx.camera_id, ctx.packing_item.workstation.id)
+        preview = output_profiles.preview_profile()
+        cut_exact(
+            workdir.merged_path,
+            workdir.final_path,
+            start_offset,
+            ctx.duration,
+            profile,
+            poster_path=workdir.poster_path if settings.POSTER_ENABLED else None,
+            poster_offset=settings.POSTER_OFFSET_SECONDS,
+            poster_width=settings.POSTER_WIDTH,
+            preview_path=workdir.preview_path if preview is not None else None,
+            preview_profile=preview,
+        )
+        workdir.checkpoint(
+            Stage.CUT,
+            profile=profile.name,
+            poster=settings.POSTER_ENABLED,
+            preview=preview is not None,
+        )
+    clean(workdir.merged_dir)
+
+    # Nothing else is written to scratch
+    ctx.reservation.release()
+    ctx.reservation = None
+
+
+def _upload(ctx: ItemContext) -> None:
+    workdir = ctx.workdir
+    packed = workdir.manifest.get("packed")
+    if packed is not None:
+        # Appended to a pack by an earlier attempt
+        ctx.gcs_url = workdir.manifest["gcs_url"]
+        ctx.packed = archive_pack.reopen(packed["path"], ctx.gcs_url, packed["offset"], packed["length"])
+
+    if workdir.reached(Stage.UPLOADED):
+        ctx.gcs_url = workdir.manifest["gcs_url"]
+        ctx.poster_url = workdir.manifest.get("poster_url")
+        ctx.preview_url = workdir.manifest.get("preview_url")
+    else:
+        blob_prefix = f"cctv/{ctx.camera_id}/{workdir.tag}"
+        if ctx.packed is None and archive_pack.packable(ctx.duration):
+            # Small clip: appended to the camera's pack for the hour, uploaded with it later
+            hour = ctx.packing_item.start_time.strftime("%Y%m%d%H")
+            ctx.packed = archive_pack.append(ctx.camera_id, hour, workdir.final_path, ctx.packing_item.id)
+            ctx.gcs_url = ctx.packed.storage_path
+            # Recorded right away, a retry must not append the clip a second time
+            workdir.checkpoint(
+                Stage.CUT,
+                gcs_url=ctx.gcs_url,
+                packed={"path": ctx.packed.pack_path, "offset": ctx.packed.byte_offset, "length": ctx.packed.byte_length},
+            )
+            metrics.incr("archive_clips_packed")
+        elif ctx.packed is None:
+            ctx.gcs_url = upload_to_gcs(workdir.final_path, settings.GCS_BUCKET, f"{blob_prefix}.mp4")
+        # Next to the clip, through the same cached client
+        if workdir.manifest.get("poster"):
+            ctx.poster_url = upload_to_gcs(workdir.poster_path, settings.GCS_BUCKET, f"{blob_prefix}.jpg")
+        if workdir.manifest.get("preview"):
+            ctx.preview_url = upload_to_gcs(workdir.preview_path, settings.GCS_BUCKET, f"{blob_prefix}_preview.mp4")
+        workdir.checkpoint(
+            Stage.UPLOADED,
+            gcs_url=ctx.gcs_url,
+            poster_url=ctx.poster_url,
+            preview_url=ctx.preview_url,
         )
+    ctx.filesize = os.path.getsize(workdir.final_path)
+    # Egress per profile, to weigh profiles by bytes uploaded
+    metrics.incr(f"output_{workdir.manifest.get('profile', 'native')}_bytes", ctx.filesize)
+    if ctx.poster_url is not None:
+        metrics.incr("output_poster_bytes", os.path.getsize(workdir.poster_path))
+    if ctx.preview_url is not None:
+        metrics.incr("output_preview_bytes", os.path.getsize(workdir.preview_path))
+
+
+def _complete(ctx: ItemContext) -> None:
+    """Create mini_clip record and mark CLIP_GENERATED, durable before the work dir goes."""
+    packed = ctx.packed
+    # The recorder releases the pack once the row is committed, so the pack is
+    # never uploaded (and its rows marked) while this row is still buffered
+    ctx.packed = None
+    written = status_recorder.complete_item(
+        packing_item_id=ctx.packing_item.id,
+        batch_item_id=ctx.batch_item_id,
+        camera_id=ctx.camera_id,
+        storage_path=ctx.gcs_url,
+        duration_sec=int(ctx.duration),
+        filesize_bytes=ctx.filesize,
+        poster_path=ctx.poster_url,
+        preview_path=ctx.preview_url,
+        byte_offset=packed.byte_offset if packed is not None else None,
+        byte_length=packed.byte_length if packed is not None else None,
+        uploaded=packed is None or not packed.pending,
+        on_written=packed.release if packed is not None else None,
+    )
+    if written:
+        ctx.workdir.discard()
+    # Otherwise kept, if the process dies before the flush loop writes the
+    # row, the item is picked up again and resumes from its upload checkpoint
+    _observe_time_to_clip(ctx.packing_item)
+
+
+# Shared by the batch loop and manual triggers, stages skip what the work dir has checkpointed
+clip_pipeline = Pipeline([
+    ("prepare", _prepare),
+    ("search", _search),
+    ("reserve", _reserve),
+    ("download", _download),
+    ("merge", _merge),
+    ("cut", _cut),
+    ("upload", _upload),
+    ("complete", _complete),
+])
+# Drain first, so an interrupted stage doesn't start the other hooks
+clip_pipeline.add_hook(drain.DrainHook())
+clip_pipeline.add_hook(StageTimer())
+clip_pipeline.add_hook(item_profiler)
 
-        # Update packing item status
-        packing_repository.mark_as_clip_generated(db, packing_item.id)
 
-        batch_job_repository.mark_item_success(db, batch_item_id)
-        logger.info(f"Successfully processed packing_item_id={packing_item.id}")
+def process_single_item(
+    packing_item: PackingItem,
+    batch_item_id: uuid.UUID | None = None,
+) -> bool:
+    """Process a single packing item through the clip pipeline. Returns True if successful.
+
+    batch_item_id is None for manual triggers. Status writes go through the
+    write-behind status recorder.
+    """
+    ctx = ItemContext(packing_item=packing_item, batch_item_id=batch_item_id)
+    source = "" if batch_item_id is not None else " (manual trigger)"
+
+    if drain.draining():
+        # Not claimed, another node or the next start picks it up
+        logger.info(f"Draining, leaving packing_item_id={packing_item.id} for later")
+        if batch_item_id is not None:
+            status_recorder.mark_item_deferred(batch_item_id, "Worker draining")
+        return False
+
+    try:
+        if batch_item_id is not None:
+            status_recorder.mark_item_processing(batch_item_id)
+        clip_pipeline.run(ctx)
+        logger.info(f"Successfully processed packing_item_id={packing_item.id}{source}")
         return True
 
+    except CameraUnavailableError as e:
+        # Leave the packing item READY_FOR_BATCH, it is picked up once the camera is back
+        logger.warning(f"Deferring packing_item_id={packing_item.id}: {e}")
+        if batch_item_id is not None:
+            status_recorder.mark_item_deferred(batch_item_id, str(e))
+        return False
+
     except Exception as e:
         error_msg = str(e)
+        if drain.deadline_passed():
+            # Cut short by the drain, resumes from its checkpoint without counting an attempt
+            logger.warning(f"Releasing packing_item_id={packing_item.id} at drain deadline: {error_msg}")
+            if batch_item_id is not None:
+                status_recorder.mark_item_deferred(batch_item_id, f"Worker draining: {error_msg}")
+            return False
+
         logger.error(f"Failed to process packing_item_id={packing_item.id}: {error_msg}")
-        batch_job_repository.mark_item_failed(db, batch_item_id, error_msg)
-        packing_repository.mark_as_error(db, packing_item.id)
+        if batch_item_id is not None:
+            status_recorder.mark_item_failed(batch_item_id, error_msg)
+        if not retry_scheduler.handle_failure(packing_item, e) and ctx.workdir is not None:
+            # Permanent failure, nothing worth resuming
+            ctx.workdir.discard()
         return False
 
     finally:
-        # Always cleanup temp files, even on error
-        for temp_dir in temp_dirs:
-            try:
-                clean(temp_dir)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup {temp_dir}: {cleanup_error}")
+        if ctx.reservation is not None:
+            ctx.reservation.release()
+        if ctx.packed is not None:
+            ctx.packed.release()
+        # Artifacts of transient failures stay on disk for the retry to resume from
+        if ctx.workdir is not None:
+            ctx.workdir.release()
+
+
+def owned_cameras(db: Session) -> list[uuid.UUID] | None:
+    """Cameras this node and worker process own, None when it owns every camera."""
+    live_nodes = worker_node_repository.get_live_nodes(db, settings.NODE_TIMEOUT_SECONDS)
+    return owned_camera_ids(camera_repository.get_camera_ids(db), live_nodes)
 
 
 def process_batch(db: Session) -> None:
     """Process a batch of packing items ready for clip generation."""
+    camera_ids = owned_cameras(db)
+    if camera_ids == []:
+        logger.debug("No cameras assigned to this worker")
+        return
+
     # Get items ready for batch
-    items = packing_repository.get_ready_for_batch(db, settings.BATCH_SIZE)
+    # Skip cameras with an open circuit so they don't stall the batch
+    # Fetch a wider window of candidates and let the scheduler pick the batch
+    candidates = packing_repository.get_ready_for_batch(
+        db,
+        max(settings.BATCH_SIZE, settings.SCHEDULER_CANDIDATES),
+        exclude_base_urls=open_circuits(),
+        camera_ids=camera_ids,
+    )
+    items = scheduler.schedule(candidates)[: settings.BATCH_SIZE]
 
     if not items:
         logger.debug("No items ready for batch processing")
@@ -137,35 +364,32 @@ def process_batch(db: Session) -> None:
     logger.info(f"Starting batch with {len(items)} items")
 
     # Create batch job
-    batch_job = batch_job_repository.create_batch_job(db, items)
+    batch_job_id, batch_item_ids = batch_job_repository.create_batch_job(db, items)
 
     success_count = 0
     failed_count = 0
 
     # Process each item
-    for batch_item in batch_job.items:
-        packing_item = batch_item.packing_item
-        success = process_single_item(db, packing_item, batch_item.id)
+    for packing_item in items:
+        success = process_single_item(packing_item, batch_item_ids[packing_item.id])
 
         if success:
             success_count += 1
         else:
             failed_count += 1
 
-    # Finish batch job
+    # Finish batch job once every buffered item transition is written
+    status_recorder.flush()
     batch_job_repository.finish_batch_job(
-        db, batch_job.id, success_count, failed_count
+        db, batch_job_id, success_count, failed_count
     )
 
-    logger.info(f"Batch job {batch_job.id} completed: {success_count} success, {failed_count} failed")
+    logger.info(f"Batch job {batch_job_id} completed: {success_count} success, {failed_count} failed")
 
 
 def process_single_item_by_id(db: Session, packing_item_id: str) -> bool:
     """Process a single packing item by ID (for manual trigger). Returns True if successful."""
-    # Track temp directories for cleanup
-    temp_dirs: list[str] = []
-
-    packing_item = db.query(PackingItem).filter(PackingItem.id == packing_item_id).first()
+    packing_item = packing_repository.get_with_camera(db, packing_item_id)
 
     if packing_item is None:
         logger.error(f"Packing item {packing_item_id} not found")
@@ -175,97 +399,7 @@ def process_single_item_by_id(db: Session, packing_item_id: str) -> bool:
         logger.error(f"Packing item {packing_item_id} is not ready (status: {packing_item.status.value})")
         return False
 
-    try:
-        # Get camera config
-        workstation = packing_item.workstation
-        camera_id = workstation.camera_id
-        camcfg = camera_repository.get_camera_config(db, camera_id)
-
-        if camcfg is None:
-            raise Exception(f"Camera {camera_id} not found")
-
-        if packing_item.start_time is None or packing_item.end_time is None:
-            raise Exception("Start time or end time is not set")
-
-        start_iso = packing_item.start_time.isoformat()
-        end_iso = packing_item.end_time.isoformat()
-
-        validate_times(start_iso, end_iso)
-
-        # Check disk space before downloading
-        check_disk_space(settings.TEMP_VIDEO_DIR)
-
-        # Setup directories
-        tag = f"{camera_id}_{packing_item.id}"
-        raw_dir = os.path.join(settings.TEMP_VIDEO_DIR, "raw", tag)
-        merged_dir = os.path.join(settings.TEMP_VIDEO_DIR, "merged", tag)
-        output_dir = os.path.join(settings.TEMP_VIDEO_DIR, "output", tag)
-        temp_dirs = [raw_dir, merged_dir, output_dir]
-        ensure_dirs(temp_dirs)
-
-        # Search and download segments from Hikvision
-        client = HikvisionClient(
-            camcfg["base_url"], camcfg["username"], camcfg["password"]
-        )
-        segs = client.search_segments(start_iso, end_iso)
-        if not segs:
-            raise Exception("No video segments found")
-
-        seg_files = download_segments(camcfg, segs, raw_dir)
-
-        # Merge segments
-        merged_path = os.path.join(merged_dir, "merged.mp4")
-        merge_segments([f[0] for f in seg_files], merged_path)
-
-        # Calculate offset and duration
-        file_start_time = seg_files[0][1]
-        req_start = packing_item.start_time.replace(tzinfo=None)
-        start_offset = (req_start - file_start_time).total_seconds()
-        if start_offset < 0:
-            start_offset = 0
-
-        duration = (packing_item.end_time - packing_item.start_time).total_seconds()
-
-        # Cut exact clip
-        final_path = os.path.join(output_dir, "final.mp4")
-        cut_exact(merged_path, final_path, start_offset, duration, settings.EXACT_CUT)
-
-        # Upload to GCS
-        blob_name = f"cctv/{camera_id}/{tag}.mp4"
-        gcs_url = upload_to_gcs(final_path, settings.GCS_BUCKET, blob_name)
-
-        # Get file size
-        filesize = os.path.getsize(final_path)
-
-        # Create mini_clip record
-        mini_clip_repository.create_mini_clip(
-            db=db,
-            packing_item_id=packing_item.id,
-            camera_id=camera_id,
-            storage_path=gcs_url,
-            duration_sec=int(duration),
-            filesize_bytes=filesize,
-        )
-
-        # Update packing item status
-        packing_repository.mark_as_clip_generated(db, packing_item.id)
-
-        logger.info(f"Successfully processed packing_item_id={packing_item.id} (manual trigger)")
-        return True
-
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Failed to process packing_item_id={packing_item.id}: {error_msg}")
-        packing_repository.mark_as_error(db, packing_item.id)
-        return False
-
-    finally:
-        # Always cleanup temp files, even on error
-        for temp_dir in temp_dirs:
-            try:
-                clean(temp_dir)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup {temp_dir}: {cleanup_error}")
+    return process_single_item(packing_item)
 
 
 def run_batch_loop() -> None:
@@ -0,0 +1,46 @@
+import logging
+import time
+
+from config import settings
+from services.circuit_breaker import all_breakers, probe
+
+logger = logging.getLogger(__name__)
+
+# Flag to signal probe loop to stop
+probe_loop_shutdown = False
+
+
+def probe_open_circuits() -> None:
+    """Probe every camera whose circuit has been open long enough."""
+    for breaker in all_breakers():
+        if not breaker.probe_due():
+            continue
+
+        reachable = probe(breaker.key, settings.CIRCUIT_PROBE_TIMEOUT_SECONDS)
+        if not reachable:
+            logger.debug(f"Probe failed for {breaker.key}, circuit stays open")
+        breaker.record_probe(reachable)
+
+
+def run_probe_loop() -> None:
+    """Run the camera probe loop in a background thread."""
+    logger.info("Camera probe loop started")
+
+    while not probe_loop_shutdown:
+        try:
+            probe_open_circuits()
+        except Exception as e:
+            logger.error(f"Error probing cameras: {e}")
+
+        for _ in range(settings.CIRCUIT_PROBE_INTERVAL_SECONDS):
+            if probe_loop_shutdown:
+                break
+            time.sleep(1)
+
+    logger.info("Camera probe loop stopped")
+
+
+def stop_probe_loop() -> None:
+    """Signal the probe loop to stop."""
+    global probe_loop_shutdown
+    probe_loop_shutdown = True
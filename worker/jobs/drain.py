@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+
+from jobs.pipeline import ItemContext, PipelineHook, PipelineInterrupt
+
+logger = logging.getLogger(__name__)
+
+# Seconds given to in-flight items to unwind once their ffmpeg jobs are killed
+KILL_GRACE_SECONDS = 10
+
+_draining = threading.Event()
+_deadline = 0.0
+_lock = threading.Lock()
+# Items running through the pipeline, by thread
+_in_flight: dict[int, ItemContext] = {}
+
+
+class DrainInterruptedError(PipelineInterrupt):
+    """The drain deadline passed before the item's next stage."""
+    pass
+
+
+def begin(timeout_seconds: float) -> float:
+    """Stop claiming new items, in-flight ones get until the deadline. Returns seconds left."""
+    global _deadline
+    with _lock:
+        if not _draining.is_set():
+            _deadline = time.monotonic() + timeout_seconds
+            _draining.set()
+            logger.info(f"Draining, {len(_in_flight)} items in flight, deadline in {timeout_seconds}s")
+        return max(0.0, _deadline - time.monotonic())
+
+
+def draining() -> bool:
+    return _draining.is_set()
+
+
+def deadline_passed() -> bool:
+    return _draining.is_set() and time.monotonic() >= _deadline
+
+
+def in_flight() -> int:
+    with _lock:
+        return len(_in_flight)
+
+
+class DrainHook(PipelineHook):
+    """Tracks in-flight items and stops them at a stage boundary once the deadline passed."""
+
+    def before_item(self, ctx: ItemContext) -> None:
+        with _lock:
+            _in_flight[threading.get_ident()] = ctx
+
+    def after_item(self, ctx: ItemContext, error: BaseException | None) -> None:
+        with _lock:
+            _in_flight.pop(threading.get_ident(), None)
+
+    def before_stage(self, name: str, ctx: ItemContext) -> None:
+        if deadline_passed():
+            raise DrainInterruptedError(f"Drain deadline passed before {name}")
+
+
+def wait() -> None:
+    """Wait for in-flight items until the deadline, then release what is left.
+
+    Running ffmpeg jobs are killed so their items fail fast and keep their
+    work dir checkpoints. Batch items that still did not finish are marked
+    deferred, and buffered status writes are flushed.
+    """
+    from repositories.status_recorder import status_recorder
+    from services.ffmpeg_scheduler import kill_running
+
+    while in_flight() and not deadline_passed():
+        time.sleep(0.5)
+
+    if in_flight():
+        killed = kill_running()
+        logger.warning(f"Drain deadline passed with {in_flight()} items in flight, killed {killed} ffmpeg jobs")
+        grace = time.monotonic() + KILL_GRACE_SECONDS
+        while in_flight() and time.monotonic() < grace:
+            time.sleep(0.5)
+
+    with _lock:
+        leftovers = list(_in_flight.values())
+    for ctx in leftovers:
+        # Stuck in a download or upload, the packing item stays READY_FOR_BATCH
+        logger.warning(f"Releasing packing_item_id={ctx.packing_item.id} unfinished")
+        if ctx.batch_item_id is not None:
+            status_recorder.mark_item_deferred(ctx.batch_item_id, "Worker stopped before the item finished")
+
+    try:
+        status_recorder.flush()
+    except Exception as e:
+        logger.error(f"Error flushing status writes after drain: {e}")
+    logger.info("Drain finished")
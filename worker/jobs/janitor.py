@@ -0,0 +1,50 @@
+import logging
+import time
+
+from config import settings
+from services import segment_cache
+from services.workdir import empty_trash, expire_work_dirs, scratch_roots
+
+logger = logging.getLogger(__name__)
+
+# Flag to signal janitor loop to stop
+janitor_loop_shutdown = False
+
+
+def sweep() -> None:
+    """Expire stale work dirs and cached segments and delete trashed dirs, within the per-pass budget."""
+    expired = 0
+    deleted = 0
+    for root in scratch_roots():
+        expired += expire_work_dirs(root, settings.WORKDIR_TTL_SECONDS, settings.JANITOR_MAX_DELETIONS)
+        deleted += empty_trash(root, settings.JANITOR_MAX_DELETIONS)
+    cached = segment_cache.expire(settings.SEGMENT_CACHE_TTL_SECONDS, settings.JANITOR_MAX_DELETIONS)
+    if expired or deleted or cached:
+        logger.debug(
+            f"Janitor expired {expired} work dirs and {cached} cached segments, "
+            f"deleted {deleted} trashed dirs"
+        )
+
+
+def run_janitor_loop() -> None:
+    """Run the temp dir janitor in a background thread."""
+    logger.info("Janitor loop started")
+
+    while not janitor_loop_shutdown:
+        try:
+            sweep()
+        except Exception as e:
+            logger.error(f"Error cleaning temp dirs: {e}")
+
+        for _ in range(settings.JANITOR_INTERVAL_SECONDS):
+            if janitor_loop_shutdown:
+                break
+            time.sleep(1)
+
+    logger.info("Janitor loop stopped")
+
+
+def stop_janitor_loop() -> None:
+    """Signal the janitor loop to stop."""
+    global janitor_loop_shutdown
+    janitor_loop_shutdown = True
@@ -1,26 +1,61 @@
 import logging
+import uuid
+from multiprocessing.queues import JoinableQueue
 from queue import Queue
 
-from db.session import SessionLocal
+from services.sharding import HashRing
 
 logger = logging.getLogger(__name__)
 
 # Global job queue for manual trigger requests
-job_queue: Queue[str] = Queue()
+job_queue: Queue[str] | JoinableQueue = Queue()
+
+# Per-worker queues in multi-process mode, set by the supervisor in the API process
+_shard_queues: list[JoinableQueue] | None = None
+_ring: HashRing | None = None
 
 # Flag to signal queue worker to stop
 queue_worker_shutdown = False
 
 
-def enqueue_job(packing_item_id: str) -> None:
+def use_shard_queues(queues: list[JoinableQueue]) -> None:
+    """Route manual triggers to the worker process owning the camera."""
+    global _shard_queues, _ring
+    _shard_queues = queues
+    _ring = HashRing(len(queues))
+
+
+def use_queue(queue: JoinableQueue) -> None:
+    """Consume the given queue, used by a worker process for its shard queue."""
+    global job_queue
+    job_queue = queue
+
+
+def enqueue_job(packing_item_id: str, camera_id: uuid.UUID | None = None) -> None:
     """Add a packing item ID to the processing queue."""
+    if _shard_queues is not None and _ring is not None:
+        shard = _ring.shard_for(str(camera_id))
+        _shard_queues[shard].put(packing_item_id)
+        logger.info(f"Enqueued packing_item_id={packing_item_id} for processing on worker-{shard}")
+        return
+
     job_queue.put(packing_item_id)
     logger.info(f"Enqueued packing_item_id={packing_item_id} for processing")
 
 
+def queue_size() -> int:
+    """Number of queued manual triggers, across all workers in multi-process mode."""
+    if _shard_queues is not None:
+        return sum(queue.qsize() for queue in _shard_queues)
+    return job_queue.qsize()
+
+
 def process_queue_worker() -> None:
     """Worker thread that processes jobs from the queue."""
+    from db.session import SessionLocal
+    from jobs import scheduler
     from jobs.batch_processor import process_single_item_by_id
+    from repositories import packing_repository
 
     logger.info("Queue worker started")
 
@@ -33,19 +68,40 @@ def process_queue_worker() -> None:
                 # Queue.get timeout, continue loop to check shutdown flag
                 continue
 
-            logger.info(f"Processing queued job for packing_item_id={packing_item_id}")
+            # Take everything queued meanwhile and run it in scheduler order
+            packing_item_ids = [packing_item_id]
+            while True:
+                try:
+                    packing_item_ids.append(job_queue.get_nowait())
+                except Exception:
+                    break
 
-            db = SessionLocal()
             try:
-                success = process_single_item_by_id(db, packing_item_id)
-                if success:
-                    logger.info(f"Successfully processed packing_item_id={packing_item_id}")
-                else:
-                    logger.error(f"Failed to process packing_item_id={packing_item_id}")
+                # Only the ordering reads the batch, the session is closed before processing
+                db = SessionLocal()
+                try:
+                    items = packing_repository.get_many_with_camera(db, packing_item_ids)
+                    ordered = [str(item.id) for item in scheduler.schedule(items)]
+                finally:
+                    db.close()
+                # Unknown IDs are left for process_single_item_by_id to report
+                ordered += [i for i in packing_item_ids if str(i).lower() not in ordered]
+
+                for packing_item_id in ordered:
+                    # A short session per item, so no transaction stays open across the batch
+                    db = SessionLocal()
+                    try:
+                        logger.info(f"Processing queued job for packing_item_id={packing_item_id}")
+                        success = process_single_item_by_id(db, packing_item_id)
+                        if success:
+                            logger.info(f"Successfully processed packing_item_id={packing_item_id}")
+                        else:
+                            logger.error(f"Failed to process packing_item_id={packing_item_id}")
+                    finally:
+                        db.close()
             finally:
-                db.close()
-
-            job_queue.task_done()
+                for _ in packing_item_ids:
+                    job_queue.task_done()
 
         except Exception as e:
             logger.error(f"Error in queue worker: {e}")
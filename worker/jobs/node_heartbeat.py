@@ -0,0 +1,66 @@
+import logging
+import socket
+import time
+from datetime import datetime, timezone
+
+from config import settings
+from db.session import SessionLocal
+from repositories import worker_node_repository
+from services.sharding import node_id
+
+logger = logging.getLogger(__name__)
+
+# Flag to signal heartbeat loop to stop
+heartbeat_loop_shutdown = False
+
+_started_at = datetime.now(timezone.utc)
+
+
+def beat() -> None:
+    """Refresh this node's heartbeat and drop nodes that died without leaving."""
+    db = SessionLocal()
+    try:
+        worker_node_repository.heartbeat(
+            db, node_id(), socket.gethostname(), max(1, settings.WORKERS), _started_at
+        )
+        removed = worker_node_repository.delete_stale_nodes(db, settings.NODE_TIMEOUT_SECONDS)
+        if removed:
+            logger.info(f"Removed {removed} stale worker nodes, their cameras are rebalanced")
+    finally:
+        db.close()
+
+
+def leave() -> None:
+    """Remove this node so the others take over its cameras on their next poll."""
+    db = SessionLocal()
+    try:
+        worker_node_repository.delete_node(db, node_id())
+        logger.info(f"Node {node_id()} left the cluster")
+    except Exception as e:
+        logger.error(f"Error leaving the cluster: {e}")
+    finally:
+        db.close()
+
+
+def run_heartbeat_loop() -> None:
+    """Run the node heartbeat in a background thread."""
+    logger.info(f"Heartbeat loop started for node {node_id()}")
+
+    while not heartbeat_loop_shutdown:
+        try:
+            beat()
+        except Exception as e:
+            logger.error(f"Error writing node heartbeat: {e}")
+
+        for _ in range(settings.HEARTBEAT_INTERVAL_SECONDS):
+            if heartbeat_loop_shutdown:
+                break
+            time.sleep(1)
+
+    logger.info("Heartbeat loop stopped")
+
+
+def stop_heartbeat_loop() -> None:
+    """Signal the heartbeat loop to stop."""
+    global heartbeat_loop_shutdown
+    heartbeat_loop_shutdown = True
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable
+
+from services.metrics import metrics
+
+if TYPE_CHECKING:
+    # Only for annotations, the API process imports this before the models are loaded
+    from db.models import PackingItem
+    from services.archive_pack import PackedClip
+    from services.disk_budget import ItemEstimate, Reservation
+    from services.workdir import WorkDir
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ItemContext:
+    """State of one packing item as it moves through the pipeline stages."""
+
+    packing_item: "PackingItem"
+    # None for manual triggers, which run outside a batch job
+    batch_item_id: uuid.UUID | None = None
+    camera_id: uuid.UUID | None = None
+    camcfg: dict[str, str] | None = None
+    workdir: "WorkDir | None" = None
+    segments: list[dict[str, str | None]] | None = None
+    estimate: "ItemEstimate | None" = None
+    reservation: "Reservation | None" = None
+    seg_files: list[tuple[str, datetime]] = field(default_factory=list)
+    duration: float = 0.0
+    gcs_url: str | None = None
+    poster_url: str | None = None
+    preview_url: str | None = None
+    # Set when the clip went into an archive pack instead of its own object
+    packed: "PackedClip | None" = None
+    filesize: int = 0
+
+
+StageFn = Callable[[ItemContext], None]
+
+
+class PipelineInterrupt(Exception):
+    """Raised by a hook to stop the item before the next stage, the only hook error not swallowed."""
+    pass
+
+
+class PipelineHook:
+    """Called around every item and stage of a pipeline, override what you need.
+
+    after_* hooks also run when the item or stage failed, with the error.
+    Hook errors are logged and never fail the item, except PipelineInterrupt
+    from before_stage.
+    """
+
+    def before_item(self, ctx: ItemContext) -> None:
+        pass
+
+    def after_item(self, ctx: ItemContext, error: BaseException | None) -> None:
+        pass
+
+    def before_stage(self, name: str, ctx: ItemContext) -> None:
+        pass
+
+    def after_stage(self, name: str, ctx: ItemContext, error: BaseException | None) -> None:
+        pass
+
+
+class StageTimer(PipelineHook):
+    """Per-stage wall time in /metrics as stage_<name>_seconds."""
+
+    def __init__(self) -> None:
+        self._started = threading.local()
+
+    def before_stage(self, name: str, ctx: ItemContext) -> None:
+        self._started.at = time.monotonic()
+
+    def after_stage(self, name: str, ctx: ItemContext, error: BaseException | None) -> None:
+        metrics.observe(f"stage_{name}_seconds", time.monotonic() - self._started.at)
+
+
+class Pipeline:
+    """Named stages run in order on an ItemContext, with registerable hooks."""
+
+    def __init__(self, stages: list[tuple[str, StageFn]]):
+        self.stages = stages
+        self._hooks: list[PipelineHook] = []
+
+    def add_hook(self, hook: PipelineHook) -> None:
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: PipelineHook) -> None:
+        self._hooks.remove(hook)
+
+    def run(self, ctx: ItemContext) -> None:
+        """Run every stage, raising the first stage error after the after hooks ran."""
+        hooks = list(self._hooks)
+        self._call(hooks, "before_item", ctx)
+        error: BaseException | None = None
+        try:
+            for name, stage in self.stages:
+                try:
+                    self._call(hooks, "before_stage", name, ctx)
+                except PipelineInterrupt as e:
+                    error = e
+                    raise
+                try:
+                    stage(ctx)
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    self._call(hooks, "after_stage", name, ctx, error)
+        finally:
+            self._call(hooks, "after_item", ctx, error)
+
+    @staticmethod
+    def _call(hooks: list[PipelineHook], method: str, *args: object) -> None:
+        for hook in hooks:
+            try:
+                getattr(hook, method)(*args)
+            except PipelineInterrupt:
+                raise
+            except Exception as e:
+                logger.warning(f"Pipeline hook {type(hook).__name__}.{method} failed: {e}")
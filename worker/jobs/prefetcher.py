@@ -0,0 +1,116 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from config import settings
+from db.models import PackingItem
+from db.session import SessionLocal
+from jobs.batch_processor import owned_cameras
+from repositories import camera_repository, packing_repository
+from services import segment_cache
+from services.circuit_breaker import CameraUnavailableError
+from services.disk_budget import disk_budget, segment_bytes
+from services.hikvision_client import get_client
+from services.utils import parse_time
+
+logger = logging.getLogger(__name__)
+
+# Flag to signal prefetch loop to stop
+prefetch_loop_shutdown = False
+
+
+def _finished(seg: dict[str, str | None], until: datetime) -> bool:
+    """Whether the segment has an end, no later than until."""
+    if not seg.get("end"):
+        return False
+    end = parse_time(seg["end"])
+    if end.tzinfo is None:
+        # NVR times are UTC
+        end = end.replace(tzinfo=timezone.utc)
+    return end <= until
+
+
+def prefetch_item(packing_item: PackingItem, until: datetime) -> int:
+    """Download the finished segments of a packing still in progress. Returns count fetched."""
+    camera = packing_item.workstation.camera
+    client = get_client(camera_repository.build_camera_config(camera))
+    segs = client.search_segments(packing_item.start_time.isoformat(), until.isoformat())
+
+    fetched = 0
+    for seg in segs:
+        if not _finished(seg, until):
+            # Still being recorded: its end moves on every search, each copy would be a new cache entry
+            continue
+        path = segment_cache.cache_path(camera.id, seg)
+        if path is None or not seg.get("playbackURI") or segment_cache.lookup(camera.id, seg):
+            continue
+
+        # Prefetching is opportunistic, never wait for space items need
+        reservation = disk_budget.try_reserve(f"prefetch:{path}", segment_bytes(seg, 0))
+        if reservation is None:
+            logger.debug(f"No disk budget to prefetch for packing_item_id={packing_item.id}")
+            break
+        with reservation:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            client.download_segment(seg["playbackURI"], path)
+        fetched += 1
+        if prefetch_loop_shutdown:
+            break
+    return fetched
+
+
+def prefetch() -> None:
+    """Prefetch footage of every packing in progress on this worker's cameras."""
+    now = datetime.now(timezone.utc)
+    # Segments still being written by the NVR are left for the final download
+    until = now - timedelta(seconds=settings.NVR_FLUSH_SECONDS)
+    # Anything older would expire from the cache before it is used
+    started_after = now - timedelta(seconds=settings.SEGMENT_CACHE_TTL_SECONDS)
+
+    db = SessionLocal()
+    try:
+        camera_ids = owned_cameras(db)
+        if camera_ids == []:
+            return
+        items = packing_repository.get_in_progress(db, started_after, camera_ids)
+    finally:
+        db.close()
+
+    for packing_item in items:
+        if prefetch_loop_shutdown:
+            return
+        if packing_item.start_time >= until:
+            continue
+        try:
+            fetched = prefetch_item(packing_item, until)
+            if fetched:
+                logger.info(f"Prefetched {fetched} segments for packing_item_id={packing_item.id}")
+        except CameraUnavailableError as e:
+            logger.debug(f"Skipping prefetch for packing_item_id={packing_item.id}: {e}")
+        except Exception as e:
+            logger.warning(f"Prefetch failed for packing_item_id={packing_item.id}: {e}")
+
+
+def run_prefetch_loop() -> None:
+    """Run the segment prefetcher in a background thread."""
+    logger.info("Prefetch loop started")
+
+    while not prefetch_loop_shutdown:
+        try:
+            prefetch()
+        except Exception as e:
+            logger.error(f"Error prefetching segments: {e}")
+
+        for _ in range(settings.PREFETCH_INTERVAL_SECONDS):
+            if prefetch_loop_shutdown:
+                break
+            time.sleep(1)
+
+    logger.info("Prefetch loop stopped")
+
+
+def stop_prefetch_loop() -> None:
+    """Signal the prefetch loop to stop."""
+    global prefetch_loop_shutdown
+    prefetch_loop_shutdown = True
@@ -0,0 +1,276 @@
+import cProfile
+import fcntl
+import io
+import json
+import logging
+import multiprocessing
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+
+from config import settings
+from jobs.pipeline import ItemContext, PipelineHook
+
+logger = logging.getLogger(__name__)
+
+# Functions and allocation sites kept in a finished profile
+TOP_ENTRIES = 40
+
+
+def profile_dir() -> str:
+    return os.path.join(settings.TEMP_VIDEO_DIR, "profile")
+
+
+def _request_path() -> str:
+    return os.path.join(profile_dir(), "request.json")
+
+
+def _write_json(path: str, data: dict) -> None:
+    os.makedirs(profile_dir(), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _result_paths(request_id: str, name: str) -> tuple[str, str]:
+    """Metadata and raw cProfile stats of one process for a request."""
+    base = os.path.join(profile_dir(), f"{request_id}.{name}")
+    return base + ".json", base + ".prof"
+
+
+def request_profile(items: int, trace_memory: bool) -> dict:
+    """Ask the processing processes to profile their next `items` items between them.
+
+    Goes through files like the published metrics, so worker processes of
+    WORKERS > 1 pick it up too. Results of the previous request are dropped.
+    """
+    request = {
+        "id": str(uuid.uuid4()),
+        "items": items,
+        "tracemalloc": trace_memory,
+        "requested_at": time.time(),
+    }
+    os.makedirs(profile_dir(), exist_ok=True)
+    for name in os.listdir(profile_dir()):
+        if name != "request.json" and name.endswith((".json", ".prof", ".slots")):
+            os.remove(os.path.join(profile_dir(), name))
+    _write_json(_request_path(), request)
+    return request
+
+
+def _claim_slot(request: dict) -> int | None:
+    """Take one of the request's items, shared by every process. Returns its number, None when all are taken."""
+    fd = os.open(os.path.join(profile_dir(), f"{request['id']}.slots"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        claimed = int(os.read(fd, 32) or b"0")
+        if claimed >= request["items"]:
+            return None
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, str(claimed + 1).encode())
+        return claimed + 1
+    finally:
+        os.close(fd)
+
+
+def load_profiles() -> tuple[dict | None, dict | None, dict[str, dict]]:
+    """Current request, its profile merged across processes, and each process's part."""
+    try:
+        with open(_request_path()) as f:
+            request = json.load(f)
+    except FileNotFoundError:
+        return None, None, {}
+    except (OSError, ValueError) as e:
+        logger.debug(f"Skipping profile request: {e}")
+        return None, None, {}
+
+    prefix = f"{request['id']}."
+    processes: dict[str, dict] = {}
+    stats_paths = []
+    for filename in sorted(os.listdir(profile_dir())):
+        if not (filename.startswith(prefix) and filename.endswith(".json")):
+            continue
+        path = os.path.join(profile_dir(), filename)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Skipping profile {filename}: {e}")
+            continue
+        processes[filename[len(prefix): -len(".json")]] = data
+        stats_paths.append(path[: -len(".json")] + ".prof")
+
+    if not processes:
+        return request, None, processes
+
+    stage_seconds: dict[str, float] = {}
+    for data in processes.values():
+        for stage, seconds in data["stage_seconds"].items():
+            stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
+
+    stream = io.StringIO()
+    stats: pstats.Stats | None = None
+    for path in stats_paths:
+        try:
+            if stats is None:
+                stats = pstats.Stats(path, stream=stream)
+            else:
+                stats.add(path)
+        except (OSError, ValueError, EOFError) as e:
+            logger.debug(f"Skipping profile stats {path}: {e}")
+    if stats is not None:
+        stats.sort_stats("cumulative").print_stats(TOP_ENTRIES)
+
+    items = sum(data["items"] for data in processes.values())
+    profile = {
+        "id": request["id"],
+        "items": items,
+        "complete": items >= request["items"],
+        "started_at": min(data["started_at"] for data in processes.values()),
+        "finished_at": max(data["finished_at"] for data in processes.values()),
+        "stage_seconds": stage_seconds,
+        "cprofile": stream.getvalue(),
+    }
+    return request, profile, processes
+
+
+class ItemProfiler(PipelineHook):
+    """cProfile (and optionally tracemalloc) over the next N items across processes.
+
+    Items are claimed from a counter shared by every process. cProfile only
+    sees the thread running the item, so one item per process is profiled
+    at a time and items running meanwhile in other threads are skipped.
+    Work handed to other threads (parallel segment downloads) shows up as
+    waiting. tracemalloc traces the whole process while a request is active.
+    Each process dumps its raw stats after every item, GET /admin/profile
+    merges them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._request_mtime = 0.0
+        self._request: dict | None = None
+        self._done_id: str | None = None
+        self._profile: cProfile.Profile | None = None
+        self._thread: int | None = None
+        self._last_slot = False
+        self._profiled = 0
+        self._started_at = 0.0
+        self._stage_started = 0.0
+        self._stage_seconds: dict[str, float] = {}
+
+    def _poll_request(self) -> None:
+        """Pick up a new request, one stat per item while none is active."""
+        try:
+            mtime = os.stat(_request_path()).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._request_mtime:
+            return
+        self._request_mtime = mtime
+        try:
+            with open(_request_path()) as f:
+                request = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Invalid profile request: {e}")
+            return
+        if request["id"] == self._done_id or (self._request and request["id"] == self._request["id"]):
+            return
+
+        self._stop_tracing()
+        self._request = request
+        self._profile = cProfile.Profile()
+        self._profiled = 0
+        self._started_at = time.time()
+        self._stage_seconds = {}
+        if request.get("tracemalloc") and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        logger.info(f"Profiling the next {request['items']} items (request {request['id']})")
+
+    def before_item(self, ctx: ItemContext) -> None:
+        with self._lock:
+            # A request arriving mid-item is picked up by the next item, after this one's profile is written
+            if self._thread is not None:
+                return
+            self._poll_request()
+            if self._request is None:
+                return
+            try:
+                slot = _claim_slot(self._request)
+            except OSError as e:
+                logger.error(f"Error claiming a profiled item: {e}")
+                return
+            if slot is None:
+                # Other processes profiled the rest
+                self._finish()
+                return
+            self._last_slot = slot == self._request["items"]
+            self._thread = threading.get_ident()
+        self._profile.enable()
+
+    def after_item(self, ctx: ItemContext, error: BaseException | None) -> None:
+        if self._thread != threading.get_ident():
+            return
+        self._profile.disable()
+        with self._lock:
+            self._thread = None
+            self._profiled += 1
+            self._write_result()
+            if self._last_slot:
+                self._finish()
+
+    def before_stage(self, name: str, ctx: ItemContext) -> None:
+        if self._thread == threading.get_ident():
+            self._stage_started = time.monotonic()
+
+    def after_stage(self, name: str, ctx: ItemContext, error: BaseException | None) -> None:
+        if self._thread == threading.get_ident():
+            elapsed = time.monotonic() - self._stage_started
+            self._stage_seconds[name] = self._stage_seconds.get(name, 0.0) + elapsed
+
+    def _write_result(self) -> None:
+        """This process's stats so far, replaced after every profiled item."""
+        memory = None
+        if self._request.get("tracemalloc") and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:TOP_ENTRIES]
+            memory = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top": [str(stat) for stat in top],
+            }
+
+        result = {
+            "id": self._request["id"],
+            "items": self._profiled,
+            "started_at": self._started_at,
+            "finished_at": time.time(),
+            "stage_seconds": self._stage_seconds,
+            "tracemalloc": memory,
+        }
+        json_path, stats_path = _result_paths(self._request["id"], multiprocessing.current_process().name)
+        try:
+            # Stats first, a result listed by its JSON always has them
+            self._profile.dump_stats(stats_path + ".tmp")
+            os.replace(stats_path + ".tmp", stats_path)
+            _write_json(json_path, result)
+        except OSError as e:
+            logger.error(f"Error writing profile: {e}")
+
+    def _finish(self) -> None:
+        logger.info(f"Profiled {self._profiled} items in this process (request {self._request['id']})")
+        self._stop_tracing()
+        self._done_id = self._request["id"]
+        self._request = None
+        self._profile = None
+
+    def _stop_tracing(self) -> None:
+        if self._request is not None and self._request.get("tracemalloc") and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+item_profiler = ItemProfiler()
@@ -0,0 +1,59 @@
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+
+from config import settings
+from db.models import PackingItem
+from repositories.status_recorder import status_recorder
+from services.errors import is_transient
+
+logger = logging.getLogger(__name__)
+
+
+def compute_next_attempt(
+    retry_count: int,
+    end_time: datetime | None,
+    now: datetime | None = None,
+) -> datetime:
+    """Exponential backoff with jitter, never earlier than the NVR flush window.
+
+    Recently finished packings are held back until end_time + NVR_FLUSH_SECONDS
+    so a retry doesn't search the device before the recording is written.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+
+    delay = min(
+        settings.RETRY_MAX_DELAY_SECONDS,
+        settings.RETRY_BASE_DELAY_SECONDS * (2 ** (retry_count - 1)),
+    )
+    # Equal jitter: keep half the delay, randomize the rest
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    next_attempt = now + timedelta(seconds=delay)
+
+    if end_time is not None:
+        flushed_at = end_time + timedelta(seconds=settings.NVR_FLUSH_SECONDS)
+        next_attempt = max(next_attempt, flushed_at)
+
+    return next_attempt
+
+
+def handle_failure(packing_item: PackingItem, error: Exception) -> bool:
+    """Requeue the packing item if the failure is transient, otherwise mark it ERROR.
+
+    Returns True if a retry was scheduled.
+    """
+    error_msg = str(error)
+    retry_count = packing_item.retry_count + 1
+
+    if is_transient(error) and retry_count <= settings.RETRY_MAX_ATTEMPTS:
+        next_attempt_at = compute_next_attempt(retry_count, packing_item.end_time)
+        status_recorder.schedule_retry(packing_item.id, retry_count, next_attempt_at, error_msg)
+        logger.info(
+            f"Scheduled retry {retry_count}/{settings.RETRY_MAX_ATTEMPTS} for "
+            f"packing_item_id={packing_item.id} at {next_attempt_at.isoformat()}"
+        )
+        return True
+
+    status_recorder.mark_as_error(packing_item.id, error_msg)
+    return False
@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import time
+
+from config import settings
+from db.session import SessionLocal
+from jobs.batch_processor import owned_cameras
+from repositories import camera_repository
+from services import ring_buffer
+from services.ring_buffer import Recorder
+from services.shared_state import entry_key, locked_entries
+
+logger = logging.getLogger(__name__)
+
+# Flag to signal recorder loop to stop
+recorder_loop_shutdown = False
+
+# Seconds between recorder health checks and retention pruning
+CHECK_INTERVAL_SECONDS = 5
+
+# Cameras recorded by each process of the node, so a buffer another process
+# records into is never deleted
+RECORDING_STATE = "ring-recorders"
+
+_recorders: dict[str, Recorder] = {}
+_recorders_lock = threading.Lock()
+
+
+def reconcile() -> None:
+    """Run a recorder for each configured camera this worker owns, restarting any that exited."""
+    with _recorders_lock:
+        if recorder_loop_shutdown:
+            return
+        _reconcile()
+
+
+def _reconcile() -> None:
+    wanted = ring_buffer.configured_cameras()
+
+    db = SessionLocal()
+    try:
+        owned = owned_cameras(db)
+        if owned is not None:
+            wanted &= {str(camera_id) for camera_id in owned}
+
+        for camera_id in wanted - _recorders.keys():
+            camera = camera_repository.get_camera_by_id(db, camera_id)
+            if camera is None:
+                logger.warning(f"Ring buffer camera {camera_id} not found")
+                continue
+            _recorders[camera_id] = Recorder(camera_id, camera_repository.build_camera_config(camera))
+    finally:
+        db.close()
+
+    with locked_entries(RECORDING_STATE) as entries:
+        # Cameras moved to another worker or removed from the config, their
+        # buffer is of no use here and would otherwise stay on disk for good
+        for camera_id in _recorders.keys() - wanted:
+            _recorders.pop(camera_id).stop()
+            entries.pop(entry_key(camera_id), None)
+            if not any(entry["camera_id"] == camera_id for entry in entries.values()):
+                ring_buffer.delete_buffer(camera_id)
+
+        for camera_id in _recorders:
+            entries[entry_key(camera_id)] = {"pid": os.getpid(), "camera_id": camera_id}
+
+        # Buffers left by a recorder of an earlier run, gone once past retention
+        recorded = {entry["camera_id"] for entry in entries.values()}
+        for camera_id in ring_buffer.buffered_cameras() - recorded:
+            ring_buffer.prune(camera_id, settings.RING_BUFFER_RETENTION_SECONDS)
+            if not ring_buffer.list_segments(camera_id):
+                ring_buffer.delete_buffer(camera_id)
+
+    for camera_id, recorder in _recorders.items():
+        if not recorder.running():
+            if recorder.process is not None:
+                logger.warning(
+                    f"Ring buffer recorder for camera {camera_id} exited "
+                    f"with code {recorder.process.returncode}, restarting"
+                )
+            recorder.start()
+        ring_buffer.prune(camera_id, settings.RING_BUFFER_RETENTION_SECONDS)
+
+
+def run_recorder_loop() -> None:
+    """Keep the ring buffer recorders running in a background thread."""
+    logger.info("Ring buffer recorder loop started")
+
+    while not recorder_loop_shutdown:
+        try:
+            reconcile()
+        except Exception as e:
+            logger.error(f"Error managing ring buffer recorders: {e}")
+
+        for _ in range(CHECK_INTERVAL_SECONDS):
+            if recorder_loop_shutdown:
+                break
+            time.sleep(1)
+
+    stop_recorders()
+    logger.info("Ring buffer recorder loop stopped")
+
+
+def stop_recorder_loop() -> None:
+    """Signal the recorder loop to stop."""
+    global recorder_loop_shutdown
+    recorder_loop_shutdown = True
+    # The recorders are separate processes, don't leave them running if the
+    # loop thread doesn't get to finish before exit
+    stop_recorders()
+
+
+def stop_recorders() -> None:
+    with _recorders_lock:
+        for recorder in _recorders.values():
+            recorder.stop()
+        # Buffers are kept, a restarted worker picks them up again
+        with locked_entries(RECORDING_STATE) as entries:
+            for camera_id in _recorders:
+                entries.pop(entry_key(camera_id), None)
+        _recorders.clear()
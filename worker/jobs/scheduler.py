@@ -0,0 +1,69 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+from config import settings
+from db.models import PackingItem
+from services.workdir import peek_manifest
+
+# Rough processing speed relative to real time, for the deadline slack only
+ASSUMED_SPEEDUP = 20
+# Fixed search/download/merge overhead per NVR segment
+SEGMENT_OVERHEAD_SECONDS = 5
+# NVR recording files are roughly half an hour at typical bitrates
+NVR_FILE_SECONDS = 1800
+
+
+def estimated_cost(packing_item: PackingItem) -> float:
+    """Estimated processing seconds, from the clip duration and segment count."""
+    duration = (packing_item.end_time - packing_item.start_time).total_seconds()
+
+    manifest = peek_manifest(f"{packing_item.workstation.camera_id}_{packing_item.id}")
+    if manifest is not None and manifest.get("segments") is not None:
+        segments = len(manifest["segments"])
+    else:
+        segments = 1 + math.floor(duration / NVR_FILE_SECONDS)
+
+    return duration / ASSUMED_SPEEDUP + segments * SEGMENT_OVERHEAD_SECONDS
+
+
+def schedule(items: list[PackingItem], now: datetime | None = None) -> list[PackingItem]:
+    """Order items for processing.
+
+    Items whose SLA deadline (end_time + SLA_SECONDS) would be missed once
+    their estimated cost is spent go first, earliest deadline first, so long
+    items are never starved. The rest run shortest job first, round-robin
+    across cameras so one busy workstation doesn't hold up the others.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+
+    keyed = []
+    for packing_item in items:
+        if packing_item.start_time is None or packing_item.end_time is None:
+            # Fails validation right away, costs nothing
+            keyed.append((packing_item, 0.0, now))
+            continue
+        cost = estimated_cost(packing_item)
+        deadline = packing_item.end_time + timedelta(seconds=settings.SLA_SECONDS)
+        keyed.append((packing_item, cost, deadline))
+
+    urgent = sorted(
+        ((item, cost, deadline) for item, cost, deadline in keyed if deadline - timedelta(seconds=cost) <= now),
+        key=lambda k: k[2],
+    )
+    relaxed = sorted(
+        ((item, cost, deadline) for item, cost, deadline in keyed if deadline - timedelta(seconds=cost) > now),
+        key=lambda k: k[1],
+    )
+
+    # Round r takes each camera's r-th shortest item
+    rounds: dict[object, int] = {}
+    ranked = []
+    for item, cost, _ in relaxed:
+        camera_id = item.workstation.camera_id
+        rank = rounds.get(camera_id, 0)
+        rounds[camera_id] = rank + 1
+        ranked.append((rank, cost, item))
+    ranked.sort(key=lambda r: (r[0], r[1]))
+
+    return [item for item, _, _ in urgent] + [item for _, _, item in ranked]
@@ -0,0 +1,36 @@
+import logging
+import time
+
+from config import settings
+from repositories.status_recorder import status_recorder
+
+logger = logging.getLogger(__name__)
+
+# Flag to signal flush loop to stop
+flush_loop_shutdown = False
+
+
+def run_status_flush_loop() -> None:
+    """Flush buffered status writes on an interval in a background thread."""
+    logger.info("Status flush loop started")
+
+    while not flush_loop_shutdown:
+        time.sleep(settings.STATUS_FLUSH_INTERVAL_SECONDS)
+        try:
+            status_recorder.flush()
+        except Exception as e:
+            logger.error(f"Error flushing status writes: {e}")
+
+    # Don't drop transitions recorded right before shutdown
+    try:
+        status_recorder.flush()
+    except Exception as e:
+        logger.error(f"Error flushing status writes on shutdown: {e}")
+
+    logger.info("Status flush loop stopped")
+
+
+def stop_status_flush_loop() -> None:
+    """Signal the flush loop to stop."""
+    global flush_loop_shutdown
+    flush_loop_shutdown = True
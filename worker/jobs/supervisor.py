@@ -0,0 +1,178 @@
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import JoinableQueue
+
+from config import settings
+from jobs import archive_flush, drain, job_queue
+from jobs.batch_processor import run_batch_loop, stop_batch_loop
+from jobs.camera_probe import run_probe_loop, stop_probe_loop
+from jobs.prefetcher import run_prefetch_loop, stop_prefetch_loop
+from jobs.ring_recorder import run_recorder_loop, stop_recorder_loop
+from jobs.status_flush import run_status_flush_loop, stop_status_flush_loop
+from services import warmup
+from services.metrics import publish, unpublish
+from services.sharding import configure_local_shard, configure_node
+
+logger = logging.getLogger(__name__)
+
+# Workers exiting sooner than this after start are respawned with backoff
+MIN_UPTIME_SECONDS = 30
+MAX_RESPAWN_DELAY_SECONDS = 60
+
+# How often a worker publishes its metrics for the API process
+METRICS_PUBLISH_SECONDS = 5
+
+# Spawned rather than forked: respawns happen while the API threads are
+# running, and a forked child could inherit locks held by them
+_mp = multiprocessing.get_context("spawn")
+
+
+def run_worker_process(
+    node_id: str,
+    shard_index: int,
+    shard_count: int,
+    shard_queue: JoinableQueue,
+) -> None:
+    """Entrypoint of a processing worker, runs the batch loop and queue worker for one shard."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(processName)s - %(levelname)s - %(message)s",
+    )
+
+    configure_node(node_id)
+    configure_local_shard(shard_index, shard_count)
+    job_queue.use_queue(shard_queue)
+
+    def finish_drain() -> None:
+        drain.wait()
+        if settings.ARCHIVE_PACK_ENABLED:
+            archive_flush.stop_archive_loop()
+            archive_flush.flush_all()
+        stop_status_flush_loop()
+        stop_recorder_loop()
+
+    def handle_signal(signum: int, frame: object) -> None:
+        # Stop claiming items, in-flight ones finish until the drain deadline
+        drain.begin(settings.DRAIN_TIMEOUT_SECONDS)
+        stop_batch_loop()
+        job_queue.stop_queue_worker()
+        stop_probe_loop()
+        stop_prefetch_loop()
+        threading.Thread(target=finish_drain, name="drain").start()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    # Ctrl+C reaches the whole process group, the supervisor stops us with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    logger.info(f"Worker {shard_index + 1}/{shard_count} started")
+    warmup.warm_up(warmup.PROCESSING_STEPS)
+
+    threads = [
+        threading.Thread(target=job_queue.process_queue_worker, name="queue-worker"),
+        threading.Thread(target=run_probe_loop, name="camera-probe"),
+        threading.Thread(target=run_status_flush_loop, name="status-flush"),
+    ]
+    if settings.AUTO_BATCH_ENABLED:
+        threads.append(threading.Thread(target=run_batch_loop, name="batch-loop"))
+    if settings.PREFETCH_ENABLED:
+        threads.append(threading.Thread(target=run_prefetch_loop, name="prefetch"))
+    if settings.RING_BUFFER_CAMERAS:
+        threads.append(threading.Thread(target=run_recorder_loop, name="ring-recorder"))
+    if settings.ARCHIVE_PACK_ENABLED:
+        threads.append(threading.Thread(target=archive_flush.run_archive_loop, name="archive-flush"))
+
+    for thread in threads:
+        thread.start()
+
+    name = f"worker-{shard_index}"
+    while any(thread.is_alive() for thread in threads):
+        try:
+            publish(name)
+        except OSError as e:
+            logger.debug(f"Error publishing metrics: {e}")
+        next(thread for thread in threads if thread.is_alive()).join(METRICS_PUBLISH_SECONDS)
+    unpublish(name)
+
+    logger.info(f"Worker {shard_index + 1}/{shard_count} stopped")
+
+
+class Supervisor:
+    """Runs `workers` processing processes and respawns any that exit.
+
+    The node's cameras are assigned to workers by a consistent hash ring,
+    each worker only polls its own cameras and manual triggers are routed to
+    the owning worker's queue.
+    """
+
+    def __init__(self, node_id: str, workers: int):
+        self.node_id = node_id
+        self.workers = workers
+        self.queues: list[JoinableQueue] = [_mp.JoinableQueue() for _ in range(workers)]
+        self._processes: list[BaseProcess | None] = [None] * workers
+        self._started_at = [0.0] * workers
+        self._respawn_at = [0.0] * workers
+        self._respawn_delay = [0.0] * workers
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        job_queue.use_shard_queues(self.queues)
+        for shard in range(self.workers):
+            self._spawn(shard)
+        threading.Thread(target=self._watch, daemon=True, name="supervisor").start()
+        logger.info(f"Supervisor started {self.workers} workers")
+
+    def _spawn(self, shard: int) -> None:
+        process = _mp.Process(
+            target=run_worker_process,
+            args=(self.node_id, shard, self.workers, self.queues[shard]),
+            name=f"worker-{shard}",
+        )
+        process.start()
+        self._processes[shard] = process
+        self._started_at[shard] = time.monotonic()
+
+    def _watch(self) -> None:
+        """Respawn only the worker that exited, backing off if it keeps crashing."""
+        while not self._stopping.wait(1):
+            now = time.monotonic()
+            for shard, process in enumerate(self._processes):
+                if process is not None:
+                    if process.is_alive():
+                        continue
+                    if now - self._started_at[shard] < MIN_UPTIME_SECONDS:
+                        delay = min(MAX_RESPAWN_DELAY_SECONDS, max(1.0, self._respawn_delay[shard] * 2))
+                    else:
+                        delay = 0.0
+                    self._respawn_delay[shard] = delay
+                    self._respawn_at[shard] = now + delay
+                    self._processes[shard] = None
+                    logger.error(
+                        f"Worker {process.name} exited with code {process.exitcode}, "
+                        f"respawning in {delay:.0f}s"
+                    )
+
+                if now >= self._respawn_at[shard] and not self._stopping.is_set():
+                    self._spawn(shard)
+
+    def alive(self) -> int:
+        return sum(1 for p in self._processes if p is not None and p.is_alive())
+
+    def stop(self, timeout: float = 30) -> None:
+        """SIGTERM every worker, wait for them to drain, then kill stragglers."""
+        self._stopping.set()
+        processes = [p for p in self._processes if p is not None]
+        for process in processes:
+            process.terminate()
+
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {process.name} did not stop in {timeout}s, killing")
+                process.kill()
+                process.join()
+        logger.info("Supervisor stopped")
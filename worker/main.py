@@ -2,13 +2,18 @@ import signal
 import sys
 import logging
 import threading
-
-import uvicorn
+import time
+from typing import TYPE_CHECKING
 
 from config import settings, validate_config
-from api.app import create_app
-from jobs.batch_processor import run_batch_loop, stop_batch_loop
-from jobs.job_queue import process_queue_worker, stop_queue_worker
+
+if TYPE_CHECKING:
+    import uvicorn
+
+    from jobs.supervisor import Supervisor
+
+# Processing modules (and boto3, requests, SQLAlchemy models with them) are
+# imported in the startup thread once the HTTP port is bound
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,28 +21,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Processing workers in multi-process mode (WORKERS > 1)
+supervisor: "Supervisor | None" = None
+
 
 def signal_handler(signum: int, frame: object) -> None:
-    """Handle shutdown signals gracefully."""
+    """Drain in-flight items and shut down."""
+    from jobs import archive_flush, drain
+    from jobs.batch_processor import stop_batch_loop
+    from jobs.camera_probe import stop_probe_loop
+    from jobs.janitor import stop_janitor_loop
+    from jobs.job_queue import stop_queue_worker
+    from jobs.node_heartbeat import leave, stop_heartbeat_loop
+    from jobs.prefetcher import stop_prefetch_loop
+    from jobs.ring_recorder import stop_recorder_loop
+    from jobs.status_flush import stop_status_flush_loop
+
     sig_name = signal.Signals(signum).name
-    logger.info(f"Received {sig_name}, initiating graceful shutdown...")
+    logger.info(f"Received {sig_name}, draining before shutdown...")
 
-    # Stop background workers
+    # Stop claiming new items, in-flight ones finish until the drain deadline
+    drain.begin(settings.DRAIN_TIMEOUT_SECONDS)
     stop_batch_loop()
     stop_queue_worker()
+    stop_probe_loop()
+    stop_prefetch_loop()
+    if supervisor is not None:
+        # Workers drain themselves on SIGTERM
+        supervisor.stop(timeout=settings.DRAIN_TIMEOUT_SECONDS + drain.KILL_GRACE_SECONDS + 5)
+    else:
+        drain.wait()
+        if settings.ARCHIVE_PACK_ENABLED:
+            archive_flush.stop_archive_loop()
+            archive_flush.flush_all()
 
-    sys.exit(0)
+    # Stop background workers
+    stop_recorder_loop()
+    stop_janitor_loop()
+    stop_status_flush_loop()
+    stop_heartbeat_loop()
 
+    # Hand the cameras over to the other nodes right away
+    leave()
 
-def main() -> None:
-    # Validate config before starting
-    validate_config()
+    sys.exit(0)
 
-    # Register signal handlers
-    signal.signal(signal.SIGTERM, signal_handler)
-    signal.signal(signal.SIGINT, signal_handler)
 
-    logger.info("Worker started")
+def start_processing_threads() -> None:
+    """Run batch processing, manual triggers and status writes in this process."""
+    from jobs.archive_flush import run_archive_loop
+    from jobs.batch_processor import run_batch_loop
+    from jobs.camera_probe import run_probe_loop
+    from jobs.job_queue import process_queue_worker
+    from jobs.prefetcher import run_prefetch_loop
+    from jobs.ring_recorder import run_recorder_loop
+    from jobs.status_flush import run_status_flush_loop
 
     # Start background batch loop if enabled
     if settings.AUTO_BATCH_ENABLED:
@@ -52,15 +90,107 @@ def main() -> None:
     queue_thread.start()
     logger.info("Queue worker started")
 
-    # Start HTTP server (blocking)
+    # Start camera probe loop for open circuits
+    probe_thread = threading.Thread(target=run_probe_loop, daemon=True, name="camera-probe")
+    probe_thread.start()
+
+    # Start write-behind flush for status writes
+    flush_thread = threading.Thread(target=run_status_flush_loop, daemon=True, name="status-flush")
+    flush_thread.start()
+
+    # Start prefetch of footage for packings in progress if enabled
+    if settings.PREFETCH_ENABLED:
+        prefetch_thread = threading.Thread(target=run_prefetch_loop, daemon=True, name="prefetch")
+        prefetch_thread.start()
+
+    # Start continuous recorders for ring buffer cameras if configured
+    if settings.RING_BUFFER_CAMERAS:
+        recorder_thread = threading.Thread(target=run_recorder_loop, daemon=True, name="ring-recorder")
+        recorder_thread.start()
+
+    # Start uploads of packed small clips if archive packing is enabled
+    if settings.ARCHIVE_PACK_ENABLED:
+        archive_thread = threading.Thread(target=run_archive_loop, daemon=True, name="archive-flush")
+        archive_thread.start()
+
+
+def start_background(server: "uvicorn.Server") -> None:
+    """Join the cluster, start processing and warm up, once the HTTP port is bound.
+
+    /health answers as soon as the server is up, /ready only once this has run.
+    """
+    global supervisor
+
+    from jobs import drain
+    from jobs.janitor import run_janitor_loop
+    from jobs.node_heartbeat import beat, run_heartbeat_loop
+    from services import warmup
+    from services.sharding import configure_node, default_node_id
+
+    if settings.WORKERS > 1:
+        warmup.expect(warmup.API_STEPS)
+    else:
+        warmup.expect(warmup.PROCESSING_STEPS)
+    warmup.expect({"processing": start_processing_threads})
+    warmup.add_check("not_draining", lambda: not drain.draining())
+
+    while not server.started:
+        if server.should_exit:
+            return
+        time.sleep(0.05)
+
+    # Join the cluster before polling, so this node is counted in the camera split
+    node_id = settings.NODE_ID or default_node_id()
+    configure_node(node_id)
+    try:
+        beat()
+    except Exception as e:
+        logger.error(f"Error registering node {node_id}: {e}")
+    heartbeat_thread = threading.Thread(target=run_heartbeat_loop, daemon=True, name="node-heartbeat")
+    heartbeat_thread.start()
+
+    if settings.WORKERS > 1:
+        from jobs.supervisor import Supervisor
+
+        # Processing runs in worker processes, this process only serves the API
+        supervisor = Supervisor(node_id, settings.WORKERS)
+        warmup.warm_up({**warmup.API_STEPS, "processing": supervisor.start})
+        warmup.add_check("workers", lambda: supervisor.alive() == supervisor.workers)
+    else:
+        warmup.warm_up({**warmup.PROCESSING_STEPS, "processing": start_processing_threads})
+
+    # Start janitor for temp work dirs
+    janitor_thread = threading.Thread(target=run_janitor_loop, daemon=True, name="janitor")
+    janitor_thread.start()
+
+
+def main() -> None:
+    import uvicorn
+
+    from api.app import create_app
+
+    # Validate config before starting
+    validate_config()
+
+    # Register signal handlers
+    signal.signal(signal.SIGTERM, signal_handler)
+    signal.signal(signal.SIGINT, signal_handler)
+
+    logger.info("Worker started")
+
+    # Start HTTP server (blocking), everything else starts once it is bound
     app = create_app()
-    logger.info(f"Starting HTTP server on {settings.WORKER_HOST}:{settings.WORKER_PORT}")
-    uvicorn.run(
+    server = uvicorn.Server(uvicorn.Config(
         app,
         host=settings.WORKER_HOST,
         port=settings.WORKER_PORT,
         log_level="info",
-    )
+    ))
+    startup_thread = threading.Thread(target=start_background, args=(server,), daemon=True, name="startup")
+    startup_thread.start()
+
+    logger.info(f"Starting HTTP server on {settings.WORKER_HOST}:{settings.WORKER_PORT}")
+    server.run()
 
 
 if __name__ == "__main__":
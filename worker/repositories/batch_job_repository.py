@@ -1,5 +1,7 @@
+import uuid
 from datetime import datetime, timezone
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from db.models import (
@@ -16,55 +18,39 @@ def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def create_batch_job(db: Session, packing_items: list[PackingItem]) -> BatchJob:
-    """Create a new batch job with items."""
-    batch_job = BatchJob(
-        started_at=_utc_now(),
-        status=BatchJobStatus.RUNNING,
-        total_items=len(packing_items),
-    )
-    db.add(batch_job)
-    db.flush()
-
-    for item in packing_items:
-        batch_item = BatchJobItem(
-            batch_job_id=batch_job.id,
-            packing_item_id=item.id,
-            status=BatchItemStatus.PENDING,
+def create_batch_job(
+    db: Session,
+    packing_items: list[PackingItem],
+) -> tuple[uuid.UUID, dict[uuid.UUID, uuid.UUID]]:
+    """Create a new batch job with items.
+
+    Items are inserted in one multi-row INSERT ... RETURNING. Returns the
+    batch job ID and a mapping of packing item ID to batch job item ID.
+    """
+    batch_job_id = db.execute(
+        insert(BatchJob)
+        .values(
+            started_at=_utc_now(),
+            status=BatchJobStatus.RUNNING,
+            total_items=len(packing_items),
         )
-        db.add(batch_item)
-
-    db.commit()
-    db.refresh(batch_job)
-    return batch_job
-
-
-def mark_item_processing(db: Session, batch_item_id: int) -> None:
-    """Mark batch job item as processing."""
-    db.query(BatchJobItem).filter(BatchJobItem.id == batch_item_id).update({
-        "status": BatchItemStatus.PROCESSING,
-        "started_at": _utc_now(),
-    })
-    db.commit()
-
+        .returning(BatchJob.id)
+    ).scalar_one()
+
+    rows = db.execute(
+        insert(BatchJobItem).returning(BatchJobItem.id, BatchJobItem.packing_item_id),
+        [
+            {
+                "batch_job_id": batch_job_id,
+                "packing_item_id": item.id,
+                "status": BatchItemStatus.PENDING,
+            }
+            for item in packing_items
+        ],
+    ).all()
 
-def mark_item_success(db: Session, batch_item_id: int) -> None:
-    """Mark batch job item as success."""
-    db.query(BatchJobItem).filter(BatchJobItem.id == batch_item_id).update({
-        "status": BatchItemStatus.SUCCESS,
-        "finished_at": _utc_now(),
-    })
-    db.commit()
-
-
-def mark_item_failed(db: Session, batch_item_id: int, error_message: str) -> None:
-    """Mark batch job item as failed."""
-    db.query(BatchJobItem).filter(BatchJobItem.id == batch_item_id).update({
-        "status": BatchItemStatus.FAILED,
-        "error_message": error_message,
-        "finished_at": _utc_now(),
-    })
     db.commit()
+    return batch_job_id, {packing_item_id: batch_item_id for batch_item_id, packing_item_id in rows}
 
 
 def finish_batch_job(
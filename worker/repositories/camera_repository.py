@@ -1,3 +1,5 @@
+import uuid
+
 from sqlalchemy.orm import Session
 
 from db.models import Camera
@@ -8,12 +10,16 @@ def get_camera_by_id(db: Session, camera_id: int) -> Camera | None:
     return db.query(Camera).filter(Camera.id == camera_id).first()
 
 
-def get_camera_config(db: Session, camera_id: int) -> dict[str, str] | None:
-    """Get camera config with decrypted password for Hikvision client."""
-    camera = get_camera_by_id(db, camera_id)
-    if camera is None:
-        return None
+def get_all_cameras(db: Session) -> list[Camera]:
+    return db.query(Camera).all()
+
+
+def get_camera_ids(db: Session) -> list[uuid.UUID]:
+    return [camera_id for (camera_id,) in db.query(Camera.id).all()]
+
 
+def build_camera_config(camera: Camera) -> dict[str, str]:
+    """Build camera config from an already loaded camera, without a query."""
     return {
         "base_url": camera.base_url,
         "username": camera.cam_username,
@@ -1,31 +1,83 @@
-from sqlalchemy.orm import Session
+import uuid
+from datetime import datetime, timezone
 
-from db.models import PackingItem, PackingStatus
+from sqlalchemy import Row, or_, select
+from sqlalchemy.orm import Query, Session, contains_eager
 
+from db.models import Camera, PackingItem, PackingStatus, Workstation
 
-def get_ready_for_batch(db: Session, limit: int) -> list[PackingItem]:
-    """Get packing items that are ready for batch processing."""
-    return (
-        db.query(PackingItem)
-        .filter(PackingItem.status == PackingStatus.READY_FOR_BATCH)
-        .limit(limit)
-        .all()
+
+def get_ready_for_batch(
+    db: Session,
+    limit: int,
+    exclude_base_urls: list[str] | None = None,
+    camera_ids: list[uuid.UUID] | None = None,
+) -> list[PackingItem]:
+    """Get packing items that are ready for batch processing, oldest end_time first.
+
+    Workstation and camera are loaded in the same query. Items scheduled for
+    a later retry are skipped until next_attempt_at. Items whose camera base
+    URL is in exclude_base_urls (e.g. open circuits) are skipped so they
+    don't crowd out healthy cameras. camera_ids limits the poll to the
+    cameras owned by this worker process.
+    """
+    now = datetime.now(timezone.utc)
+    query = _with_camera(db.query(PackingItem)).filter(
+        PackingItem.status == PackingStatus.READY_FOR_BATCH,
+        or_(PackingItem.next_attempt_at.is_(None), PackingItem.next_attempt_at <= now),
     )
 
+    if exclude_base_urls:
+        query = query.filter(Camera.base_url.notin_(exclude_base_urls))
+
+    if camera_ids is not None:
+        query = query.filter(Workstation.camera_id.in_(camera_ids))
 
-def update_status(db: Session, packing_item_id: int, status: PackingStatus) -> None:
-    """Update packing item status."""
-    db.query(PackingItem).filter(PackingItem.id == packing_item_id).update(
-        {"status": status}
+    # Matches packing_items_ready_end_time_idx (partial on READY_FOR_BATCH)
+    return query.order_by(PackingItem.end_time, PackingItem.id).limit(limit).all()
+
+
+def get_in_progress(
+    db: Session,
+    started_after: datetime,
+    camera_ids: list[uuid.UUID] | None = None,
+) -> list[PackingItem]:
+    """PENDING items whose packing started after started_after and hasn't ended yet."""
+    query = _with_camera(db.query(PackingItem)).filter(
+        PackingItem.status == PackingStatus.PENDING,
+        PackingItem.start_time > started_after,
+        PackingItem.end_time.is_(None),
     )
-    db.commit()
 
+    if camera_ids is not None:
+        query = query.filter(Workstation.camera_id.in_(camera_ids))
+
+    return query.order_by(PackingItem.start_time).all()
 
-def mark_as_clip_generated(db: Session, packing_item_id: int) -> None:
-    """Mark packing item as clip generated."""
-    update_status(db, packing_item_id, PackingStatus.CLIP_GENERATED)
 
+def get_with_camera(db: Session, packing_item_id: str) -> PackingItem | None:
+    """Get packing item with its workstation and camera loaded in the same query."""
+    return _with_camera(db.query(PackingItem)).filter(PackingItem.id == packing_item_id).first()
 
-def mark_as_error(db: Session, packing_item_id: int) -> None:
-    """Mark packing item as error."""
-    update_status(db, packing_item_id, PackingStatus.ERROR)
+
+def get_status_and_camera(db: Session, packing_item_id: str) -> Row[tuple[PackingStatus, uuid.UUID]] | None:
+    """Status and camera ID of a packing item, two columns and no ORM objects."""
+    return db.execute(
+        select(PackingItem.status, Workstation.camera_id)
+        .join(PackingItem.workstation)
+        .where(PackingItem.id == packing_item_id)
+    ).first()
+
+
+def get_many_with_camera(db: Session, packing_item_ids: list[str]) -> list[PackingItem]:
+    """Get packing items with their workstation and camera loaded in the same query."""
+    return _with_camera(db.query(PackingItem)).filter(PackingItem.id.in_(packing_item_ids)).all()
+
+
+def _with_camera(query: Query) -> Query:
+    """Join workstation and camera and populate the relationships from the join."""
+    return (
+        query.join(PackingItem.workstation)
+        .join(Workstation.camera)
+        .options(contains_eager(PackingItem.workstation).contains_eager(Workstation.camera))
+    )
@@ -0,0 +1,239 @@
+import logging
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import Table, cast, column, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db.models import (
+    BatchJobItem,
+    BatchItemStatus,
+    MiniClip,
+    MiniClipStatus,
+    PackingItem,
+    PackingStatus,
+)
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def _utc_now() -> datetime:
+    """Get current UTC time with timezone info."""
+    return datetime.now(timezone.utc)
+
+
+class StatusRecorder:
+    """Write-behind buffer for batch item, packing item and mini clip writes.
+
+    Transitions are coalesced per row and written in bulk
+    UPDATE ... FROM (VALUES ...) statements, either on an interval by the
+    flush loop or immediately for the final CLIP_GENERATED transition, which
+    is written in the same transaction as its mini_clip row.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Serializes flushes so buffered transitions are written in order
+        self._flush_lock = threading.Lock()
+        self._batch_items: dict[uuid.UUID, dict[str, object]] = {}
+        self._packing_items: dict[uuid.UUID, dict[str, object]] = {}
+        self._mini_clips: list[dict[str, object]] = []
+        # Run once the mini clip rows buffered with them are committed
+        self._on_written: list[Callable[[], None]] = []
+
+    def _set(self, rows: dict[uuid.UUID, dict[str, object]], row_id: uuid.UUID, **fields: object) -> None:
+        with self._lock:
+            rows.setdefault(row_id, {}).update(fields)
+
+    def mark_item_processing(self, batch_item_id: uuid.UUID) -> None:
+        self._set(self._batch_items, batch_item_id, status=BatchItemStatus.PROCESSING, started_at=_utc_now())
+
+    def mark_item_failed(self, batch_item_id: uuid.UUID, error_message: str) -> None:
+        self._set(
+            self._batch_items,
+            batch_item_id,
+            status=BatchItemStatus.FAILED,
+            error_message=error_message,
+            finished_at=_utc_now(),
+        )
+
+    def mark_item_deferred(self, batch_item_id: uuid.UUID, reason: str) -> None:
+        """Batch item noted as deferred, the packing item stays ready for a later batch."""
+        self.mark_item_failed(batch_item_id, f"Deferred: {reason}")
+
+    def schedule_retry(
+        self,
+        packing_item_id: uuid.UUID,
+        retry_count: int,
+        next_attempt_at: datetime,
+        error_message: str,
+    ) -> None:
+        self._set(
+            self._packing_items,
+            packing_item_id,
+            status=PackingStatus.READY_FOR_BATCH,
+            retry_count=retry_count,
+            next_attempt_at=next_attempt_at,
+            last_error=error_message,
+        )
+
+    def mark_as_error(self, packing_item_id: uuid.UUID, error_message: str | None = None) -> None:
+        self._set(
+            self._packing_items,
+            packing_item_id,
+            status=PackingStatus.ERROR,
+            next_attempt_at=None,
+            last_error=error_message,
+        )
+
+    def complete_item(
+        self,
+        packing_item_id: uuid.UUID,
+        batch_item_id: uuid.UUID | None,
+        camera_id: uuid.UUID,
+        storage_path: str,
+        duration_sec: int,
+        filesize_bytes: int,
+        poster_path: str | None = None,
+        preview_path: str | None = None,
+        byte_offset: int | None = None,
+        byte_length: int | None = None,
+        uploaded: bool = True,
+        on_written: Callable[[], None] | None = None,
+    ) -> bool:
+        """Record the mini clip and CLIP_GENERATED, and flush before returning.
+
+        A clip in a pack that is not uploaded yet is recorded PENDING, the
+        archive flush marks it UPLOADED with the pack. If the flush fails the
+        transition stays buffered for the flush loop, the clip is uploaded
+        and the item must not be failed over it. Returns whether it was
+        written. on_written runs once the row is committed.
+        """
+        with self._lock:
+            self._mini_clips.append({
+                "packing_item_id": packing_item_id,
+                "camera_id": camera_id,
+                "storage_path": storage_path,
+                "duration_sec": duration_sec,
+                "filesize_bytes": filesize_bytes,
+                "poster_path": poster_path,
+                "preview_path": preview_path,
+                "byte_offset": byte_offset,
+                "byte_length": byte_length,
+                "generated_at": _utc_now(),
+                "status": MiniClipStatus.UPLOADED if uploaded else MiniClipStatus.PENDING,
+            })
+            if on_written is not None:
+                self._on_written.append(on_written)
+            self._packing_items.setdefault(packing_item_id, {}).update(
+                status=PackingStatus.CLIP_GENERATED, next_attempt_at=None
+            )
+            if batch_item_id is not None:
+                self._batch_items.setdefault(batch_item_id, {}).update(
+                    status=BatchItemStatus.SUCCESS, finished_at=_utc_now()
+                )
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Clip of packing_item_id={packing_item_id} kept for the next status flush: {e}")
+            return False
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._batch_items) + len(self._packing_items) + len(self._mini_clips)
+
+    def flush(self) -> None:
+        """Write all buffered transitions in one transaction."""
+        with self._flush_lock:
+            with self._lock:
+                batch_items, self._batch_items = self._batch_items, {}
+                packing_items, self._packing_items = self._packing_items, {}
+                mini_clips, self._mini_clips = self._mini_clips, []
+                on_written, self._on_written = self._on_written, []
+
+            if not (batch_items or packing_items or mini_clips):
+                return
+            # An item completed again before its first row was written (resumed
+            # by another batch), the upsert can't touch a row twice, last one wins
+            rows = list({row["packing_item_id"]: row for row in mini_clips}.values())
+
+            db = SessionLocal()
+            try:
+                # Mini clips first so CLIP_GENERATED never lands without its clip row
+                if rows:
+                    stmt = insert(MiniClip)
+                    db.execute(
+                        stmt.on_conflict_do_update(
+                            index_elements=[MiniClip.packing_item_id],
+                            set_={
+                                name: stmt.excluded[name]
+                                for name in rows[0]
+                                if name != "packing_item_id"
+                            },
+                        ),
+                        rows,
+                    )
+                _bulk_update(db, PackingItem.__table__, packing_items)
+                _bulk_update(db, BatchJobItem.__table__, batch_items)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._requeue(batch_items, packing_items, mini_clips, on_written)
+                raise
+            finally:
+                db.close()
+
+            for callback in on_written:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Error after writing mini clips: {e}")
+
+            logger.debug(
+                f"Flushed {len(batch_items)} batch item, {len(packing_items)} packing item "
+                f"and {len(mini_clips)} mini clip writes"
+            )
+
+    def _requeue(
+        self,
+        batch_items: dict[uuid.UUID, dict[str, object]],
+        packing_items: dict[uuid.UUID, dict[str, object]],
+        mini_clips: list[dict[str, object]],
+        on_written: list[Callable[[], None]],
+    ) -> None:
+        """Put back writes of a failed flush, under anything recorded since."""
+        with self._lock:
+            for pending, failed in ((self._batch_items, batch_items), (self._packing_items, packing_items)):
+                for row_id, fields in failed.items():
+                    pending[row_id] = {**fields, **pending.get(row_id, {})}
+            self._mini_clips = mini_clips + self._mini_clips
+            self._on_written = on_written + self._on_written
+
+
+def _bulk_update(db: Session, table: Table, rows: dict[uuid.UUID, dict[str, object]]) -> None:
+    """UPDATE table SET ... FROM (VALUES ...) WHERE id = v.id, one statement per column set."""
+    groups: dict[tuple[str, ...], list[tuple[object, ...]]] = {}
+    for row_id, fields in rows.items():
+        names = tuple(sorted(fields))
+        groups.setdefault(names, []).append((row_id, *(fields[name] for name in names)))
+
+    for names, data in groups.items():
+        v = values(
+            column("id", table.c.id.type),
+            *(column(name, table.c[name].type) for name in names),
+            name="v",
+        ).data(data)
+        # VALUES columns come back untyped, cast them to the target column types
+        db.execute(
+            update(table)
+            .where(table.c.id == cast(v.c.id, table.c.id.type))
+            .values({name: cast(v.c[name], table.c[name].type) for name in names})
+        )
+
+
+status_recorder = StatusRecorder()
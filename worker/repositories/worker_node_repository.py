@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db.models import WorkerNode
+
+
+def heartbeat(db: Session, node_id: str, hostname: str, workers: int, started_at: datetime) -> None:
+    """Register the node or refresh its heartbeat.
+
+    Heartbeats and liveness cutoffs use the database clock, so nodes with
+    skewed clocks still agree on which nodes are live.
+    """
+    now = func.now()
+    stmt = insert(WorkerNode).values(
+        id=node_id,
+        hostname=hostname,
+        workers=workers,
+        started_at=started_at,
+        heartbeat_at=now,
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[WorkerNode.id],
+            set_={"workers": workers, "heartbeat_at": now},
+        )
+    )
+    db.commit()
+
+
+def get_live_nodes(db: Session, timeout_seconds: int) -> dict[str, int]:
+    """Node IDs with a heartbeat within timeout_seconds, mapped to their worker count."""
+    cutoff = func.now() - timedelta(seconds=timeout_seconds)
+    rows = db.query(WorkerNode.id, WorkerNode.workers).filter(WorkerNode.heartbeat_at > cutoff).all()
+    return {node_id: workers for node_id, workers in rows}
+
+
+def delete_node(db: Session, node_id: str) -> None:
+    """Leave the cluster, the other nodes take over this node's cameras on their next poll."""
+    db.query(WorkerNode).filter(WorkerNode.id == node_id).delete()
+    db.commit()
+
+
+def delete_stale_nodes(db: Session, older_than_seconds: int) -> int:
+    """Remove rows of nodes that died without leaving."""
+    cutoff = func.now() - timedelta(seconds=older_than_seconds)
+    deleted = db.query(WorkerNode).filter(WorkerNode.heartbeat_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,253 @@
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def packs_dir() -> str:
+    return os.path.join(settings.TEMP_VIDEO_DIR, "packs")
+
+
+def packable(duration: float) -> bool:
+    """Whether a clip of this length goes into a pack instead of its own object."""
+    return settings.ARCHIVE_PACK_ENABLED and duration <= settings.ARCHIVE_PACK_MAX_CLIP_SECONDS
+
+
+class PackedClip:
+    """A clip stored at [byte_offset, byte_offset + byte_length) of a pack object.
+
+    While the pack is still local, the clip keeps a shared lock on it so the
+    pack is not uploaded (and its mini_clip rows marked uploaded) before the
+    clip's own row is written. release() once it is.
+    """
+
+    def __init__(
+        self,
+        pack_path: str,
+        storage_path: str,
+        byte_offset: int,
+        byte_length: int,
+        fd: int | None = None,
+    ):
+        self.pack_path = pack_path
+        self.storage_path = storage_path
+        self.byte_offset = byte_offset
+        self.byte_length = byte_length
+        self._fd = fd
+
+    @property
+    def pending(self) -> bool:
+        """True until the pack object is uploaded."""
+        return self._fd is not None
+
+    def release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+@contextmanager
+def _packs_lock() -> Iterator[None]:
+    """Serializes picking, appending to and sealing packs across threads and worker processes."""
+    os.makedirs(packs_dir(), exist_ok=True)
+    with open(os.path.join(packs_dir(), ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _index_path(pack_path: str) -> str:
+    return os.path.splitext(pack_path)[0] + ".json"
+
+
+def _read_index(pack_path: str) -> dict:
+    with open(_index_path(pack_path)) as f:
+        return json.load(f)
+
+
+def _write_index(pack_path: str, index: dict) -> None:
+    path = _index_path(pack_path)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _indexes() -> Iterator[tuple[str, dict]]:
+    """(pack path, index) of every local pack."""
+    root = packs_dir()
+    if not os.path.isdir(root):
+        return
+    for camera_id in os.listdir(root):
+        camera_dir = os.path.join(root, camera_id)
+        if not os.path.isdir(camera_dir):
+            continue
+        for name in os.listdir(camera_dir):
+            if not name.endswith(".json"):
+                continue
+            pack_path = os.path.join(camera_dir, name[: -len(".json")] + ".pack")
+            try:
+                yield pack_path, _read_index(pack_path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable pack index {name}: {e}")
+
+
+def _open_pack(camera_id: uuid.UUID | str, hour: str) -> tuple[str, dict]:
+    """The unsealed pack of the camera and hour, a new one if there is none."""
+    camera_dir = os.path.join(packs_dir(), str(camera_id))
+    os.makedirs(camera_dir, exist_ok=True)
+    for name in os.listdir(camera_dir):
+        if name.startswith(f"{hour}-") and name.endswith(".json"):
+            pack_path = os.path.join(camera_dir, name[: -len(".json")] + ".pack")
+            index = _read_index(pack_path)
+            if not index["sealed"]:
+                return pack_path, index
+
+    name = f"{hour}-{uuid.uuid4().hex[:8]}"
+    pack_path = os.path.join(camera_dir, f"{name}.pack")
+    index = {
+        "bucket": settings.GCS_BUCKET,
+        "object": f"cctv/{camera_id}/packs/{name}.pack",
+        "created_at": time.time(),
+        "bytes": 0,
+        "sealed": False,
+        "entries": [],
+    }
+    _write_index(pack_path, index)
+    return pack_path, index
+
+
+def _storage_path(index: dict) -> str:
+    return f"gs://{index['bucket']}/{index['object']}"
+
+
+def append(camera_id: uuid.UUID | str, hour: str, clip_path: str, packing_item_id: uuid.UUID) -> PackedClip:
+    """Append a clip to the camera's pack for the hour (e.g. "2024010113").
+
+    The clip bytes are fsynced and indexed before this returns. A pack is
+    sealed once it reaches ARCHIVE_PACK_MAX_BYTES, the next clip starts a new one.
+    """
+    length = os.path.getsize(clip_path)
+    with _packs_lock():
+        pack_path, index = _open_pack(camera_id, hour)
+        offset = index["bytes"]
+        fd = os.open(pack_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            # Never blocks: only sealed packs are locked exclusively, by their upload
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            # Drop what a worker that crashed mid-append left past the index
+            os.ftruncate(fd, offset)
+            os.lseek(fd, offset, os.SEEK_SET)
+            with open(clip_path, "rb") as src:
+                copied = 0
+                while copied < length:
+                    sent = os.sendfile(fd, src.fileno(), None, length - copied)
+                    if sent == 0:
+                        raise OSError(f"{clip_path} shrank while appending it to {pack_path}")
+                    copied += sent
+            os.fsync(fd)
+
+            index["bytes"] = offset + length
+            index["entries"].append({"packing_item_id": str(packing_item_id), "offset": offset, "length": length})
+            if index["bytes"] >= settings.ARCHIVE_PACK_MAX_BYTES:
+                index["sealed"] = True
+            _write_index(pack_path, index)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    return PackedClip(pack_path, _storage_path(index), offset, length, fd)
+
+
+def reopen(pack_path: str, storage_path: str, byte_offset: int, byte_length: int) -> PackedClip:
+    """A clip appended by an earlier attempt, no longer pending if its pack was uploaded since."""
+    try:
+        fd = os.open(pack_path, os.O_RDONLY)
+    except FileNotFoundError:
+        return PackedClip(pack_path, storage_path, byte_offset, byte_length)
+
+    # Waits for an upload in progress, which unlinks the pack when done
+    fcntl.flock(fd, fcntl.LOCK_SH)
+    if os.fstat(fd).st_nlink == 0:
+        os.close(fd)
+        return PackedClip(pack_path, storage_path, byte_offset, byte_length)
+    return PackedClip(pack_path, storage_path, byte_offset, byte_length, fd)
+
+
+def seal_due(max_age_seconds: float) -> int:
+    """Seal packs opened more than max_age_seconds ago. Returns count sealed."""
+    sealed = 0
+    now = time.time()
+    with _packs_lock():
+        for pack_path, index in _indexes():
+            if not index["sealed"] and now - index["created_at"] >= max_age_seconds:
+                index["sealed"] = True
+                _write_index(pack_path, index)
+                sealed += 1
+    return sealed
+
+
+def sealed_packs() -> list[str]:
+    """Local packs waiting for upload, oldest first."""
+    packs = []
+    for pack_path, index in _indexes():
+        if not index["sealed"]:
+            continue
+        if not os.path.exists(pack_path):
+            # Uploaded (or never written) and the index left behind by a crash
+            try:
+                os.remove(_index_path(pack_path))
+            except OSError:
+                pass
+            continue
+        packs.append((index["created_at"], pack_path))
+    return [pack_path for _, pack_path in sorted(packs)]
+
+
+def pending_bytes() -> int:
+    return sum(index["bytes"] for _, index in _indexes())
+
+
+@contextmanager
+def claim(pack_path: str) -> Iterator[dict | None]:
+    """Exclusive hold on a sealed pack for its upload.
+
+    Yields its index, or None if clips in it are still being recorded or
+    another thread or worker process has it.
+    """
+    try:
+        fd = os.open(pack_path, os.O_RDONLY)
+    except FileNotFoundError:
+        yield None
+        return
+
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield None
+            return
+        if os.fstat(fd).st_nlink == 0:
+            yield None
+            return
+        yield _read_index(pack_path)
+    finally:
+        os.close(fd)
+
+
+def remove(pack_path: str) -> None:
+    """Delete an uploaded pack, called while holding its claim."""
+    os.remove(pack_path)
+    os.remove(_index_path(pack_path))
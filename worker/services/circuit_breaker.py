@@ -0,0 +1,135 @@
+import enum
+import logging
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, enum.Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CameraUnavailableError(Exception):
+    """Raised when a camera's circuit is open and the request is short-circuited."""
+    pass
+
+
+class CircuitBreaker:
+    """Per-camera circuit breaker for NVR/DVR connection failures.
+
+    CLOSED: requests pass through, failed requests (connection, timeout, TLS) are counted.
+    OPEN: requests fail fast until a background probe reaches the device.
+    HALF_OPEN: a single trial request is let through to confirm recovery.
+    """
+
+    def __init__(self, key: str, failure_threshold: int, open_seconds: int):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return True
+            if self.state == CircuitState.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CircuitState.CLOSED:
+                logger.info(f"Circuit for {self.key} closed")
+            self.state = CircuitState.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != CircuitState.OPEN:
+                    logger.warning(
+                        f"Circuit for {self.key} opened after {self.failures} failed requests"
+                    )
+                self.state = CircuitState.OPEN
+                self.opened_at = time.monotonic()
+
+    def probe_due(self) -> bool:
+        with self._lock:
+            return (
+                self.state == CircuitState.OPEN
+                and time.monotonic() - self.opened_at >= self.open_seconds
+            )
+
+    def record_probe(self, reachable: bool) -> None:
+        """Move to HALF_OPEN on a successful probe, otherwise restart the open period."""
+        with self._lock:
+            if self.state != CircuitState.OPEN:
+                return
+            if reachable:
+                logger.info(f"Circuit for {self.key} half-open, probe succeeded")
+                self.state = CircuitState.HALF_OPEN
+                self._trial_in_flight = False
+            else:
+                self.opened_at = time.monotonic()
+
+
+# Breakers are keyed by NVR base URL so every HikvisionClient shares them
+_breakers: dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(base_url: str) -> CircuitBreaker:
+    key = base_url.rstrip("/")
+    with _registry_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                key,
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                open_seconds=settings.CIRCUIT_OPEN_SECONDS,
+            )
+            _breakers[key] = breaker
+        return breaker
+
+
+def all_breakers() -> list[CircuitBreaker]:
+    with _registry_lock:
+        return list(_breakers.values())
+
+
+def open_circuits() -> list[str]:
+    """Base URLs of cameras whose circuit is open.
+
+    Half-open cameras are left out so an item can make the trial request
+    that closes the circuit again.
+    """
+    return [b.key for b in all_breakers() if b.state == CircuitState.OPEN]
+
+
+def probe(base_url: str, timeout: float) -> bool:
+    """Cheap reachability check: open a TCP connection to the device."""
+    parsed = urlparse(base_url)
+    host = parsed.hostname
+    if host is None:
+        return False
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
@@ -0,0 +1,207 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlparse
+
+from config import settings
+from services.errors import TransientError
+from services.shared_state import entry_key, locked_entries
+from services.utils import MIN_DISK_SPACE_BYTES, parse_time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ItemEstimate:
+    """Estimated bytes written by each stage of one item."""
+    raw: int
+    merged: int
+    output: int
+
+    @property
+    def total(self) -> int:
+        return self.raw + self.merged + self.output
+
+
+def segment_bytes(seg: dict[str, str | None], fallback_seconds: float) -> int:
+    """Size of a segment from its playbackURI, or estimated from its duration."""
+    query = urlparse(seg.get("playbackURI") or "").query
+    for key, value in parse_qsl(query):
+        if key.lower() == "size" and value.isdigit():
+            return int(value)
+
+    seconds = fallback_seconds
+    if seg.get("start") and seg.get("end"):
+        seconds = (parse_time(seg["end"]) - parse_time(seg["start"])).total_seconds()
+    return int(max(seconds, 0) * settings.ESTIMATED_BITRATE_BPS / 8)
+
+
+def estimate_item_bytes(segments: list[dict[str, str | None]], clip_seconds: float) -> ItemEstimate:
+    """Estimate raw, merged and output sizes of an item from its segments."""
+    raw = sum(segment_bytes(seg, clip_seconds) for seg in segments)
+    clip_bytes = int(clip_seconds * settings.ESTIMATED_BITRATE_BPS / 8)
+    return ItemEstimate(raw=raw, merged=raw, output=min(raw, clip_bytes) if raw else clip_bytes)
+
+
+class DiskBudget:
+    """Byte reservations against the free space of a scratch directory.
+
+    Items reserve what they will still write before starting, shrink the
+    reservation as stages finish (the written bytes then show up in the real
+    free space) and release it when done. Reservations that don't fit wait
+    until others release, or fail with a TransientError after a timeout.
+
+    Reservations live in a state file shared by every process of the node
+    (WORKERS > 1 and the API process), so together they never reserve more
+    than the tier has. Releases in another process are seen on the next
+    poll, releases in this one wake waiters right away.
+    """
+
+    # Seconds between re-checks while waiting, other processes can't notify
+    POLL_SECONDS = 1
+
+    def __init__(self, name: str, path: str, floor_bytes: int, capacity_bytes: int | None = None):
+        self.name = name
+        self.path = path
+        self.floor_bytes = floor_bytes
+        self.capacity_bytes = capacity_bytes
+        self._cond = threading.Condition()
+
+    def _reservations(self) -> AbstractContextManager[dict[str, dict]]:
+        return locked_entries(f"reservations-{self.name}")
+
+    def _usage(self) -> tuple[int, int, int]:
+        os.makedirs(self.path, exist_ok=True)
+        stat = shutil.disk_usage(self.path)
+        if self.capacity_bytes is None:
+            return stat.total, stat.used, stat.free
+
+        # A capped tier (e.g. tmpfs shared with other users) only counts its own files
+        used = _dir_size(self.path)
+        free = min(stat.free, max(self.capacity_bytes - used, 0))
+        return self.capacity_bytes, used, free
+
+    def _available(self, reservations: dict[str, dict]) -> int:
+        _, _, free = self._usage()
+        return free - self.floor_bytes - sum(entry["bytes"] for entry in reservations.values())
+
+    def try_reserve(self, key: str, nbytes: int) -> "Reservation | None":
+        """Reserve without waiting, None if the bytes don't fit."""
+        with self._cond:
+            try:
+                with self._reservations() as reservations:
+                    if self._available(reservations) < nbytes:
+                        return None
+                    reservations[entry_key(key)] = {"pid": os.getpid(), "bytes": nbytes}
+            except OSError as e:
+                logger.warning(f"Scratch dir {self.path} unusable: {e}")
+                return None
+            return Reservation(self, key)
+
+    def reserve(self, key: str, nbytes: int, timeout: float | None = None) -> "Reservation":
+        """Reserve nbytes for key, waiting for other items to release space."""
+        if timeout is None:
+            timeout = settings.DISK_RESERVE_TIMEOUT_SECONDS
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                with self._reservations() as reservations:
+                    available = self._available(reservations)
+                    if available >= nbytes:
+                        reservations[entry_key(key)] = {"pid": os.getpid(), "bytes": nbytes}
+                if available >= nbytes:
+                    logger.debug(f"Reserved {nbytes} bytes for {key} in {self.path}")
+                    return Reservation(self, key)
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TransientError(
+                        f"Insufficient disk budget in {self.path}: need {nbytes} bytes, "
+                        f"{max(available, 0)} available"
+                    )
+                logger.info(f"Waiting for disk budget for {key} ({nbytes} bytes)")
+                # Re-check periodically, free space and other processes' reservations change too
+                self._cond.wait(min(remaining, self.POLL_SECONDS))
+
+    def _set(self, key: str, nbytes: int) -> None:
+        with self._cond:
+            with self._reservations() as reservations:
+                entry = reservations.get(entry_key(key))
+                if entry is not None:
+                    reservations[entry_key(key)] = {**entry, "bytes": nbytes}
+            self._cond.notify_all()
+
+    def _release(self, key: str) -> None:
+        with self._cond:
+            with self._reservations() as reservations:
+                reservations.pop(entry_key(key), None)
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, int | str]:
+        """Usage and the reservations of every process of the node."""
+        with self._reservations() as reservations:
+            total, used, free = self._usage()
+            reserved = sum(entry["bytes"] for entry in reservations.values())
+            return {
+                "path": self.path,
+                "total_bytes": total,
+                "used_bytes": used,
+                "free_bytes": free,
+                "reserved_bytes": reserved,
+                "available_bytes": max(free - self.floor_bytes - reserved, 0),
+                "reservations": len(reservations),
+            }
+
+
+class Reservation:
+    """Handle on one key's reservation, usable as a context manager."""
+
+    def __init__(self, budget: DiskBudget, key: str):
+        self.budget = budget
+        self.key = key
+
+    def shrink(self, nbytes: int) -> None:
+        """Lower the reservation to the bytes still to be written."""
+        self.budget._set(self.key, nbytes)
+
+    def release(self) -> None:
+        self.budget._release(self.key)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.release()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+disk_budget = DiskBudget("disk", settings.TEMP_VIDEO_DIR, MIN_DISK_SPACE_BYTES)
+
+# RAM-backed staging tier (tmpfs) for items small enough to fit, None when disabled
+memory_budget = (
+    DiskBudget("memory", settings.MEMORY_STAGING_DIR, 0, capacity_bytes=settings.MEMORY_STAGING_BYTES)
+    if settings.MEMORY_STAGING_BYTES > 0
+    else None
+)
+
+
+def budget_for(root: str) -> DiskBudget:
+    """Budget of the scratch tier a work dir lives in."""
+    if memory_budget is not None and root == memory_budget.path:
+        return memory_budget
+    return disk_budget
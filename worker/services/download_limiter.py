@@ -0,0 +1,145 @@
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Downloads smaller than this are mostly request latency, they don't say
+# anything about the NVR's throughput
+MIN_SAMPLE_BYTES = 1_048_576
+# Weight of the newest sample in the per-concurrency throughput averages
+THROUGHPUT_ALPHA = 0.3
+# One more parallel download has to add this much aggregate throughput to be kept
+MIN_GAIN = 0.05
+MULTIPLICATIVE_DECREASE = 0.5
+
+
+@dataclass
+class Ticket:
+    """A granted download slot, handed back to release()."""
+
+    started_at: float
+    # Limiter's downloads-seconds total when the slot was granted
+    busy_at: float
+
+
+class DownloadLimiter:
+    """AIMD limit on concurrent segment downloads from one NVR.
+
+    Every successful download that ran with all slots in use adds 1/limit
+    to the limit, so it grows by one per limit's worth of downloads, as long
+    as aggregate throughput keeps growing with concurrency. Aggregate
+    throughput is estimated per concurrency level from each download's rate
+    times the average number of downloads running alongside it. If one more
+    download no longer adds MIN_GAIN over the level below, the NVR is
+    saturated and the limit steps back. A transient error (timeout, reset,
+    5xx, truncated body) halves the limit, once per congestion event:
+    downloads started before the last decrease don't decrease it again.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.limit = float(settings.DOWNLOAD_PARALLEL_INITIAL)
+        self.active = 0
+        # Integral of active over time, to average the concurrency a download ran at
+        self._busy = 0.0
+        self._busy_updated = time.monotonic()
+        self._throughput: dict[int, float] = {}
+        self._decreased_at = 0.0
+        self._cond = threading.Condition()
+        self._metric = re.sub(r"[^0-9A-Za-z]+", "_", urlparse(key).netloc or key).strip("_")
+        self._publish()
+
+    @property
+    def allowed(self) -> int:
+        return max(settings.DOWNLOAD_PARALLEL_MIN, int(self.limit))
+
+    def acquire(self) -> Ticket:
+        """Wait for a download slot on this NVR."""
+        with self._cond:
+            while self.active >= self.allowed:
+                self._cond.wait()
+            now = self._advance()
+            self.active += 1
+            self._publish()
+            return Ticket(started_at=now, busy_at=self._busy)
+
+    def release(self, ticket: Ticket, nbytes: int = 0, failed: bool = False) -> None:
+        """Hand the slot back with the download's outcome and adjust the limit."""
+        with self._cond:
+            now = self._advance()
+            self.active -= 1
+            if failed:
+                self._decrease(ticket)
+            elif nbytes >= MIN_SAMPLE_BYTES:
+                self._on_success(ticket, nbytes, now)
+            self._publish()
+            self._cond.notify_all()
+
+    def _advance(self) -> float:
+        now = time.monotonic()
+        self._busy += self.active * (now - self._busy_updated)
+        self._busy_updated = now
+        return now
+
+    def _on_success(self, ticket: Ticket, nbytes: int, now: float) -> None:
+        seconds = now - ticket.started_at
+        if seconds <= 0:
+            return
+        level = max(1, round((self._busy - ticket.busy_at) / seconds))
+        sample = nbytes / seconds * level
+        previous = self._throughput.get(level)
+        self._throughput[level] = sample if previous is None else (
+            THROUGHPUT_ALPHA * sample + (1 - THROUGHPUT_ALPHA) * previous
+        )
+
+        below = self._throughput.get(level - 1)
+        if below is not None and self._throughput[level] < below * (1 + MIN_GAIN):
+            if ticket.started_at >= self._decreased_at and self.limit >= level:
+                # Saturated, the extra download only splits the same bandwidth
+                self._set_limit(level - 1, "throughput stopped growing")
+            return
+        # Only grow a limit that is in use, or a quiet NVR would get a burst of downloads later
+        if level >= self.allowed:
+            self._set_limit(self.limit + 1 / self.limit)
+
+    def _decrease(self, ticket: Ticket) -> None:
+        if ticket.started_at < self._decreased_at:
+            return
+        self._set_limit(self.limit * MULTIPLICATIVE_DECREASE, "download failed")
+
+    def _set_limit(self, limit: float, reason: str | None = None) -> None:
+        limit = min(float(settings.DOWNLOAD_PARALLEL_MAX), max(float(settings.DOWNLOAD_PARALLEL_MIN), limit))
+        if reason is not None:
+            self._decreased_at = time.monotonic()
+            if int(limit) != int(self.limit):
+                logger.info(f"Download limit for {self.key} {int(self.limit)} -> {int(limit)}: {reason}")
+        self.limit = limit
+
+    def _publish(self) -> None:
+        metrics.set_gauge(f"download_limit_{self._metric}", self.allowed)
+        metrics.set_gauge(f"download_active_{self._metric}", self.active)
+        if self._throughput:
+            best = max(self._throughput.values())
+            metrics.set_gauge(f"download_throughput_{self._metric}_bps", best * 8)
+
+
+# Limiters are keyed by NVR base URL so every HikvisionClient and item shares them
+_limiters: dict[str, DownloadLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_limiter(base_url: str) -> DownloadLimiter:
+    key = base_url.rstrip("/")
+    with _registry_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = DownloadLimiter(key)
+            _limiters[key] = limiter
+        return limiter
@@ -0,0 +1,68 @@
+import subprocess
+import sys
+
+
+class TransientError(Exception):
+    """Failure expected to clear up on its own (NVR not flushed yet, storage 5xx...)."""
+    pass
+
+
+class PermanentError(Exception):
+    """Failure that retrying will not fix (missing camera, invalid time range...)."""
+    pass
+
+
+# S3/GCS error codes worth retrying besides 5xx responses
+RETRYABLE_CLIENT_ERROR_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestTimeout"}
+
+
+def _is_transient(error: BaseException) -> bool | None:
+    """Classify a single exception, None if it says nothing either way."""
+    if isinstance(error, TransientError):
+        return True
+    if isinstance(error, (PermanentError, ValueError)):
+        return False
+
+    # Looked up rather than imported: nothing can raise their errors before
+    # they are loaded, and importing them here would slow down startup
+    requests = sys.modules.get("requests")
+    if requests is not None:
+        if isinstance(error, requests.HTTPError):
+            status = error.response.status_code if error.response is not None else None
+            return status is None or status >= 500 or status == 429
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+
+    botocore_exceptions = sys.modules.get("botocore.exceptions")
+    if botocore_exceptions is not None:
+        if isinstance(error, botocore_exceptions.ClientError):
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+            code = error.response.get("Error", {}).get("Code", "")
+            return status >= 500 or code in RETRYABLE_CLIENT_ERROR_CODES
+        if isinstance(error, botocore_exceptions.BotoCoreError):
+            return True
+
+    sqlalchemy_exc = sys.modules.get("sqlalchemy.exc")
+    if sqlalchemy_exc is not None:
+        # Database unreachable, restarted or the pool exhausted, not a problem with the item
+        if isinstance(error, (sqlalchemy_exc.OperationalError, sqlalchemy_exc.TimeoutError)):
+            return True
+        if isinstance(error, sqlalchemy_exc.DBAPIError) and error.connection_invalidated:
+            return True
+
+    # ffmpeg failures are usually truncated segments still being written by the NVR
+    if isinstance(error, (subprocess.CalledProcessError, OSError)):
+        return True
+
+    return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """Return True if the failure should be retried. Follows the exception cause chain."""
+    current: BaseException | None = error
+    while current is not None:
+        result = _is_transient(current)
+        if result is not None:
+            return result
+        current = current.__cause__
+    return False
@@ -1,4 +1,5 @@
-import subprocess
+from services.ffmpeg_scheduler import CostClass, ffmpeg_scheduler
+from services.output_profiles import OutputProfile
 
 
 def merge_segments(seg_files: list[str], merged_path: str) -> str:
@@ -20,28 +21,80 @@ def merge_segments(seg_files: list[str], merged_path: str) -> str:
         "copy",
         merged_path,
     ]
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    ffmpeg_scheduler.run(cmd, CostClass.COPY)
     return merged_path
 
 
-def cut_exact(
+def cut_command(
     merged_path: str,
     outpath: str,
     start_offset: float,
     duration: float,
-    exact_cut: bool = False,
-) -> str:
+    profile: OutputProfile,
+    poster_path: str | None = None,
+    poster_offset: float = 0.0,
+    poster_width: int = 640,
+    preview_path: str | None = None,
+    preview_profile: OutputProfile | None = None,
+) -> tuple[list[str], CostClass]:
+    """ffmpeg command and cost class of cut_exact, also used by the benchmarks."""
     cmd = ["ffmpeg", "-y"]
 
     cmd.extend(["-ss", str(start_offset)])
     cmd.extend(["-i", merged_path])
-    cmd.extend(["-t", str(duration)])
 
-    if exact_cut:
-        cmd.extend(["-c:v", "libx264", "-preset", "fast", "-crf", "23", "-c:a", "aac"])
-    else:
-        cmd.extend(["-c", "copy"])
+    # Extra outputs go first, the scheduler gives its -threads to the last one
+    encodes = not profile.copy
+    if preview_path is not None and preview_profile is not None:
+        cmd.extend(["-t", str(duration)])
+        cmd.extend(preview_profile.ffmpeg_args())
+        cmd.extend(["-threads", "1", preview_path])
+        encodes = True
+    if poster_path is not None:
+        # Decodes the cut range even when the clip is a stream copy, so it counts as an encode
+        encodes = True
+        # Output side -ss decodes up to the frame instead of seeking again
+        cmd.extend(["-ss", str(min(max(poster_offset, 0.0), duration / 2))])
+        cmd.extend(["-frames:v", "1", "-an", "-vf", f"scale='min({poster_width},iw)':-2"])
+        cmd.extend(["-q:v", "3", "-update", "1", "-threads", "1", poster_path])
+
+    cmd.extend(["-t", str(duration)])
+    cmd.extend(profile.ffmpeg_args())
 
     cmd.append(outpath)
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    return cmd, CostClass.ENCODE if encodes else CostClass.COPY
+
+
+def cut_exact(
+    merged_path: str,
+    outpath: str,
+    start_offset: float,
+    duration: float,
+    profile: OutputProfile,
+    poster_path: str | None = None,
+    poster_offset: float = 0.0,
+    poster_width: int = 640,
+    preview_path: str | None = None,
+    preview_profile: OutputProfile | None = None,
+) -> str:
+    """Cut [start_offset, start_offset + duration] and encode it with the output profile.
+
+    A copy profile cuts on keyframes, any other re-encodes and is frame exact.
+    The optional poster JPEG (poster_offset into the clip) and preview rendition
+    are extra outputs of the same ffmpeg run, so the cut range is read and
+    decoded once for all of them.
+    """
+    cmd, cost = cut_command(
+        merged_path,
+        outpath,
+        start_offset,
+        duration,
+        profile,
+        poster_path=poster_path,
+        poster_offset=poster_offset,
+        poster_width=poster_width,
+        preview_path=preview_path,
+        preview_profile=preview_profile,
+    )
+    ffmpeg_scheduler.run(cmd, cost)
     return outpath
@@ -0,0 +1,262 @@
+import logging
+import math
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import IO
+
+from config import settings
+from services.errors import TransientError
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CostClass(str, Enum):
+    """CPU cost of an ffmpeg command."""
+
+    COPY = "copy"  # stream copy, I/O bound
+    ENCODE = "encode"  # full re-encode
+
+
+class FfmpegError(subprocess.CalledProcessError):
+    """ffmpeg exited non-zero, the message carries the tail of its stderr."""
+
+    def __str__(self) -> str:
+        return f"{super().__str__()}: {self.stderr}" if self.stderr else super().__str__()
+
+
+class FfmpegStalledError(TransientError):
+    """ffmpeg stopped making progress and was killed."""
+    pass
+
+
+def cpu_quota() -> float:
+    """CPUs this process may use: cgroup quota if set, capped by the affinity mask."""
+    cpus = float(len(os.sched_getaffinity(0)))
+
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1, -1 means unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    if quota is not None:
+        cpus = min(cpus, quota)
+    return max(cpus, 1.0)
+
+
+class FfmpegScheduler:
+    """Runs ffmpeg commands by cost class.
+
+    Encodes share a fixed number of slots sized from this process's share of
+    the CPU quota, each with a -threads cap and a lower priority. Copy jobs
+    bypass the encode queue and run right away.
+    """
+
+    def __init__(self, cpus: float, max_encodes: int = 0, nice: int = 0):
+        self.cpus = cpus
+        # Two threads per encode keeps libx264 efficient without oversubscribing
+        self.encode_slots = max_encodes or max(1, math.floor(cpus / 2))
+        self.threads = max(1, math.floor(cpus / self.encode_slots))
+        self.nice = nice
+        self._slots = threading.BoundedSemaphore(self.encode_slots)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiting = 0
+        metrics.set_gauge("ffmpeg_cpus", cpus)
+        metrics.set_gauge("ffmpeg_encode_slots", self.encode_slots)
+        metrics.set_gauge("ffmpeg_threads_per_encode", self.threads)
+
+    def run(self, cmd: list[str], cost: CostClass) -> None:
+        """Run cmd, raising FfmpegError if ffmpeg fails or FfmpegStalledError if it hangs."""
+        if cost is CostClass.COPY:
+            _run(cmd, cost)
+            return
+
+        self._update(waiting=1)
+        self._slots.acquire()
+        self._update(waiting=-1, running=1)
+        try:
+            # -threads is an output option, it goes right before the output path
+            _run(cmd[:-1] + ["-threads", str(self.threads), cmd[-1]], cost, self.nice)
+        finally:
+            self._update(running=-1)
+            self._slots.release()
+
+    def _update(self, waiting: int = 0, running: int = 0) -> None:
+        with self._lock:
+            self._waiting += waiting
+            self._running += running
+            metrics.set_gauge("ffmpeg_encodes_waiting", self._waiting)
+            metrics.set_gauge("ffmpeg_encodes_running", self._running)
+
+
+# ffmpeg processes started by _run, killed when a drain runs out of time
+_running: set[subprocess.Popen] = set()
+_running_lock = threading.Lock()
+
+
+def kill_running() -> int:
+    """Kill every running ffmpeg job, their items fail and resume from the last checkpoint."""
+    with _running_lock:
+        processes = list(_running)
+    for process in processes:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    return len(processes)
+
+
+class _Progress:
+    """Latest values from ffmpeg's -progress output."""
+
+    def __init__(self) -> None:
+        self.fps = 0.0
+        self.speed = 0.0
+        self.position = -1
+        self.advanced_at = time.monotonic()
+
+    def update(self, fields: dict[str, str]) -> None:
+        position = max(_parse_int(fields.get("out_time_us")), _parse_int(fields.get("total_size")))
+        if position > self.position:
+            self.position = position
+            self.advanced_at = time.monotonic()
+        self.fps = _parse_float(fields.get("fps"), self.fps)
+        self.speed = _parse_float(fields.get("speed", "").rstrip("x"), self.speed)
+
+
+def _parse_int(value: str | None) -> int:
+    try:
+        return int(value) if value is not None else -1
+    except ValueError:
+        return -1
+
+
+def _parse_float(value: str | None, default: float) -> float:
+    try:
+        return float(value) if value else default
+    except ValueError:
+        # "N/A" before the first frame
+        return default
+
+
+def _read_progress(stream: IO[str], progress: _Progress) -> None:
+    """Parse key=value lines, a block ends with progress=continue|end."""
+    fields: dict[str, str] = {}
+    for line in stream:
+        key, _, value = line.strip().partition("=")
+        if key == "progress":
+            progress.update(fields)
+            fields = {}
+        elif key:
+            fields[key] = value
+
+
+def _read_stderr(stream: IO[str], tail: deque[str]) -> None:
+    for line in stream:
+        line = line.rstrip()
+        if line:
+            tail.append(line)
+
+
+def _run(cmd: list[str], cost: CostClass, nice: int = 0) -> None:
+    """Run ffmpeg with progress on stdout, killing it if it stops advancing."""
+    cmd = cmd[:1] + ["-nostats", "-progress", "pipe:1"] + cmd[1:]
+    started = time.monotonic()
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        # Own process group, so a kill also takes anything ffmpeg spawned
+        start_new_session=True,
+    )
+    with _running_lock:
+        _running.add(process)
+    if nice:
+        try:
+            # Set after spawn, preexec_fn is not safe with the worker's threads
+            os.setpriority(os.PRIO_PROCESS, process.pid, nice)
+        except OSError as e:
+            logger.debug(f"Could not renice ffmpeg pid={process.pid}: {e}")
+
+    progress = _Progress()
+    tail: deque[str] = deque(maxlen=settings.FFMPEG_STDERR_LINES)
+    readers = [
+        threading.Thread(target=_read_progress, args=(process.stdout, progress), daemon=True),
+        threading.Thread(target=_read_stderr, args=(process.stderr, tail), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    stalled = False
+    while True:
+        try:
+            returncode = process.wait(timeout=1)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        if time.monotonic() - progress.advanced_at > settings.FFMPEG_STALL_SECONDS:
+            stalled = True
+            os.killpg(process.pid, signal.SIGKILL)
+            returncode = process.wait()
+            break
+
+    with _running_lock:
+        _running.discard(process)
+
+    # The pipes close with the process, readers only drain what is left
+    for reader in readers:
+        reader.join(timeout=5)
+
+    elapsed = time.monotonic() - started
+    metrics.incr(f"ffmpeg_{cost.value}_jobs")
+    metrics.observe(f"ffmpeg_{cost.value}_seconds", elapsed)
+    metrics.set_gauge(f"ffmpeg_{cost.value}_fps", progress.fps)
+    metrics.set_gauge(f"ffmpeg_{cost.value}_speed", progress.speed)
+
+    stderr_tail = "\n".join(list(tail)[-5:])
+    if stalled:
+        metrics.incr(f"ffmpeg_{cost.value}_stalls")
+        raise FfmpegStalledError(
+            f"ffmpeg made no progress for {settings.FFMPEG_STALL_SECONDS}s and was killed: {stderr_tail}"
+        )
+    if returncode != 0:
+        metrics.incr(f"ffmpeg_{cost.value}_failures")
+        raise FfmpegError(returncode, cmd, stderr="\n".join(tail))
+    logger.debug(f"ffmpeg {cost.value} done in {elapsed:.1f}s ({progress.fps:.0f} fps, {progress.speed:.1f}x)")
+
+
+def _create_scheduler() -> FfmpegScheduler:
+    # Worker processes of a node share its CPU quota
+    cpus = cpu_quota() / max(1, settings.WORKERS)
+    scheduler = FfmpegScheduler(cpus, settings.FFMPEG_MAX_ENCODES, settings.FFMPEG_ENCODE_NICE)
+    logger.info(
+        f"ffmpeg scheduler: {cpus:.1f} CPUs, {scheduler.encode_slots} encode slots "
+        f"x {scheduler.threads} threads"
+    )
+    return scheduler
+
+
+ffmpeg_scheduler = _create_scheduler()
@@ -1,3 +1,5 @@
+import os
+import threading
 import time
 import requests
 import xml.etree.ElementTree as ET
@@ -8,6 +10,11 @@ from urllib.parse import urlparse
 import urllib3
 
 from config import settings
+from services.circuit_breaker import CameraUnavailableError, get_breaker
+from services.download_writer import Readable, WriteBehindWriter, copy_stream
+from services.download_limiter import get_limiter
+from services.errors import TransientError, is_transient
+from services.recording_catalog import RecordingCatalog
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -17,12 +24,18 @@ class HikvisionClient:
         self.base_url = base_url.rstrip("/")
         self.username = username
         self.password = password
+        self.breaker = get_breaker(self.base_url)
+        self.limiter = get_limiter(self.base_url)
         self.session = self._create_session()
+        # Recordings already searched, lives as long as the shared client
+        self.catalog = RecordingCatalog()
 
     def _create_session(self) -> requests.Session:
         session = requests.Session()
         retry = Retry(
             total=5,
+            # Dead devices are handled by the circuit breaker, not by retrying
+            connect=settings.CAMERA_CONNECT_RETRIES,
             backoff_factor=2,
             status_forcelist=[500, 502, 503, 504],
         )
@@ -36,7 +49,28 @@ class HikvisionClient:
         session.auth = HTTPDigestAuth(self.username, self.password)
         return session
 
+    def _request(self, method: str, url: str, **kwargs: object) -> requests.Response:
+        """Send a request through the camera's circuit breaker."""
+        if not self.breaker.allow_request():
+            raise CameraUnavailableError(f"Camera {self.base_url} is unavailable (circuit open)")
+
+        try:
+            r = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            # Timeouts and TLS errors too, or a failed half-open trial would never be settled
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+        return r
+
     def search_segments(self, start_time: str, end_time: str) -> list[dict[str, str | None]]:
+        """Recordings overlapping the window, from the catalog where earlier searches covered it."""
+        if not settings.RECORDING_CATALOG_ENABLED:
+            return self._search_device(start_time, end_time)
+        return self.catalog.search(start_time, end_time, self._search_device)
+
+    def _search_device(self, start_time: str, end_time: str) -> list[dict[str, str | None]]:
         url = f"{self.base_url}/ISAPI/ContentMgmt/search"
 
         xml_body = f"""<?xml version="1.0" encoding="utf-8"?>
@@ -54,7 +88,8 @@ class HikvisionClient:
     <metadataList><metadataDescriptor>//recordType.meta.std-cgi.com</metadataDescriptor></metadataList>
 </CMSearchDescription>"""
 
-        r = self.session.post(
+        r = self._request(
+            "POST",
             url,
             data=xml_body,
             headers={"Content-Type": "application/xml"},
@@ -95,19 +130,80 @@ class HikvisionClient:
         return res
 
     def download_segment(self, playback_uri: str, outpath: str) -> None:
+        """Download a segment within the NVR's adaptive limit on parallel downloads."""
+        ticket = self.limiter.acquire()
+        try:
+            written = self._download_segment(playback_uri, outpath)
+        except Exception as e:
+            # Only failures that point at an overloaded NVR or network back off
+            self.limiter.release(ticket, failed=is_transient(e))
+            raise
+        self.limiter.release(ticket, nbytes=written)
+
+    def _download_segment(self, playback_uri: str, outpath: str) -> int:
         parsed = urlparse(playback_uri)
         final_url = f"{self.base_url}{parsed.path}"
         if parsed.query:
             final_url = f"{final_url}?{parsed.query}"
 
-        with self.session.get(
+        with self._request(
+            "GET",
             final_url,
             stream=True,
             timeout=(10, 300),
             verify=False,
         ) as r:
+            if r.status_code == 404:
+                # Overwritten by the NVR since it was searched
+                self.catalog.invalidate(playback_uri)
             r.raise_for_status()
-            with open(outpath, "wb") as f:
-                for chunk in r.iter_content(chunk_size=1024 * 1024):
-                    if chunk:
-                        f.write(chunk)
+            expected = int(r.headers.get("Content-Length") or 0)
+            # Write to a temp name so an interrupted download is never mistaken for a complete one
+            partpath = outpath + ".part"
+            with WriteBehindWriter(
+                partpath,
+                expected,
+                settings.DOWNLOAD_BUFFER_BYTES,
+                settings.DOWNLOAD_WRITE_BUFFERS,
+            ) as writer:
+                source = _raw_stream(r)
+                if source is not None:
+                    copy_stream(source, writer)
+                else:
+                    for chunk in r.iter_content(chunk_size=settings.DOWNLOAD_BUFFER_BYTES):
+                        if chunk:
+                            writer.write(chunk)
+            if expected and writer.written != expected:
+                raise TransientError(
+                    f"Segment download truncated: {writer.written} of {expected} bytes"
+                )
+            os.replace(partpath, outpath)
+            return writer.written
+
+
+def _raw_stream(r: requests.Response) -> Readable | None:
+    """The http.client response under urllib3, read with readinto straight into our buffers.
+
+    urllib3's own readinto reads into a new bytes object and copies it. The
+    raw response is only used when there is no content encoding to undo.
+    """
+    if r.headers.get("Content-Encoding", "identity").lower() != "identity":
+        return None
+    fp = getattr(r.raw, "_fp", None)
+    return fp if hasattr(fp, "readinto") else None
+
+
+# One client per camera and process, so the connection pool stays warm across items
+_clients: dict[tuple[str, str, str], HikvisionClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(camcfg: dict[str, str]) -> HikvisionClient:
+    """Shared client for the camera, created on first use."""
+    key = (camcfg["base_url"].rstrip("/"), camcfg["username"], camcfg["password"])
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = HikvisionClient(*key)
+            _clients[key] = client
+        return client
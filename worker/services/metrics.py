@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """In-process counters, gauges and timing summaries for the /metrics endpoint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._timings: dict[str, dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Add a sample to a count/sum/max/last summary."""
+        with self._lock:
+            timing = self._timings.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0, "last": 0.0})
+            timing["count"] += 1
+            timing["sum"] += value
+            timing["max"] = max(timing["max"], value)
+            timing["last"] = value
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": {name: dict(timing) for name, timing in self._timings.items()},
+            }
+
+
+metrics = Metrics()
+
+
+def published_dir() -> str:
+    return os.path.join(settings.TEMP_VIDEO_DIR, "metrics")
+
+
+def publish(name: str) -> None:
+    """Write this process's snapshot for the API process, used by worker processes."""
+    os.makedirs(published_dir(), exist_ok=True)
+    path = os.path.join(published_dir(), f"{name}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"published_at": time.time(), **metrics.snapshot()}, f)
+    os.replace(tmp, path)
+
+
+def unpublish(name: str) -> None:
+    try:
+        os.remove(os.path.join(published_dir(), f"{name}.json"))
+    except FileNotFoundError:
+        pass
+
+
+def load_published() -> dict[str, dict]:
+    """Latest snapshots published by the worker processes, by worker name."""
+    snapshots: dict[str, dict] = {}
+    try:
+        names = os.listdir(published_dir())
+    except FileNotFoundError:
+        return snapshots
+
+    for filename in names:
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(published_dir(), filename)) as f:
+                snapshots[filename[: -len(".json")]] = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Skipping metrics snapshot {filename}: {e}")
+    return snapshots
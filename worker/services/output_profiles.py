@@ -0,0 +1,118 @@
+import uuid
+from dataclasses import dataclass, fields
+
+from config import settings
+
+
+@dataclass(frozen=True)
+class OutputProfile:
+    """How cut_exact encodes a clip: resolution, bitrate cap, preset and audio."""
+
+    name: str
+    # "copy" keeps the camera stream as is
+    codec: str = "libx264"
+    # Output height, never upscaled, 0 keeps the source resolution
+    height: int = 0
+    crf: int = 23
+    # Peak bitrate cap like "1500k", empty for CRF only
+    max_bitrate: str = ""
+    preset: str = "fast"
+    drop_audio: bool = False
+
+    @property
+    def copy(self) -> bool:
+        return self.codec == "copy"
+
+    def ffmpeg_args(self) -> list[str]:
+        """Output codec args, placed between the input and the output path."""
+        if self.copy:
+            return ["-c:v", "copy", "-an"] if self.drop_audio else ["-c", "copy"]
+
+        args = ["-c:v", self.codec, "-preset", self.preset, "-crf", str(self.crf)]
+        if self.max_bitrate:
+            args.extend(["-maxrate", self.max_bitrate, "-bufsize", _double(self.max_bitrate)])
+        if self.height:
+            args.extend(["-vf", f"scale=-2:'min({self.height},ih)'"])
+        args.extend(["-pix_fmt", "yuv420p"])
+        args.extend(["-an"] if self.drop_audio else ["-c:a", "aac"])
+        return args
+
+
+def _double(bitrate: str) -> str:
+    """VBV buffer of two seconds at the cap, "1500k" -> "3000k"."""
+    digits = bitrate.rstrip("kKmM")
+    return f"{int(float(digits) * 2)}{bitrate[len(digits):]}"
+
+
+BUILTIN_PROFILES: dict[str, OutputProfile] = {
+    profile.name: profile
+    for profile in (
+        OutputProfile("native", codec="copy"),
+        # What EXACT_CUT has always encoded with
+        OutputProfile("exact", crf=23, preset="fast"),
+        # Dispute review: readable labels and faces at a fraction of a 4K stream
+        OutputProfile("review-1080p", height=1080, crf=26, max_bitrate="3000k", preset="veryfast", drop_audio=True),
+        OutputProfile("review-720p", height=720, crf=27, max_bitrate="1500k", preset="veryfast", drop_audio=True),
+        OutputProfile("review-480p", height=480, crf=28, max_bitrate="800k", preset="veryfast", drop_audio=True),
+        # Dashboard hover preview, cheap next to the decode it shares with the clip
+        OutputProfile("preview-240p", height=240, crf=32, max_bitrate="300k", preset="veryfast", drop_audio=True),
+    )
+}
+
+
+def profiles() -> dict[str, OutputProfile]:
+    """Built-in profiles plus OUTPUT_PROFILES from config, which can override them."""
+    known = {f.name for f in fields(OutputProfile)} - {"name"}
+    custom = {
+        name: OutputProfile(name, **{key: value for key, value in options.items() if key in known})
+        for name, options in settings.OUTPUT_PROFILES.items()
+    }
+    return {**BUILTIN_PROFILES, **custom}
+
+
+def _camera_map() -> dict[str, str]:
+    """OUTPUT_PROFILE_MAP as {camera or workstation ID: profile name}."""
+    mapping = {}
+    for entry in settings.OUTPUT_PROFILE_MAP.split(","):
+        key, _, name = entry.partition("=")
+        if key.strip() and name.strip():
+            mapping[key.strip().lower()] = name.strip()
+    return mapping
+
+
+def profile_for(camera_id: uuid.UUID | str, workstation_id: uuid.UUID | str | None = None) -> OutputProfile:
+    """Profile of a clip: camera entry, then workstation entry, then OUTPUT_PROFILE.
+
+    Without OUTPUT_PROFILE the clip is encoded if EXACT_CUT is set and
+    stream copied otherwise, as before profiles existed.
+    """
+    mapping = _camera_map()
+    name = mapping.get(str(camera_id).lower())
+    if name is None and workstation_id is not None:
+        name = mapping.get(str(workstation_id).lower())
+    if name is None:
+        name = settings.OUTPUT_PROFILE or ("exact" if settings.EXACT_CUT else "native")
+    return profiles()[name]
+
+
+def validate_profiles() -> list[str]:
+    """Configuration errors in the profile settings."""
+    errors = []
+    try:
+        available = profiles()
+    except (TypeError, ValueError) as e:
+        return [f"OUTPUT_PROFILES is invalid: {e}"]
+    for name in [settings.OUTPUT_PROFILE, settings.PREVIEW_PROFILE, *_camera_map().values()]:
+        if name and name not in available:
+            errors.append(f"Unknown output profile {name!r}, available: {', '.join(sorted(available))}")
+    preview = available.get(settings.PREVIEW_PROFILE)
+    if preview is not None and preview.copy:
+        errors.append(f"PREVIEW_PROFILE {preview.name!r} must encode, not stream copy")
+    return errors
+
+
+def preview_profile() -> OutputProfile | None:
+    """Profile of the preview rendition, None when previews are disabled."""
+    if not settings.PREVIEW_PROFILE:
+        return None
+    return profiles()[settings.PREVIEW_PROFILE]
@@ -0,0 +1,208 @@
+import bisect
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from config import settings
+from services.metrics import metrics
+from services.utils import parse_time
+
+logger = logging.getLogger(__name__)
+
+Segment = dict[str, str | None]
+# Searches the device for [start, end], with ISAPI time strings
+DeviceSearch = Callable[[str, str], list[Segment]]
+
+# Open-ended segments (still recording, no endTime) end after everything else
+OPEN_END = datetime.max
+
+
+def _utc(t: str) -> datetime:
+    """Naive UTC datetime, the way segment times from the NVR are compared elsewhere."""
+    parsed = parse_time(t)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _like(t: datetime, caller: str) -> str:
+    """t formatted like the caller's time string: naive, with Z or with its UTC offset.
+
+    Devices may read a Z time as UTC and a naive one as device local time,
+    a gap has to be searched the way the caller's window would have been.
+    """
+    if caller.endswith("Z"):
+        return t.isoformat() + "Z"
+    parsed = parse_time(caller)
+    if parsed.tzinfo is None:
+        return t.isoformat()
+    return t.replace(tzinfo=timezone.utc).astimezone(parsed.tzinfo).isoformat()
+
+
+class RecordingCatalog:
+    """Recordings of one camera track already returned by ContentMgmt/search.
+
+    Segments are kept sorted by start with a running maximum of their ends,
+    so the segments overlapping a window are found with two bisects. A
+    separate list of disjoint covered intervals records which time ranges
+    were fully searched. A search only asks the device for the parts of
+    its window that are not covered, usually the tail.
+
+    A search covers time up to the end of the latest segment the device
+    returned, past the window if that segment runs on: recordings of one
+    track never overlap, so nothing else can start before it ends. Footage
+    the NVR has not flushed yet, or a truncated result list, is searched
+    again next time. The catalog keeps
+    RECORDING_CATALOG_MAX_AGE_SECONDS behind the newest recording, older
+    windows (retries, backlog) are searched on the device every time. A segment
+    that is gone from the NVR (overwritten) drops itself and everything
+    older, see invalidate().
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._starts: list[datetime] = []
+        self._max_ends: list[datetime] = []
+        self._segments: list[Segment] = []
+        self._covered_starts: list[datetime] = []
+        self._covered_ends: list[datetime] = []
+
+    def search(self, start_time: str, end_time: str, search_device: DeviceSearch) -> list[Segment]:
+        """Segments overlapping [start_time, end_time], searching the device only for uncovered parts."""
+        start, end = _utc(start_time), _utc(end_time)
+        with self._lock:
+            gaps = self._gaps(start, end)
+
+        if not gaps:
+            metrics.incr("catalog_hits")
+        elif gaps == [(start, end)]:
+            metrics.incr("catalog_misses")
+        else:
+            metrics.incr("catalog_partial_hits")
+
+        results = []
+        for gap_start, gap_end in gaps:
+            if (gap_start, gap_end) == (start, end):
+                segs = search_device(start_time, end_time)
+            else:
+                segs = search_device(_like(gap_start, start_time), _like(gap_end, end_time))
+            results.append((gap_start, gap_end, segs))
+
+        with self._lock:
+            for gap_start, gap_end, segs in results:
+                self._add(gap_start, gap_end, segs)
+            # Answered before pruning: a window older than the max age is
+            # served from what the device just returned, then dropped
+            found = self._overlapping(start, end)
+            self._prune()
+            return found
+
+    def invalidate(self, playback_uri: str) -> None:
+        """Forget a segment the NVR no longer has, and everything recorded before it.
+
+        The NVR overwrites its oldest footage first, so older entries are
+        just as likely to be gone. Their windows are searched again.
+        """
+        with self._lock:
+            for index, seg in enumerate(self._segments):
+                if seg["playbackURI"] == playback_uri:
+                    cutoff = _utc(seg["end"]) if seg.get("end") else self._starts[index]
+                    del self._starts[: index + 1]
+                    del self._segments[: index + 1]
+                    self._rebuild_ends()
+                    self._uncover_before(cutoff)
+                    logger.info(f"Recording catalog dropped {index + 1} segments up to {cutoff} (overwritten)")
+                    return
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._segments)
+
+    def _overlapping(self, start: datetime, end: datetime) -> list[Segment]:
+        # Every segment before first ends by start, every one from last starts at or after end
+        first = bisect.bisect_right(self._max_ends, start)
+        last = bisect.bisect_left(self._starts, end)
+        return [
+            dict(seg)
+            for seg in self._segments[first:last]
+            if not seg.get("end") or _utc(seg["end"]) > start
+        ]
+
+    def _gaps(self, start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+        """Parts of [start, end] outside the covered intervals."""
+        gaps = []
+        cursor = start
+        index = bisect.bisect_right(self._covered_ends, start)
+        while index < len(self._covered_starts) and self._covered_starts[index] < end:
+            if self._covered_starts[index] > cursor:
+                gaps.append((cursor, self._covered_starts[index]))
+            cursor = max(cursor, self._covered_ends[index])
+            index += 1
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def _add(self, gap_start: datetime, gap_end: datetime, segs: list[Segment]) -> None:
+        """Merge a device search result and mark the part of the gap it settles as covered."""
+        latest_end = None
+        for seg in segs:
+            if not seg.get("start"):
+                continue
+            start = _utc(seg["start"])
+            index = bisect.bisect_left(self._starts, start)
+            if index < len(self._starts) and self._starts[index] == start:
+                # Same recording, the end grows while it is being written
+                self._segments[index] = dict(seg)
+            else:
+                self._starts.insert(index, start)
+                self._segments.insert(index, dict(seg))
+            # Only a segment overlapping the gap says there is nothing else until it ends
+            if seg.get("end") and start < gap_end:
+                seg_end = _utc(seg["end"])
+                latest_end = seg_end if latest_end is None else max(latest_end, seg_end)
+        self._rebuild_ends()
+
+        # Nothing returned: not flushed yet or no footage, ask again next time
+        if latest_end is not None and latest_end > gap_start:
+            self._cover(gap_start, latest_end)
+
+    def _rebuild_ends(self) -> None:
+        self._max_ends = []
+        running = datetime.min
+        for seg in self._segments:
+            seg_end = _utc(seg["end"]) if seg.get("end") else OPEN_END
+            running = max(running, seg_end)
+            self._max_ends.append(running)
+
+    def _cover(self, start: datetime, end: datetime) -> None:
+        """Add [start, end] to the covered intervals, merging the ones it touches."""
+        first = bisect.bisect_left(self._covered_ends, start)
+        last = bisect.bisect_right(self._covered_starts, end)
+        if first < last:
+            start = min(start, self._covered_starts[first])
+            end = max(end, self._covered_ends[last - 1])
+        self._covered_starts[first:last] = [start]
+        self._covered_ends[first:last] = [end]
+
+    def _uncover_before(self, cutoff: datetime) -> None:
+        index = bisect.bisect_right(self._covered_ends, cutoff)
+        del self._covered_starts[:index]
+        del self._covered_ends[:index]
+        if self._covered_starts and self._covered_starts[0] < cutoff:
+            self._covered_starts[0] = cutoff
+
+    def _prune(self) -> None:
+        """Drop recordings ending more than RECORDING_CATALOG_MAX_AGE_SECONDS before the newest one."""
+        # Running maximum, the newest closed end is right before the first open one
+        closed = bisect.bisect_left(self._max_ends, OPEN_END)
+        if closed == 0:
+            return
+        newest = self._max_ends[closed - 1]
+        cutoff = newest - timedelta(seconds=settings.RECORDING_CATALOG_MAX_AGE_SECONDS)
+        index = bisect.bisect_right(self._max_ends, cutoff)
+        if index:
+            del self._starts[:index]
+            del self._segments[:index]
+            del self._max_ends[:index]
+        self._uncover_before(cutoff)
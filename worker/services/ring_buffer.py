@@ -0,0 +1,180 @@
+import logging
+import os
+import shutil
+import subprocess
+import uuid
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, urlparse
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Segment file names are their UTC start time
+SEGMENT_NAME_FORMAT = "%Y%m%dT%H%M%S"
+SEGMENT_EXT = ".mp4"
+
+
+def buffer_dir(camera_id: uuid.UUID | str) -> str:
+    return os.path.join(settings.TEMP_VIDEO_DIR, "ring", str(camera_id))
+
+
+def buffered_cameras() -> set[str]:
+    """Cameras with a buffer directory on disk, recorded or not."""
+    try:
+        return set(os.listdir(os.path.join(settings.TEMP_VIDEO_DIR, "ring")))
+    except FileNotFoundError:
+        return set()
+
+
+def delete_buffer(camera_id: uuid.UUID | str) -> None:
+    shutil.rmtree(buffer_dir(camera_id), ignore_errors=True)
+    logger.info(f"Ring buffer deleted for camera {camera_id}")
+
+
+def configured_cameras() -> set[str]:
+    return {c.strip() for c in settings.RING_BUFFER_CAMERAS.split(",") if c.strip()}
+
+
+def source_args(camcfg: dict[str, str]) -> list[str]:
+    """ffmpeg input and codec args for the camera stream, or a synthetic test stream."""
+    if settings.RING_BUFFER_SOURCE == "synthetic":
+        fps = 25
+        return [
+            "-re", "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate={fps}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            # Keyframe on every segment boundary so segments split on time
+            "-force_key_frames", f"expr:gte(t,n_forced*{settings.RING_BUFFER_SEGMENT_SECONDS})",
+        ]
+
+    host = urlparse(camcfg["base_url"]).hostname
+    user = quote(camcfg["username"], safe="")
+    password = quote(camcfg["password"], safe="")
+    url = f"rtsp://{user}:{password}@{host}:{settings.RING_BUFFER_RTSP_PORT}/Streaming/Channels/{settings.TRACK_ID}"
+    # Audio is dropped, G.711 from the camera can't go into mp4 as is
+    return ["-rtsp_transport", "tcp", "-i", url, "-c:v", "copy", "-an"]
+
+
+def record_command(camcfg: dict[str, str], outdir: str) -> list[str]:
+    return [
+        "ffmpeg", "-nostats", "-loglevel", "error",
+        *source_args(camcfg),
+        "-f", "segment",
+        "-segment_time", str(settings.RING_BUFFER_SEGMENT_SECONDS),
+        "-segment_atclocktime", "1",
+        "-reset_timestamps", "1",
+        "-strftime", "1",
+        os.path.join(outdir, f"%Y%m%dT%H%M%S{SEGMENT_EXT}"),
+    ]
+
+
+def list_segments(camera_id: uuid.UUID | str) -> list[tuple[datetime, str]]:
+    """Buffered segments as (UTC start, path), oldest first."""
+    outdir = buffer_dir(camera_id)
+    try:
+        names = os.listdir(outdir)
+    except FileNotFoundError:
+        return []
+
+    segments = []
+    for name in names:
+        if not name.endswith(SEGMENT_EXT):
+            continue
+        try:
+            start = datetime.strptime(name[: -len(SEGMENT_EXT)], SEGMENT_NAME_FORMAT)
+        except ValueError:
+            continue
+        segments.append((start.replace(tzinfo=timezone.utc), os.path.join(outdir, name)))
+    segments.sort()
+    return segments
+
+
+def lookup(camera_id: uuid.UUID | str, start: datetime, end: datetime) -> list[dict[str, str | None]] | None:
+    """Buffered segments covering [start, end], None if the buffer doesn't cover it all.
+
+    A segment ends where the next one starts, so the window is only covered
+    once a segment has started after end (the one being written is never
+    used). A gap left by a recorder restart counts as a miss.
+    """
+    max_length = timedelta(seconds=settings.RING_BUFFER_SEGMENT_SECONDS * 2)
+    segments = list_segments(camera_id)
+
+    covering: list[dict[str, str | None]] = []
+    covered_until: datetime | None = None
+    for (seg_start, path), (next_start, _) in zip(segments, segments[1:]):
+        if next_start <= start:
+            continue
+        if seg_start >= end:
+            break
+        if not covering and seg_start > start:
+            return None
+        if next_start - seg_start > max_length:
+            return None
+        covering.append({
+            "playbackURI": None,
+            "start": seg_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "end": next_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "path": path,
+        })
+        covered_until = next_start
+
+    if covered_until is None or covered_until < end:
+        return None
+    return covering
+
+
+def available(segments: list[dict[str, str | None]]) -> bool:
+    """False if buffered segments of a search have since been pruned."""
+    return all(os.path.exists(seg["path"]) for seg in segments if seg.get("path"))
+
+
+def prune(camera_id: uuid.UUID | str, retention_seconds: int) -> int:
+    """Delete segments older than the retention window. Returns count deleted."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=retention_seconds)
+    deleted = 0
+    for seg_start, path in list_segments(camera_id):
+        if seg_start >= cutoff:
+            break
+        try:
+            os.remove(path)
+            deleted += 1
+        except OSError as e:
+            logger.warning(f"Failed to prune {path}: {e}")
+    return deleted
+
+
+class Recorder:
+    """One continuous ffmpeg segment recorder for a camera."""
+
+    def __init__(self, camera_id: str, camcfg: dict[str, str]):
+        self.camera_id = camera_id
+        self.camcfg = camcfg
+        self.process: subprocess.Popen | None = None
+
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> None:
+        outdir = buffer_dir(self.camera_id)
+        os.makedirs(outdir, exist_ok=True)
+        self.process = subprocess.Popen(
+            record_command(self.camcfg, outdir),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            # strftime names use local time, keep them UTC
+            env={**os.environ, "TZ": "UTC"},
+        )
+        logger.info(f"Ring buffer recorder started for camera {self.camera_id}")
+
+    def stop(self) -> None:
+        if not self.running():
+            return
+        # SIGTERM lets ffmpeg finalize the segment being written
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        logger.info(f"Ring buffer recorder stopped for camera {self.camera_id}")
@@ -0,0 +1,76 @@
+import logging
+import os
+import shutil
+import time
+import uuid
+
+from config import settings
+from services.utils import parse_time
+
+logger = logging.getLogger(__name__)
+
+
+def cache_dir(camera_id: uuid.UUID | str) -> str:
+    return os.path.join(settings.TEMP_VIDEO_DIR, "cache", str(camera_id))
+
+
+def cache_path(camera_id: uuid.UUID | str, seg: dict[str, str | None]) -> str | None:
+    """Cache file of a segment, keyed by its start and end. None for open-ended segments.
+
+    A segment that was still being recorded when searched has a different
+    end than the finished one, so it never matches a later search.
+    """
+    if not seg.get("start") or not seg.get("end"):
+        return None
+    start = parse_time(seg["start"]).strftime("%Y%m%dT%H%M%S")
+    end = parse_time(seg["end"]).strftime("%Y%m%dT%H%M%S")
+    return os.path.join(cache_dir(camera_id), f"{start}_{end}.mp4")
+
+
+def lookup(camera_id: uuid.UUID | str, seg: dict[str, str | None]) -> str | None:
+    """Cached file of the segment, if a complete copy is there."""
+    path = cache_path(camera_id, seg)
+    if path is None:
+        return None
+    try:
+        if os.path.getsize(path) > 1024:
+            return path
+    except OSError:
+        pass
+    return None
+
+
+def link_into(cached: str, outpath: str) -> None:
+    """Hard link the cached file to outpath, copying across filesystems (e.g. RAM tier)."""
+    if os.path.exists(outpath):
+        os.remove(outpath)
+    try:
+        os.link(cached, outpath)
+    except OSError:
+        shutil.copyfile(cached, outpath)
+    # Refresh the entry so the janitor keeps segments that are still in use
+    os.utime(cached)
+
+
+def expire(ttl_seconds: int, budget: int) -> int:
+    """Delete up to budget cached segments untouched for ttl_seconds. Returns count deleted."""
+    root = os.path.join(settings.TEMP_VIDEO_DIR, "cache")
+    if not os.path.isdir(root):
+        return 0
+
+    now = time.time()
+    deleted = 0
+    for camera_id in os.listdir(root):
+        camera_dir = os.path.join(root, camera_id)
+        for name in os.listdir(camera_dir):
+            if deleted >= budget:
+                return deleted
+            path = os.path.join(camera_dir, name)
+            try:
+                if now - os.path.getmtime(path) < ttl_seconds:
+                    continue
+                os.remove(path)
+                deleted += 1
+            except OSError as e:
+                logger.warning(f"Failed to expire cached segment {path}: {e}")
+    return deleted
@@ -1,18 +1,20 @@
 import os
+import uuid
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 
-from services.hikvision_client import HikvisionClient
+from config import settings
+from services import segment_cache
+from services.hikvision_client import get_client
 
 
 def download_segments(
     camcfg: dict[str, str],
     segments: list[dict[str, str | None]],
     outdir: str,
+    camera_id: uuid.UUID | None = None,
 ) -> list[tuple[str, datetime]]:
-    client = HikvisionClient(
-        camcfg["base_url"], camcfg["username"], camcfg["password"]
-    )
+    client = get_client(camcfg)
     os.makedirs(outdir, exist_ok=True)
 
     def task(seg: dict[str, str | None]) -> tuple[str, datetime]:
@@ -28,13 +30,27 @@ def download_segments(
         if os.path.exists(path) and os.path.getsize(path) > 1024:
             return (path, seg_dt)
 
+        # Segments from the local ring buffer
+        if seg.get("path"):
+            segment_cache.link_into(seg["path"], path)
+            return (path, seg_dt)
+
+        # Segments prefetched while the item was still being packed
+        cached = segment_cache.lookup(camera_id, seg) if camera_id is not None else None
+        if cached is not None:
+            segment_cache.link_into(cached, path)
+            return (path, seg_dt)
+
         playback_uri = seg["playbackURI"]
         if playback_uri is None:
             raise ValueError("Segment playbackURI is None")
         client.download_segment(playback_uri, path)
         return (path, seg_dt)
 
-    with ThreadPoolExecutor(max_workers=5) as exe:
+    # Parallel downloads per NVR are capped by the client's adaptive limiter,
+    # shared with other items, this only avoids idle threads for short items
+    workers = max(1, min(len(segments), settings.DOWNLOAD_PARALLEL_MAX))
+    with ThreadPoolExecutor(max_workers=workers) as exe:
         results = list(exe.map(task, segments))
 
     results.sort(key=lambda x: x[1])
@@ -0,0 +1,100 @@
+import bisect
+import hashlib
+import math
+import os
+import socket
+import uuid
+
+# Virtual nodes per shard, smooths out the camera distribution
+VNODES_PER_SHARD = 64
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys (camera IDs) to shard indexes.
+
+    Changing the shard count only moves the keys of the added/removed shard,
+    so the other workers keep their segment caches and NVR connections warm.
+    """
+
+    def __init__(self, shard_count: int, vnodes: int = VNODES_PER_SHARD):
+        self.shard_count = shard_count
+        points = sorted(
+            (_hash(f"shard-{shard}-{vnode}"), shard)
+            for shard in range(shard_count)
+            for vnode in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._shards = [s for _, s in points]
+
+    def shard_for(self, key: str) -> int:
+        if self.shard_count <= 1:
+            return 0
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._shards[index]
+
+
+def rendezvous_owner(key: str, nodes: dict[str, int]) -> str | None:
+    """Weighted rendezvous hashing, the node with the highest score for key wins.
+
+    Nodes are weighted by their worker count. A node joining or leaving only
+    moves the keys it wins or owned, without any coordination between nodes.
+    """
+    owner = None
+    best = -math.inf
+    for node, weight in nodes.items():
+        # Map the hash into (0, 1) and spread it by weight
+        h = (_hash(f"{node}/{key}") + 0.5) / 2**64
+        score = -weight / math.log(h)
+        if score > best:
+            owner, best = node, score
+    return owner
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+# This node's ID in worker_nodes, the same in every worker process of the node
+_node_id: str | None = None
+
+# Shard served by this process, set by the supervisor in each worker process
+_local_shard: tuple[int, HashRing] | None = None
+
+
+def configure_node(node_id: str) -> None:
+    global _node_id
+    _node_id = node_id
+
+
+def node_id() -> str | None:
+    return _node_id
+
+
+def configure_local_shard(shard_index: int, shard_count: int) -> None:
+    global _local_shard
+    _local_shard = (shard_index, HashRing(shard_count))
+
+
+def owned_camera_ids(
+    camera_ids: list[uuid.UUID],
+    live_nodes: dict[str, int] | None = None,
+) -> list[uuid.UUID] | None:
+    """Cameras this process should process, None when it owns every camera.
+
+    Cameras are divided among the live nodes by rendezvous hashing, then
+    among this node's worker processes by the hash ring. A node missing from
+    live_nodes (heartbeat lapsed) owns nothing until its next heartbeat.
+    """
+    owned = None
+    if live_nodes and _node_id is not None:
+        owned = [c for c in camera_ids if rendezvous_owner(str(c), live_nodes) == _node_id]
+
+    if _local_shard is not None:
+        shard_index, ring = _local_shard
+        owned = [c for c in (camera_ids if owned is None else owned) if ring.shard_for(str(c)) == shard_index]
+
+    return owned
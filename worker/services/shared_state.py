@@ -0,0 +1,55 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+from config import settings
+
+
+def state_dir() -> str:
+    return os.path.join(settings.TEMP_VIDEO_DIR, "state")
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def entry_key(key: str) -> str:
+    """Key of this process's entry, processes of a node can't collide."""
+    return f"{os.getpid()}:{key}"
+
+
+@contextmanager
+def locked_entries(name: str) -> Iterator[dict[str, dict]]:
+    """Entries of a state file shared by every process of the node, under its flock.
+
+    Entries are {"pid": ..., ...} dicts keyed by entry_key(). Entries of
+    processes that died without removing them are dropped on read. Changes
+    made to the dict are written back before the lock is released.
+    """
+    os.makedirs(state_dir(), exist_ok=True)
+    path = os.path.join(state_dir(), f"{name}.json")
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path) as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = {}
+            entries = {key: entry for key, entry in stored.items() if _alive(entry["pid"])}
+            yield entries
+            if entries != stored:
+                tmp = path + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(entries, f)
+                os.replace(tmp, path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
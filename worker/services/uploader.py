@@ -1,30 +1,35 @@
+import functools
 import logging
 import time
 
-import boto3
-from botocore.config import Config
-from botocore.exceptions import ClientError
-
 from config import settings
 
 logger = logging.getLogger(__name__)
 
 # Retry config for boto3
-RETRY_CONFIG = Config(
-    retries={
+RETRY_CONFIG = {
+    "retries": {
         "max_attempts": 5,
         "mode": "adaptive",
     }
-)
+}
 
 
+@functools.lru_cache(maxsize=1)
 def get_gcs_client():
+    """Shared S3 client for GCS, boto3 clients are thread-safe.
+
+    boto3 is imported on first use, it takes a large share of the startup time.
+    """
+    import boto3
+    from botocore.config import Config
+
     return boto3.client(
         "s3",
         endpoint_url="https://storage.googleapis.com",
         aws_access_key_id=settings.GCS_ACCESS_KEY,
         aws_secret_access_key=settings.GCS_SECRET_KEY,
-        config=RETRY_CONFIG,
+        config=Config(**RETRY_CONFIG),
     )
 
 
@@ -35,6 +40,8 @@ def upload_to_gcs(
     max_retries: int = 3,
 ) -> str:
     """Upload file to GCS with retry logic."""
+    from botocore.exceptions import ClientError
+
     client = get_gcs_client()
     last_error: Exception | None = None
 
@@ -52,4 +59,4 @@ def upload_to_gcs(
                 logger.info(f"Retrying in {sleep_time}s...")
                 time.sleep(sleep_time)
 
-    raise Exception(f"Failed to upload after {max_retries} attempts: {last_error}")
+    raise Exception(f"Failed to upload after {max_retries} attempts: {last_error}") from last_error
@@ -3,6 +3,8 @@ import os
 import shutil
 from datetime import datetime
 
+from services.errors import TransientError
+
 logger = logging.getLogger(__name__)
 
 # Minimum required disk space in bytes (1 GB)
@@ -58,7 +60,7 @@ def check_disk_space(path: str, min_bytes: int = MIN_DISK_SPACE_BYTES) -> None:
     free_gb = stat.free / (1024 * 1024 * 1024)
 
     if stat.free < min_bytes:
-        raise Exception(
+        raise TransientError(
             f"Insufficient disk space: {free_gb:.2f} GB available, "
             f"minimum {min_bytes / (1024 * 1024 * 1024):.2f} GB required"
         )
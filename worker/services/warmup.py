@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Backoff between retries of failed steps, doubling up to the max
+RETRY_INITIAL_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+
+_lock = threading.Lock()
+# Warm-up step name -> "pending", "ok" or the error it failed with
+_steps: dict[str, str] = {}
+# Checks evaluated on every readiness request, e.g. worker processes alive
+_checks: dict[str, Callable[[], bool]] = {}
+
+
+def warm_database() -> None:
+    """Import the models and open the first connection of the processing and API pools."""
+    from sqlalchemy import text
+
+    import db.models  # noqa: F401
+    from db.session import api_engine, engine
+
+    for pool_engine in (engine, api_engine):
+        with pool_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+
+def warm_storage() -> None:
+    from services.uploader import get_gcs_client
+
+    get_gcs_client()
+
+
+def warm_encryption_key() -> None:
+    from encryption import get_key
+
+    get_key()
+
+
+def warm_cameras() -> None:
+    """Decrypt the configs of owned cameras and create their NVR clients ahead of the first item."""
+    from db.session import SessionLocal
+    from jobs.batch_processor import owned_cameras
+    from repositories import camera_repository
+    from services.hikvision_client import get_client
+
+    db = SessionLocal()
+    try:
+        owned = owned_cameras(db)
+        for camera in camera_repository.get_all_cameras(db):
+            if owned is None or camera.id in owned:
+                get_client(camera_repository.build_camera_config(camera))
+    finally:
+        db.close()
+
+
+# Everything a processing process uses, the API process of WORKERS > 1 only needs the database
+PROCESSING_STEPS: dict[str, Callable[[], None]] = {
+    "database": warm_database,
+    "encryption_key": warm_encryption_key,
+    "storage": warm_storage,
+    "cameras": warm_cameras,
+}
+API_STEPS: dict[str, Callable[[], None]] = {
+    "database": warm_database,
+}
+
+
+def expect(steps: dict[str, Callable[[], None]]) -> None:
+    """Mark steps pending, so readiness is false until they have run."""
+    with _lock:
+        for name in steps:
+            _steps.setdefault(name, "pending")
+
+
+def _run(name: str, step: Callable[[], None]) -> bool:
+    started = time.monotonic()
+    try:
+        step()
+        result = "ok"
+    except Exception as e:
+        logger.error(f"Warm-up step {name} failed: {e}")
+        result = str(e) or type(e).__name__
+    elapsed = time.monotonic() - started
+    metrics.observe(f"warmup_{name}_seconds", elapsed)
+    with _lock:
+        _steps[name] = result
+    logger.info(f"Warm-up {name}: {result} in {elapsed:.2f}s")
+    return result == "ok"
+
+
+def _retry(steps: dict[str, Callable[[], None]]) -> None:
+    """Re-run failed steps with backoff until all of them succeed."""
+    delay = RETRY_INITIAL_SECONDS
+    while steps:
+        time.sleep(delay)
+        metrics.incr("warmup_retries")
+        steps = {name: step for name, step in steps.items() if not _run(name, step)}
+        delay = min(delay * 2, RETRY_MAX_SECONDS)
+
+
+def warm_up(steps: dict[str, Callable[[], None]]) -> None:
+    """Run the steps in order.
+
+    A failed step leaves the process not ready and is retried in the
+    background, so a dependency that was down at boot doesn't keep /ready
+    at 503 until a restart.
+    """
+    expect(steps)
+    failed = {name: step for name, step in steps.items() if not _run(name, step)}
+    if failed:
+        threading.Thread(target=_retry, args=(failed,), daemon=True, name="warmup-retry").start()
+
+
+def add_check(name: str, check: Callable[[], bool]) -> None:
+    with _lock:
+        _checks[name] = check
+
+
+def readiness() -> tuple[bool, dict[str, str]]:
+    """Whether this process is ready for traffic, with the state of each step and check."""
+    with _lock:
+        states = dict(_steps)
+        checks = dict(_checks)
+    for name, check in checks.items():
+        try:
+            states[name] = "ok" if check() else "not ready"
+        except Exception as e:
+            states[name] = str(e) or type(e).__name__
+    ready = bool(states) and all(state == "ok" for state in states.values())
+    return ready, states
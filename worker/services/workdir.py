@@ -0,0 +1,246 @@
+import enum
+import json
+import logging
+import os
+import time
+
+from config import settings
+from services.shared_state import entry_key, locked_entries
+from services.utils import clean, ensure_dirs
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class Stage(str, enum.Enum):
+    SEARCHED = "searched"
+    DOWNLOADED = "downloaded"
+    MERGED = "merged"
+    CUT = "cut"
+    UPLOADED = "uploaded"
+
+
+STAGE_ORDER = [Stage.SEARCHED, Stage.DOWNLOADED, Stage.MERGED, Stage.CUT, Stage.UPLOADED]
+
+# Tags of work dirs used by a processing thread of any process, never expired by
+# the janitor (which runs in the API process)
+ACTIVE_STATE = "active-workdirs"
+
+
+class WorkDir:
+    """Per-item scratch directory with a checkpoint manifest.
+
+    Layout: <root>/work/<tag>/{raw,merged,output,manifest.json}. The manifest
+    records the last completed stage so a retry resumes instead of starting over.
+    It is discarded if the item's time range changed since it was written.
+    """
+
+    def __init__(self, root: str, tag: str, start_iso: str, end_iso: str):
+        self.tag = tag
+        self._set_root(root)
+
+        with locked_entries(ACTIVE_STATE) as active:
+            active[entry_key(tag)] = {"pid": os.getpid(), "tag": tag}
+
+        self.manifest = self._load(start_iso, end_iso)
+        ensure_dirs([self.raw_dir, self.merged_dir, self.output_dir])
+
+    def _set_root(self, root: str) -> None:
+        self.root = root
+        self.path = os.path.join(root, "work", self.tag)
+        self.raw_dir = os.path.join(self.path, "raw")
+        self.merged_dir = os.path.join(self.path, "merged")
+        self.output_dir = os.path.join(self.path, "output")
+        self.merged_path = os.path.join(self.merged_dir, "merged.mp4")
+        self.final_path = os.path.join(self.output_dir, "final.mp4")
+        self.poster_path = os.path.join(self.output_dir, "poster.jpg")
+        self.preview_path = os.path.join(self.output_dir, "preview.mp4")
+        self.manifest_path = os.path.join(self.path, MANIFEST_NAME)
+
+    def _load(self, start_iso: str, end_iso: str) -> dict:
+        fresh = {"stage": None, "start": start_iso, "end": end_iso}
+        if not os.path.exists(self.manifest_path):
+            return fresh
+
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest for {self.tag}: {e}")
+            clean(self.path)
+            return fresh
+
+        if manifest.get("start") != start_iso or manifest.get("end") != end_iso:
+            logger.info(f"Time range changed for {self.tag}, discarding previous artifacts")
+            clean(self.path)
+            return fresh
+
+        manifest["stage"] = self._validated_stage(manifest)
+        if manifest["stage"] is not None:
+            logger.info(f"Resuming {self.tag} after stage '{manifest['stage']}'")
+        return manifest
+
+    def _validated_stage(self, manifest: dict) -> str | None:
+        """Step back to the last stage whose artifacts are still on disk."""
+        stage = manifest.get("stage")
+        if stage is None:
+            return None
+
+        checks = {
+            Stage.DOWNLOADED: lambda: all(os.path.exists(p) for p, _ in manifest.get("seg_files", [])),
+            Stage.MERGED: lambda: os.path.exists(self.merged_path),
+            Stage.CUT: lambda: all(os.path.exists(p) for p in self._cut_outputs(manifest)),
+        }
+        index = [s.value for s in STAGE_ORDER].index(stage)
+        while index >= 0:
+            current = STAGE_ORDER[index]
+            # Uploaded items still need the final file for its size
+            check = checks.get(Stage.CUT if current == Stage.UPLOADED else current)
+            if check is None or check():
+                return current.value
+            index -= 1
+        return None
+
+    def _cut_outputs(self, manifest: dict) -> list[str]:
+        """Files the recorded cut produced, the poster and preview only if it made them."""
+        outputs = [self.final_path]
+        if manifest.get("poster"):
+            outputs.append(self.poster_path)
+        if manifest.get("preview"):
+            outputs.append(self.preview_path)
+        return outputs
+
+    def reached(self, stage: Stage) -> bool:
+        current = self.manifest.get("stage")
+        if current is None:
+            return False
+        return STAGE_ORDER.index(Stage(current)) >= STAGE_ORDER.index(stage)
+
+    def checkpoint(self, stage: Stage, **data: object) -> None:
+        """Record a completed stage (and its outputs) atomically."""
+        self.manifest.update(data)
+        self.manifest["stage"] = stage.value
+        self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        self.manifest["updated_at"] = time.time()
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    def relocate(self, root: str) -> None:
+        """Move the work dir to another scratch root.
+
+        Only allowed before anything is downloaded, when the manifest is the
+        only thing to carry over.
+        """
+        if root == self.root:
+            return
+        if self.reached(Stage.DOWNLOADED):
+            raise ValueError(f"Cannot relocate {self.tag} after download")
+
+        old_path = self.path
+        self._set_root(root)
+        ensure_dirs([self.raw_dir, self.merged_dir, self.output_dir])
+        if self.manifest.get("stage") is not None:
+            self._write_manifest()
+        clean(old_path)
+
+    def release(self) -> None:
+        """Stop using the work dir, keeping its artifacts for a later retry."""
+        with locked_entries(ACTIVE_STATE) as active:
+            active.pop(entry_key(self.tag), None)
+
+    def discard(self) -> None:
+        """Hand the work dir over to the janitor for deletion."""
+        try:
+            move_to_trash(self.root, self.path, self.tag)
+        except OSError as e:
+            logger.warning(f"Failed to discard {self.path}: {e}")
+        self.release()
+
+
+def scratch_roots() -> list[str]:
+    """Scratch tiers work dirs can live in, RAM-backed tier first."""
+    roots = [settings.TEMP_VIDEO_DIR]
+    if settings.MEMORY_STAGING_BYTES > 0:
+        roots.insert(0, settings.MEMORY_STAGING_DIR)
+    return roots
+
+
+def open_workdir(tag: str, start_iso: str, end_iso: str) -> WorkDir:
+    """Open the item's existing work dir in whichever tier holds it, else a new one on disk."""
+    for root in scratch_roots():
+        if os.path.exists(os.path.join(root, "work", tag, MANIFEST_NAME)):
+            return WorkDir(root, tag, start_iso, end_iso)
+    return WorkDir(settings.TEMP_VIDEO_DIR, tag, start_iso, end_iso)
+
+
+def peek_manifest(tag: str) -> dict | None:
+    """Manifest of an item's work dir without opening it, None if there is none."""
+    for root in scratch_roots():
+        try:
+            with open(os.path.join(root, "work", tag, MANIFEST_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def move_to_trash(root: str, path: str, name: str) -> None:
+    if not os.path.exists(path):
+        return
+    trash_dir = os.path.join(root, "trash")
+    os.makedirs(trash_dir, exist_ok=True)
+    os.rename(path, os.path.join(trash_dir, f"{name}-{time.time_ns()}"))
+
+
+def _last_update(path: str) -> float:
+    try:
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            return float(json.load(f).get("updated_at", 0))
+    except (OSError, ValueError, TypeError):
+        return os.path.getmtime(path)
+
+
+def expire_work_dirs(root: str, ttl_seconds: int, budget: int) -> int:
+    """Move up to budget work dirs untouched for ttl_seconds to the trash. Returns count moved."""
+    work_root = os.path.join(root, "work")
+    if not os.path.isdir(work_root):
+        return 0
+
+    now = time.time()
+    moved = 0
+    for tag in os.listdir(work_root):
+        if moved >= budget:
+            break
+        path = os.path.join(work_root, tag)
+        # Held through the move, so no process can open the dir between the check and the rename
+        with locked_entries(ACTIVE_STATE) as active:
+            if any(entry["tag"] == tag for entry in active.values()):
+                continue
+            try:
+                if now - _last_update(path) < ttl_seconds:
+                    continue
+                move_to_trash(root, path, tag)
+            except OSError as e:
+                logger.warning(f"Failed to expire {path}: {e}")
+                continue
+        logger.info(f"Expired work dir {tag}")
+        moved += 1
+    return moved
+
+
+def empty_trash(root: str, budget: int) -> int:
+    """Delete up to budget trashed dirs. Returns count deleted."""
+    trash_dir = os.path.join(root, "trash")
+    if not os.path.isdir(trash_dir):
+        return 0
+
+    deleted = 0
+    for name in os.listdir(trash_dir)[:budget]:
+        clean(os.path.join(trash_dir, name))
+        deleted += 1
+    return deleted